@@ -8,6 +8,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Directory where user-uploaded images are stored
 IMAGES_DIR = BASE_DIR / "img"
 
+# Directory where the batch commands save their progress (not served,
+# unlike the data/ dump directory)
+CHECKPOINTS_DIR = Path(os.getenv("CHECKPOINTS_DIR", BASE_DIR / "checkpoints"))
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
 
@@ -213,6 +217,21 @@ SPECTACULAR_SETTINGS = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# shared by all the processes (gunicorn workers & qcluster): the price stats
+# cache invalidation (version bump) must reach all of them
+# the table is created with `manage.py createcachetable` (see Makefile)
+# ------------------------------------------------------------------------------
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+    }
+}
+
+
 # Django Q2
 # https://django-q2.readthedocs.io/
 # ------------------------------------------------------------------------------
@@ -294,6 +313,8 @@ GOOGLE_CLOUD_VISION_API_KEY = os.getenv("GOOGLE_CLOUD_VISION_API_KEY")
 # ------------------------------------------------------------------------------
 
 GOOGLE_GEMINI_API_KEY = os.getenv("GOOGLE_GEMINI_API_KEY")
+# max number of concurrent requests (price tag extraction)
+GOOGLE_GEMINI_MAX_WORKERS = int(os.getenv("GOOGLE_GEMINI_MAX_WORKERS", "8"))
 
 
 # Triton Inference Server (ML)
@@ -22,6 +22,22 @@ class PriceFilter(django_filters.FilterSet):
     price__gte = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
     price__lt = django_filters.NumberFilter(field_name="price", lookup_expr="lt")
     price__lte = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
+    unit_price__gte = django_filters.NumberFilter(
+        field_name="unit_price", lookup_expr="gte"
+    )
+    unit_price__lte = django_filters.NumberFilter(
+        field_name="unit_price", lookup_expr="lte"
+    )
+    price_eur__gte = django_filters.NumberFilter(
+        field_name="price_eur", lookup_expr="gte"
+    )
+    price_eur__lte = django_filters.NumberFilter(
+        field_name="price_eur", lookup_expr="lte"
+    )
+    unit_price__isnull = django_filters.BooleanFilter(
+        field_name="unit_price", lookup_expr="isnull"
+    )
+    exclude_outliers = django_filters.BooleanFilter(method="filter_exclude_outliers")
     location_id__isnull = django_filters.BooleanFilter(
         field_name="location_id", lookup_expr="isnull"
     )
@@ -48,6 +64,12 @@ class PriceFilter(django_filters.FilterSet):
     created__lte = django_filters.DateTimeFilter(
         field_name="created", lookup_expr="lte"
     )
+    updated__gte = django_filters.DateTimeFilter(
+        field_name="updated", lookup_expr="gte"
+    )
+    updated__lte = django_filters.DateTimeFilter(
+        field_name="updated", lookup_expr="lte"
+    )
 
     def filter_kind(self, queryset, name, value):
         if value == constants.KIND_COMMUNITY:
@@ -56,6 +78,11 @@ class PriceFilter(django_filters.FilterSet):
             return queryset.has_kind_consumption()
         return queryset
 
+    def filter_exclude_outliers(self, queryset, name, value):
+        if value:
+            return queryset.exclude_outliers()
+        return queryset
+
     class Meta:
         model = Price
         fields = [
@@ -67,7 +94,9 @@ class PriceFilter(django_filters.FilterSet):
             "location_osm_type",
             "location_id",
             "price",
+            "unit_price_unit",
             "price_is_discounted",
+            "price_is_outlier",
             "discount_type",
             "currency",
             "date",
@@ -3,6 +3,7 @@ from rest_framework import serializers
 from open_prices.api.locations.serializers import LocationSerializer
 from open_prices.api.products.serializers import ProductFullSerializer
 from open_prices.api.proofs.serializers import ProofSerializer
+from open_prices.api.serializers import ValuesSerializer
 from open_prices.locations.models import Location
 from open_prices.prices.models import Price
 from open_prices.products.models import Product
@@ -35,6 +36,10 @@ class PriceFullSerializer(PriceSerializer):
         fields = "__all__"
 
 
+# fast read path of the price list
+price_full_values_serializer = ValuesSerializer(PriceFullSerializer)
+
+
 class PriceCreateSerializer(serializers.ModelSerializer):
     location_id = serializers.PrimaryKeyRelatedField(
         queryset=Location.objects.all(), source="location", required=False
@@ -63,3 +68,115 @@ class PriceStatsSerializer(serializers.Serializer):
     price__min = serializers.DecimalField(max_digits=10, decimal_places=2)
     price__max = serializers.DecimalField(max_digits=10, decimal_places=2)
     price__avg = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class PriceHistogramBucketSerializer(serializers.Serializer):
+    min = serializers.DecimalField(max_digits=10, decimal_places=2)
+    max = serializers.DecimalField(max_digits=10, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class PriceDistributionStatsSerializer(PriceStatsSerializer):
+    price__median = serializers.DecimalField(max_digits=10, decimal_places=2)
+    price__p10 = serializers.DecimalField(max_digits=10, decimal_places=2)
+    price__p90 = serializers.DecimalField(max_digits=10, decimal_places=2)
+    price__histogram = PriceHistogramBucketSerializer(many=True)
+    unit_price__count = serializers.IntegerField()
+    unit_price__min = serializers.DecimalField(max_digits=12, decimal_places=2)
+    unit_price__max = serializers.DecimalField(max_digits=12, decimal_places=2)
+    unit_price__avg = serializers.DecimalField(max_digits=12, decimal_places=2)
+    unit_price__median = serializers.DecimalField(max_digits=12, decimal_places=2)
+    price_eur__count = serializers.IntegerField()
+    price_eur__min = serializers.DecimalField(max_digits=12, decimal_places=2)
+    price_eur__max = serializers.DecimalField(max_digits=12, decimal_places=2)
+    price_eur__avg = serializers.DecimalField(max_digits=12, decimal_places=2)
+    price_eur__median = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class PriceChangesQuerySerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    cursor = serializers.CharField(required=False)
+    size = serializers.IntegerField(
+        required=False, default=100, min_value=1, max_value=1000
+    )
+
+
+class CommaSeparatedListField(serializers.ListField):
+    """A list passed as a comma-separated query param ("1,2,3")"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) == 1:
+            data = data[0]
+        if isinstance(data, str):
+            data = [item for item in data.split(",") if item]
+        return super().to_internal_value(data)
+
+
+class PriceLatestQuerySerializer(serializers.Serializer):
+    product_code = CommaSeparatedListField(
+        child=serializers.CharField(), required=False, max_length=100
+    )
+    category_tag = CommaSeparatedListField(
+        child=serializers.CharField(), required=False, max_length=100
+    )
+    location_id = CommaSeparatedListField(
+        child=serializers.IntegerField(), required=False, max_length=100
+    )
+
+    def validate(self, data):
+        if not (data.get("product_code") or data.get("category_tag")) and not data.get(
+            "location_id"
+        ):
+            raise serializers.ValidationError(
+                "At least one product_code, category_tag or location_id is required."
+            )
+        return data
+
+
+class PriceBasketQuerySerializer(serializers.Serializer):
+    product_code = CommaSeparatedListField(
+        child=serializers.CharField(), min_length=1, max_length=100
+    )
+    location_id = CommaSeparatedListField(
+        child=serializers.IntegerField(), required=False, max_length=50
+    )
+    lat = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    lon = serializers.FloatField(required=False, min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(
+        required=False, default=5, min_value=0, max_value=50
+    )
+
+    def validate(self, data):
+        if not data.get("location_id") and (
+            data.get("lat") is None or data.get("lon") is None
+        ):
+            raise serializers.ValidationError(
+                "Either location_id or lat & lon are required."
+            )
+        return data
+
+
+class PriceBasketStoreSerializer(serializers.Serializer):
+    location = LocationSerializer()
+    distance_km = serializers.FloatField(required=False)
+    currency = serializers.CharField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    product_count = serializers.IntegerField()
+    coverage = serializers.FloatField()
+    missing_product_codes = serializers.ListField(child=serializers.CharField())
+
+
+class PriceBasketSerializer(serializers.Serializer):
+    items = PriceBasketStoreSerializer(many=True)
+
+
+class PriceDeletedSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source="object_id")
+    deleted = serializers.DateTimeField()
+
+
+class PriceChangesSerializer(serializers.Serializer):
+    items = PriceSerializer(many=True)
+    deleted = PriceDeletedSerializer(many=True)
+    cursor = serializers.CharField()
+    has_more = serializers.BooleanField()
@@ -1,8 +1,11 @@
 from decimal import Decimal
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 
+from open_prices.api.prices.serializers import PriceFullSerializer
 from open_prices.locations import constants as location_constants
 from open_prices.locations.factories import LocationFactory
 from open_prices.locations.models import Location
@@ -80,8 +83,17 @@ class PriceListApiTest(TestCase):
             self.assertTrue("id" in response.data["items"][0])
             self.assertEqual(response.data["items"][0]["price"], 15.00)  # default order
             self.assertTrue("proof" in response.data["items"][0])
+            self.assertFalse("image_sha256" in response.data["items"][0]["proof"])
             self.assertTrue("location" in response.data["items"][0])
 
+    def test_price_list_same_output_as_serializer(self):
+        PriceFactory(**PRICE_APPLES)
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response.data["items"],
+            PriceFullSerializer(Price.objects.order_by("created"), many=True).data,
+        )
+
 
 class PriceListPaginationApiTest(TestCase):
     @classmethod
@@ -137,6 +149,22 @@ class PriceListOrderApiTest(TestCase):
         self.assertEqual(response.data["total"], 3)
         self.assertEqual(response.data["items"][0]["price"], 50.00)
 
+    def test_price_list_order_by_unit_price(self):
+        small_product = ProductFactory(product_quantity=100, product_quantity_unit="g")
+        big_product = ProductFactory(product_quantity=1, product_quantity_unit="kg")
+        PriceFactory(product_code=small_product.code, price=2)  # 20 / kg
+        PriceFactory(product_code=big_product.code, price=10)  # 10 / kg
+        url = self.url + "?unit_price_unit=KILOGRAM&order_by=unit_price"
+        response = self.client.get(url)
+        self.assertEqual(response.data["total"], 2)
+        self.assertEqual(
+            [item["unit_price"] for item in response.data["items"]],
+            [Decimal("10.00"), Decimal("20.00")],
+        )
+        url = self.url + "?unit_price__lte=15"
+        response = self.client.get(url)
+        self.assertEqual(response.data["total"], 1)
+
 
 class PriceListFilterApiTest(TestCase):
     @classmethod
@@ -273,6 +301,16 @@ class PriceListFilterApiTest(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.data["total"], 4)
 
+    def test_price_list_filter_by_outlier(self):
+        self.assertEqual(Price.objects.count(), 5)
+        Price.objects.filter(id=self.user_price.id).update(price_is_outlier=True)
+        url = self.url + "?exclude_outliers=true"
+        response = self.client.get(url)
+        self.assertEqual(response.data["total"], 4)
+        url = self.url + "?price_is_outlier=true"
+        response = self.client.get(url)
+        self.assertEqual(response.data["total"], 1)
+
     def test_price_list_filter_by_currency(self):
         self.assertEqual(Price.objects.count(), 5)
         url = self.url + "?currency=EUR"
@@ -373,6 +411,15 @@ class PriceListFilterApiTest(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.data["total"], 0)
 
+    def test_price_list_filter_by_updated(self):
+        self.assertEqual(Price.objects.count(), 5)
+        url = self.url + "?updated__gte=2024-01-01T00:00:00Z"
+        response = self.client.get(url)
+        self.assertEqual(response.data["total"], 5)
+        url = self.url + "?updated__lte=2024-01-01T00:00:00Z"
+        response = self.client.get(url)
+        self.assertEqual(response.data["total"], 0)
+
 
 class PriceDetailApiTest(TestCase):
     @classmethod
@@ -708,6 +755,215 @@ class PriceDeleteApiTest(TestCase):
         )
 
 
+class PriceChangesApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("api:prices-changes")
+        cls.price_list = [PriceFactory() for _ in range(3)]
+
+    def test_price_changes(self):
+        # first page
+        response = self.client.get(self.url + "?size=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["id"] for item in response.data["items"]],
+            [price.id for price in self.price_list[:2]],
+        )
+        self.assertTrue(response.data["has_more"])
+        # next page
+        response = self.client.get(
+            self.url + f"?size=2&cursor={response.data['cursor']}"
+        )
+        self.assertEqual(len(response.data["items"]), 1)
+        self.assertFalse(response.data["has_more"])
+        cursor = response.data["cursor"]
+        # no changes
+        response = self.client.get(self.url + f"?cursor={cursor}")
+        self.assertEqual(response.data["items"], [])
+        self.assertEqual(response.data["deleted"], [])
+        self.assertEqual(response.data["cursor"], cursor)
+        # an update & a deletion
+        self.price_list[0].receipt_quantity = 2
+        self.price_list[0].save()
+        price_deleted_id = self.price_list[1].id
+        self.price_list[1].delete()
+        response = self.client.get(self.url + f"?cursor={cursor}")
+        self.assertEqual(
+            [item["id"] for item in response.data["items"]], [self.price_list[0].id]
+        )
+        self.assertEqual(
+            [item["id"] for item in response.data["deleted"]], [price_deleted_id]
+        )
+
+    def test_price_changes_same_updated(self):
+        # rows changed at the same time: the cursor id breaks the tie
+        Price.objects.update(updated=timezone.now())
+        response = self.client.get(self.url + "?size=2")
+        response = self.client.get(
+            self.url + f"?size=2&cursor={response.data['cursor']}"
+        )
+        self.assertEqual(
+            [item["id"] for item in response.data["items"]], [self.price_list[2].id]
+        )
+        self.assertFalse(response.data["has_more"])
+
+    def test_price_changes_since(self):
+        response = self.client.get(self.url + "?since=2100-01-01T00:00:00Z")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["items"], [])
+
+    def test_price_changes_invalid_cursor(self):
+        response = self.client.get(self.url + "?cursor=invalid")
+        self.assertEqual(response.status_code, 400)
+
+
+class PriceLatestApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("api:prices-latest")
+        cls.location_1 = LocationFactory()
+        cls.location_2 = LocationFactory()
+        cls.product_1 = ProductFactory()
+        cls.product_2 = ProductFactory()
+        cls.prices = {}
+        for product, location, price, date in [
+            (cls.product_1, cls.location_1, 10, "2024-01-01"),
+            (cls.product_1, cls.location_1, 12, "2024-06-01"),
+            (cls.product_1, cls.location_2, 11, "2024-03-01"),
+            (cls.product_2, cls.location_1, 3, "2024-02-01"),
+        ]:
+            cls.prices[price] = PriceFactory(
+                product_code=product.code,
+                location_osm_id=location.osm_id,
+                location_osm_type=location.osm_type,
+                price=price,
+                date=date,
+            )
+        cls.prices[2] = PriceFactory(
+            type=price_constants.TYPE_CATEGORY,
+            category_tag="en:apples",
+            price_per=price_constants.PRICE_PER_KILOGRAM,
+            location_osm_id=cls.location_2.osm_id,
+            location_osm_type=cls.location_2.osm_type,
+            price=2,
+        )
+
+    def test_price_latest(self):
+        # filter required
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+        # many products
+        response = self.client.get(
+            self.url + f"?product_code={self.product_1.code},{self.product_2.code}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["price"] for item in response.data["items"]], [12, 3, 11]
+        )
+        # products & categories at a location
+        response = self.client.get(
+            self.url
+            + f"?product_code={self.product_1.code}&category_tag=en:apples"
+            + f"&location_id={self.location_2.id}"
+        )
+        self.assertEqual([item["price"] for item in response.data["items"]], [11, 2])
+        # many locations
+        response = self.client.get(
+            self.url + f"?location_id={self.location_1.id},{self.location_2.id}"
+        )
+        self.assertEqual(len(response.data["items"]), 4)
+        # paginated
+        response = self.client.get(
+            self.url
+            + f"?location_id={self.location_1.id},{self.location_2.id}&size=3&page=2"
+        )
+        self.assertEqual(response.data["total"], 4)
+        self.assertEqual(response.data["pages"], 2)
+        self.assertEqual(len(response.data["items"]), 1)
+
+    def test_price_latest_updated_on_delete(self):
+        self.prices[12].delete()
+        response = self.client.get(
+            self.url
+            + f"?product_code={self.product_1.code}&location_id={self.location_1.id}"
+        )
+        self.assertEqual([item["price"] for item in response.data["items"]], [10])
+
+
+class PriceBasketApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("api:prices-basket")
+        # 2 stores in Paris, 1 in Lyon
+        cls.location_1 = LocationFactory(osm_lat="48.8566", osm_lon="2.3522")
+        cls.location_2 = LocationFactory(osm_lat="48.8606", osm_lon="2.3376")
+        cls.location_3 = LocationFactory(osm_lat="45.7640", osm_lon="4.8357")
+        cls.product_1 = ProductFactory()
+        cls.product_2 = ProductFactory()
+        cls.product_3 = ProductFactory()
+        for product, location, price, date in [
+            (cls.product_1, cls.location_1, 2, "2024-01-01"),
+            (cls.product_1, cls.location_1, 3, "2024-06-01"),  # latest
+            (cls.product_2, cls.location_1, 4, "2024-01-01"),
+            (cls.product_1, cls.location_2, 1, "2024-01-01"),
+            (cls.product_2, cls.location_2, 5, "2024-01-01"),
+            (cls.product_3, cls.location_2, 10, "2024-01-01"),
+            (cls.product_1, cls.location_3, 1, "2024-01-01"),
+        ]:
+            PriceFactory(
+                product_code=product.code,
+                location_osm_id=location.osm_id,
+                location_osm_type=location.osm_type,
+                price=price,
+                currency="EUR",
+                date=date,
+            )
+        cls.product_codes = ",".join(
+            product.code for product in [cls.product_1, cls.product_2, cls.product_3]
+        )
+
+    def test_price_basket_validation(self):
+        response = self.client.get(self.url + f"?product_code={self.product_codes}")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url + f"?location_id={self.location_1.id}")
+        self.assertEqual(response.status_code, 400)
+
+    def test_price_basket_locations(self):
+        response = self.client.get(
+            self.url
+            + f"?product_code={self.product_codes}"
+            + f"&location_id={self.location_1.id},{self.location_2.id}"
+        )
+        self.assertEqual(response.status_code, 200)
+        items = response.data["items"]
+        self.assertEqual(
+            [item["location"]["id"] for item in items],
+            [self.location_2.id, self.location_1.id],  # best coverage first
+        )
+        self.assertEqual(items[0]["total"], Decimal("16.00"))
+        self.assertEqual(items[0]["product_count"], 3)
+        self.assertEqual(items[0]["coverage"], 1)
+        self.assertEqual(
+            items[1]["total"], Decimal("7.00")
+        )  # latest price of product 1
+        self.assertEqual(items[1]["missing_product_codes"], [self.product_3.code])
+
+    def test_price_basket_radius(self):
+        response = self.client.get(
+            self.url
+            + f"?product_code={self.product_1.code}"
+            + "&lat=48.8584&lon=2.2945&radius_km=10"
+        )
+        self.assertEqual(response.status_code, 200)
+        items = response.data["items"]
+        # Lyon is out of the radius, the cheapest store first
+        self.assertEqual(
+            [item["location"]["id"] for item in items],
+            [self.location_2.id, self.location_1.id],
+        )
+        self.assertLess(items[0]["distance_km"], items[1]["distance_km"])
+
+
 class PriceStatsApiTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -728,6 +984,9 @@ class PriceStatsApiTest(TestCase):
             price_per=price_constants.PRICE_PER_KILOGRAM,
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_price_stats(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
@@ -745,3 +1004,44 @@ class PriceStatsApiTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["price__count"], 2)
         self.assertEqual(response.data["price__avg"], Decimal(27.50))
+
+    def test_price_stats_distribution(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["price__median"], Decimal("20.00"))
+        self.assertEqual(response.data["price__p10"], Decimal("5.90"))
+        self.assertEqual(response.data["price__p90"], Decimal("28.50"))
+        histogram = response.data["price__histogram"]
+        self.assertEqual(len(histogram), price_constants.PRICE_STATS_HISTOGRAM_BINS)
+        self.assertEqual(histogram[0]["min"], Decimal("2.00"))
+        self.assertEqual(histogram[-1]["max"], Decimal("30.00"))
+        self.assertEqual(
+            [bucket["count"] for bucket in histogram], [1, 0, 0, 0, 1, 0, 0, 0, 1, 1]
+        )
+        # no prices
+        response = self.client.get(self.url + "?currency=USD")
+        self.assertEqual(response.data["price__count"], 0)
+        self.assertIsNone(response.data["price__median"])
+        self.assertEqual(response.data["price__histogram"], [])
+
+    def test_price_stats_unit_price(self):
+        response = self.client.get(self.url + "?unit_price_unit=KILOGRAM")
+        self.assertEqual(response.data["price__count"], 1)  # apples
+        self.assertEqual(response.data["unit_price__count"], 1)
+        self.assertEqual(response.data["unit_price__median"], Decimal("2.00"))
+
+    def test_price_stats_cache(self):
+        url = self.url + f"?product_code={self.product.code}&page=2"
+        response = self.client.get(url)
+        self.assertEqual(response.data["price__count"], 3)
+        # same filters (normalized): cached
+        # (2 cache table lookups: version & key, no stats query)
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.url + f"?page=1&product_code={self.product.code}"
+            )
+        self.assertEqual(response.data["price__count"], 3)
+        # a new price invalidates the cache
+        PriceFactory(product_code=self.product.code, price=10)
+        response = self.client.get(url)
+        self.assertEqual(response.data["price__count"], 4)
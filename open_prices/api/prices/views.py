@@ -1,22 +1,38 @@
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Q
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.request import Request
 from rest_framework.response import Response
 
 from open_prices.api.prices.filters import PriceFilter
 from open_prices.api.prices.serializers import (
+    PriceBasketQuerySerializer,
+    PriceBasketSerializer,
+    PriceChangesQuerySerializer,
+    PriceChangesSerializer,
     PriceCreateSerializer,
+    PriceDeletedSerializer,
+    PriceDistributionStatsSerializer,
     PriceFullSerializer,
-    PriceStatsSerializer,
+    PriceLatestQuerySerializer,
+    PriceSerializer,
     PriceUpdateSerializer,
+    price_full_values_serializer,
 )
-from open_prices.api.utils import get_source_from_request
+from open_prices.api.utils import decode_cursor, encode_cursor, get_source_from_request
 from open_prices.common.authentication import CustomAuthentication
+from open_prices.common.models import DeletedObject
+from open_prices.locations.models import Location
 from open_prices.prices import constants as price_constants
-from open_prices.prices.models import Price
+from open_prices.prices import utils as price_utils
+from open_prices.prices.models import LatestPrice, Price
 
 
 class PriceViewSet(
@@ -34,7 +50,14 @@ class PriceViewSet(
     serializer_class = PriceFullSerializer  # see get_serializer_class
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_class = PriceFilter
-    ordering_fields = ["price", "date", "created"]
+    ordering_fields = [
+        "price",
+        "unit_price",
+        "price_eur",
+        "date",
+        "created",
+        "updated",
+    ]
     ordering = ["created"]
 
     def get_authenticators(self):
@@ -58,6 +81,21 @@ class PriceViewSet(
             return PriceUpdateSerializer
         return self.serializer_class
 
+    def list(self, request: Request, *args, **kwargs):
+        """
+        Same output as PriceFullSerializer, rendered from values() rows
+        (see ValuesSerializer)
+        """
+        queryset = price_full_values_serializer.values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                price_full_values_serializer.to_representation(page)
+            )
+        return Response(price_full_values_serializer.to_representation(queryset))
+
     def create(self, request: Request, *args, **kwargs):
         # validate
         serializer = self.get_serializer(data=request.data)
@@ -79,8 +117,151 @@ class PriceViewSet(
             self.serializer_class(price).data, status=status.HTTP_201_CREATED
         )
 
-    @extend_schema(responses=PriceStatsSerializer, filters=True)
+    @extend_schema(responses=PriceDistributionStatsSerializer, filters=True)
     @action(detail=False, methods=["GET"])
     def stats(self, request: Request) -> Response:
-        qs = self.filter_queryset(self.get_queryset())
-        return Response(qs.calculate_stats(), status=200)
+        """
+        Price statistics (count, min, max, avg, median, p10, p90 & histogram)
+        The results are cached per filter set (invalidated on price changes).
+        """
+        cache_key = price_utils.get_price_stats_cache_key(request.query_params)
+        stats = cache.get(cache_key)
+        if stats is None:
+            qs = self.filter_queryset(self.get_queryset())
+            stats = qs.calculate_distribution_stats()
+            cache.set(cache_key, stats, price_constants.PRICE_STATS_CACHE_TIMEOUT)
+        return Response(stats, status=200)
+
+    @extend_schema(
+        parameters=[PriceBasketQuerySerializer], responses=PriceBasketSerializer
+    )
+    @action(detail=False, methods=["GET"])
+    def basket(self, request: Request) -> Response:
+        """
+        Compare the price of a basket of products across stores,
+        using the latest price of each product at each store.
+        The stores: a list of location_id, or the (max 50) closest locations
+        within radius_km of lat & lon.
+        Returns the total & coverage of each store, the stores covering the
+        most products first, then the cheapest.
+        """
+        query_serializer = PriceBasketQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        data = query_serializer.validated_data
+        distances = dict()
+        if data.get("location_id"):
+            location_ids = data["location_id"]
+        else:
+            distances = dict(
+                Location.objects.closest(
+                    data["lat"], data["lon"], data["radius_km"], limit=50
+                )
+            )
+            location_ids = list(distances)
+        stores = LatestPrice.objects.compare_basket(data["product_code"], location_ids)
+        location_dict = Location.objects.in_bulk(
+            [store["location_id"] for store in stores]
+        )
+        for store in stores:
+            store["location"] = location_dict[store.pop("location_id")]
+            if distances:
+                store["distance_km"] = round(distances[store["location"].id], 3)
+        return Response(PriceBasketSerializer({"items": stores}).data, status=200)
+
+    @extend_schema(
+        parameters=[PriceLatestQuerySerializer],
+        responses=PriceFullSerializer(many=True),
+    )
+    @action(detail=False, methods=["GET"])
+    def latest(self, request: Request) -> Response:
+        """
+        Latest price of many products (or categories) at many locations,
+        in a single call: one item per (product or category, location).
+        Filters (comma-separated lists): product_code OR category_tag,
+        AND location_id.
+        Paginated (page & size), as the list endpoint.
+        """
+        query_serializer = PriceLatestQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        latest_price_qs = LatestPrice.objects.all()
+        product_query = Q()
+        if "product_code" in query_serializer.validated_data:
+            product_query |= Q(
+                product__code__in=query_serializer.validated_data["product_code"]
+            )
+        if "category_tag" in query_serializer.validated_data:
+            product_query |= Q(
+                category_tag__in=query_serializer.validated_data["category_tag"]
+            )
+        latest_price_qs = latest_price_qs.filter(product_query)
+        if "location_id" in query_serializer.validated_data:
+            latest_price_qs = latest_price_qs.filter(
+                location_id__in=query_serializer.validated_data["location_id"]
+            )
+        prices = (
+            self.queryset.select_related("product", "location", "proof")
+            .filter(id__in=latest_price_qs.values("price_id"))
+            .order_by("location_id", "product_id", "category_tag", "id")
+        )
+        page = self.paginate_queryset(prices)
+        return self.get_paginated_response(PriceFullSerializer(page, many=True).data)
+
+    @extend_schema(
+        parameters=[PriceChangesQuerySerializer], responses=PriceChangesSerializer
+    )
+    @action(detail=False, methods=["GET"])
+    def changes(self, request: Request) -> Response:
+        """
+        Change feed, for incremental synchronization:
+        - items: prices created or updated after the cursor
+        - deleted: prices deleted after the cursor (tombstones)
+        - cursor: to pass in the next call (opaque)
+        Without cursor, the feed starts at `since` (or at the beginning).
+        Prices are ordered by (updated, id), tombstones by their log id.
+        """
+        query_serializer = PriceChangesQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        size = query_serializer.validated_data["size"]
+        if "cursor" in query_serializer.validated_data:
+            cursor = decode_cursor(query_serializer.validated_data["cursor"])
+        else:
+            since = query_serializer.validated_data.get(
+                "since", datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+            )
+            cursor = {
+                "updated": since.isoformat(),
+                "id": 0,
+                "deleted_id": DeletedObject.objects.filter(deleted__lt=since)
+                .order_by("-id")
+                .values_list("id", flat=True)
+                .first()
+                or 0,
+            }
+        try:
+            price_qs = Price.objects.changed_after(
+                datetime.datetime.fromisoformat(cursor["updated"]), int(cursor["id"])
+            )
+            deleted_qs = DeletedObject.objects.has_table_name(
+                Price._meta.db_table
+            ).deleted_after(int(cursor["deleted_id"]))
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError({"cursor": ["Invalid cursor."]})
+        # fetch one extra row to know if there are more changes
+        prices = list(price_qs[: size + 1])
+        deleted_objects = list(deleted_qs[: size + 1])
+        has_more = len(prices) > size or len(deleted_objects) > size
+        prices, deleted_objects = prices[:size], deleted_objects[:size]
+        if prices:
+            cursor["updated"] = prices[-1].updated.isoformat()
+            cursor["id"] = prices[-1].id
+        if deleted_objects:
+            cursor["deleted_id"] = deleted_objects[-1].id
+        return Response(
+            {
+                "items": PriceSerializer(prices, many=True).data,
+                "deleted": PriceDeletedSerializer(deleted_objects, many=True).data,
+                "cursor": encode_cursor(cursor),
+                "has_more": has_more,
+            },
+            status=200,
+        )
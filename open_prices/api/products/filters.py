@@ -1,4 +1,6 @@
 import django_filters
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
 
 from open_prices.products.models import Product
 
@@ -28,14 +30,47 @@ class ProductFilter(django_filters.FilterSet):
     price_count__lte = django_filters.NumberFilter(
         field_name="price_count", lookup_expr="lte"
     )
+    price_summaries__currency = django_filters.CharFilter(
+        field_name="price_summaries__currency"
+    )
 
     class Meta:
         model = Product
         fields = [
             "code",
+            "code_type",
+            "code_normalized",
+            "code_has_valid_check_digit",
             "source",
             "nutriscore_grade",
             "ecoscore_grade",
             "nova_group",
             "price_count",
         ]
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    A product has one price summary per currency: the price summary
+    orderings (price_summaries__*) would return each product once per
+    currency, so they require the price_summaries__currency filter.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if (
+            ordering
+            and not request.query_params.get("price_summaries__currency")
+            and any(
+                field.lstrip("-").startswith("price_summaries__") for field in ordering
+            )
+        ):
+            raise ValidationError(
+                {
+                    self.ordering_param: [
+                        "Ordering by price summary requires the "
+                        "price_summaries__currency filter."
+                    ]
+                }
+            )
+        return ordering
@@ -1,9 +1,19 @@
 from rest_framework import serializers
 
-from open_prices.products.models import Product
+from open_prices.products.models import Product, ProductPriceSummary
 
 
 class ProductFullSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = "__all__"
+
+
+class ProductPriceSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductPriceSummary
+        exclude = ["id", "product"]
+
+
+class ProductWithPriceSummariesSerializer(ProductFullSerializer):
+    price_summaries = ProductPriceSummarySerializer(many=True, read_only=True)
@@ -1,6 +1,7 @@
 from django.test import TestCase
 from django.urls import reverse
 
+from open_prices.prices.factories import PriceFactory
 from open_prices.products.factories import ProductFactory
 
 PRODUCT_8001505005707 = {
@@ -45,6 +46,47 @@ class ProductListOrderApiTest(TestCase):
         self.assertEqual(response.data["items"][0]["price_count"], 50)
 
 
+class ProductListPriceSummaryApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("api:products-list")
+        cls.product_1 = ProductFactory()
+        cls.product_2 = ProductFactory()
+        for product, price, currency in [
+            (cls.product_1, 10, "EUR"),
+            (cls.product_1, 1, "USD"),
+            (cls.product_2, 5, "EUR"),
+            (cls.product_2, 7, "EUR"),
+        ]:
+            PriceFactory(product_code=product.code, price=price, currency=currency)
+
+    def test_product_list_price_summaries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["total"], 2)
+        price_summaries = response.data["items"][0]["price_summaries"]
+        self.assertEqual(
+            sorted(summary["currency"] for summary in price_summaries),
+            ["EUR", "USD"],
+        )
+
+    def test_product_list_order_by_price_summary(self):
+        url = (
+            self.url
+            + "?price_summaries__currency=EUR&order_by=price_summaries__price_min"
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.data["total"], 2)
+        self.assertEqual(
+            [item["id"] for item in response.data["items"]],
+            [self.product_2.id, self.product_1.id],
+        )
+        # without currency: each product would be returned once per currency
+        url = self.url + "?order_by=-price_summaries__price_min"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("order_by", response.data)
+
+
 class ProductListFilterApiTest(TestCase):
     @classmethod
     def setUpTestData(cls):
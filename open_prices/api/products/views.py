@@ -1,11 +1,11 @@
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, mixins, viewsets
+from rest_framework import mixins, viewsets
 from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from open_prices.api.products.filters import ProductFilter
-from open_prices.api.products.serializers import ProductFullSerializer
+from open_prices.api.products.filters import ProductFilter, ProductOrderingFilter
+from open_prices.api.products.serializers import ProductWithPriceSummariesSerializer
 from open_prices.api.utils import get_object_or_drf_404
 from open_prices.products.models import Product
 
@@ -13,11 +13,22 @@ from open_prices.products.models import Product
 class ProductViewSet(
     mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
 ):
-    queryset = Product.objects.all()
-    serializer_class = ProductFullSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    queryset = Product.objects.prefetch_related("price_summaries")
+    serializer_class = ProductWithPriceSummariesSerializer
+    filter_backends = [DjangoFilterBackend, ProductOrderingFilter]
     filterset_class = ProductFilter
-    ordering_fields = Product.OFF_SCORE_FIELDS + Product.COUNT_FIELDS + ["created"]
+    # price summary ordering: requires a currency filter
+    # (price_summaries__currency), to get one summary per product
+    ordering_fields = (
+        Product.OFF_SCORE_FIELDS
+        + Product.COUNT_FIELDS
+        + ["created"]
+        + [
+            f"price_summaries__{field}"
+            for field in ["price_min", "price_max", "price_avg", "price_median"]
+        ]
+        + ["price_summaries__last_price_date"]
+    )
     ordering = ["created"]
 
     @action(detail=False, methods=["GET"], url_path=r"code/(?P<code>\d+)")
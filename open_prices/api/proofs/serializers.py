@@ -34,7 +34,7 @@ class ProofSerializer(serializers.ModelSerializer):
     class Meta:
         model = Proof
         # fields = "__all__"
-        exclude = ["location"]
+        exclude = ["location"] + Proof.PRIVATE_FIELDS
 
 
 class ProofHalfFullSerializer(ProofSerializer):
@@ -42,7 +42,7 @@ class ProofHalfFullSerializer(ProofSerializer):
 
     class Meta:
         model = Proof
-        fields = "__all__"
+        exclude = Proof.PRIVATE_FIELDS
 
 
 class ProofFullSerializer(ProofSerializer):
@@ -51,7 +51,7 @@ class ProofFullSerializer(ProofSerializer):
 
     class Meta:
         model = Proof
-        fields = "__all__"
+        exclude = Proof.PRIVATE_FIELDS
 
 
 class ProofUploadSerializer(serializers.ModelSerializer):
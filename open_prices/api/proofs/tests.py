@@ -1,3 +1,4 @@
+import os
 from decimal import Decimal
 from io import BytesIO
 
@@ -305,6 +306,34 @@ class ProofCreateApiTest(TestCase):
                 self.assertEqual(response.data["source"], result)
                 self.assertEqual(Proof.objects.last().source, result)
 
+    def test_proof_create_duplicate_file(self):
+        response_1 = self.client.post(
+            self.url, {**self.data, "file": create_fake_image()}
+        )
+        self.assertEqual(response_1.status_code, 201)
+        # internal field: not exposed
+        self.assertNotIn("image_sha256", response_1.data)
+        self.assertEqual(
+            len(Proof.objects.get(id=response_1.data["id"]).image_sha256), 64
+        )
+        # same content: the stored file is reused
+        response_2 = self.client.post(
+            self.url, {**self.data, "file": create_fake_image()}
+        )
+        self.assertEqual(response_2.status_code, 201)
+        self.assertNotEqual(response_2.data["id"], response_1.data["id"])
+        self.assertEqual(response_2.data["file_path"], response_1.data["file_path"])
+        self.assertEqual(
+            Proof.objects.get(id=response_2.data["id"]).image_sha256,
+            Proof.objects.get(id=response_1.data["id"]).image_sha256,
+        )
+        # the shared file is only removed with the last proof
+        proof_1 = Proof.objects.get(id=response_1.data["id"])
+        proof_1.delete()
+        self.assertTrue(os.path.exists(proof_1.file_path_full))
+        Proof.objects.get(id=response_2.data["id"]).delete()
+        self.assertFalse(os.path.exists(proof_1.file_path_full))
+
 
 class ProofUpdateApiTest(TestCase):
     @classmethod
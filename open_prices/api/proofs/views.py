@@ -101,11 +101,15 @@ class ProofViewSet(
                 {"file": ["This field is required."]},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        file_path, mimetype, image_thumb_path = store_file(request.data.get("file"))
+        file_path, mimetype, image_thumb_path, image_sha256, image_phash = store_file(
+            request.data.get("file")
+        )
         proof_create_data = {
             "file_path": file_path,
             "mimetype": mimetype,
             "image_thumb_path": image_thumb_path,
+            "image_sha256": image_sha256,
+            "image_phash": image_phash,
             **{
                 key: request.data.get(key)
                 for key in Proof.CREATE_FIELDS
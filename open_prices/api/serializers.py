@@ -1,5 +1,96 @@
+import functools
+
 from rest_framework import serializers
 
+# fields whose to_representation returns the DB value unchanged
+IDENTITY_FIELD_CLASSES = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+)
+
 
 class StatusSerializer(serializers.Serializer):
     status = serializers.CharField()
+
+
+class ValuesSerializer:
+    """
+    Read-only, high-throughput version of a ModelSerializer (for list
+    endpoints): the rows are fetched with values() (only the serialized
+    columns, no model instances), and rendered with converters compiled
+    once from the serializer fields.
+    Same output as serializer_class(queryset, many=True).data
+    Supports nested (single object) serializers, not many=True ones.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @functools.cached_property
+    def compiled(self):
+        paths = []
+        fields = self.compile_fields(self.serializer_class(), "", paths)
+        return fields, paths
+
+    def compile_fields(self, serializer, prefix, paths):
+        """
+        :return: (field_name, values() path, converter, nested fields) tuples
+        """
+        fields = []
+        for field in serializer._readable_fields:
+            if (
+                isinstance(field, serializers.ListSerializer)
+                or field.source == "*"
+                or "." in field.source
+            ):
+                raise ValueError(f"Unsupported field: {field.field_name}")
+            path = f"{prefix}{field.source}"
+            if isinstance(field, serializers.BaseSerializer):
+                # the related pk: None if there is no related object
+                pk_path = f"{path}__{field.Meta.model._meta.pk.name}"
+                paths.append(pk_path)
+                nested_fields = self.compile_fields(field, f"{path}__", paths)
+                fields.append((field.field_name, pk_path, None, nested_fields))
+                continue
+            paths.append(path)
+            fields.append((field.field_name, path, self.get_converter(field), None))
+        return fields
+
+    def get_converter(self, field):
+        if isinstance(field, serializers.MultipleChoiceField):
+            return field.to_representation
+        if isinstance(field, IDENTITY_FIELD_CLASSES):
+            return None
+        if isinstance(field, serializers.ListField) and isinstance(
+            field.child, IDENTITY_FIELD_CLASSES
+        ):
+            return None
+        # dates, decimals...
+        return field.to_representation
+
+    def values(self, queryset):
+        """The queryset rows, with only the serialized columns"""
+        return queryset.values(*self.compiled[1])
+
+    def to_representation(self, rows) -> list[dict]:
+        fields = self.compiled[0]
+        return [self.render(row, fields) for row in rows]
+
+    def render(self, row, fields) -> dict:
+        data = {}
+        for field_name, path, converter, nested_fields in fields:
+            value = row[path]
+            if value is None:
+                data[field_name] = None
+            elif nested_fields is not None:
+                data[field_name] = self.render(row, nested_fields)
+            elif converter is None:
+                data[field_name] = value
+            else:
+                data[field_name] = converter(value)
+        return data
@@ -1,4 +1,8 @@
+import base64
+import json
+
 from django.http import Http404
+from rest_framework.exceptions import ValidationError
 
 
 def get_object_or_drf_404(model, **kwargs):
@@ -20,3 +24,14 @@ def get_source_from_request(request):
     if app_page:
         app_name += f" - {app_page}"
     return app_name
+
+
+def encode_cursor(cursor_dict):
+    return base64.urlsafe_b64encode(json.dumps(cursor_dict).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError):
+        raise ValidationError({"cursor": ["Invalid cursor."]})
@@ -13,3 +13,10 @@ SOURCE_MOBILE = "MOBILE"  # Smoothie - OpenFoodFacts
 SOURCE_API = "API"  # API
 SOURCE_OTHER = "OTHER"  # None, MyMeals
 SOURCE_LIST = [SOURCE_WEB, SOURCE_MOBILE, SOURCE_API, SOURCE_OTHER]
+SOURCE_CHOICES = [(key, key) for key in SOURCE_LIST]
+# (substring of the raw source, source category), first match wins
+SOURCE_CATEGORY_MATCH_LIST = [
+    ("Open Prices Web App", SOURCE_WEB),
+    ("Smoothie", SOURCE_MOBILE),
+    ("API", SOURCE_API),
+]
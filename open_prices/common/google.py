@@ -9,6 +9,10 @@ GOOGLE_CLOUD_VISION_OCR_FEATURES = [
     "SAFE_SEARCH_DETECTION",
     "FACE_DETECTION",
 ]
+# max number of images per images:annotate request (Cloud Vision limit)
+GOOGLE_CLOUD_VISION_OCR_MAX_BATCH_SIZE = 16
+# images are downscaled to this max edge (in pixels) before upload
+GOOGLE_CLOUD_VISION_OCR_MAX_IMAGE_SIZE = 2048
 GEMINI_MODEL_NAME = "gemini"
 GEMINI_MODEL_VERSION = "gemini-1.5-flash"
 
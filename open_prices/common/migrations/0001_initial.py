@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="DeletedObject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("table_name", models.CharField(max_length=20)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("deleted", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Deleted object",
+                "verbose_name_plural": "Deleted objects",
+                "db_table": "deleted_objects",
+                "indexes": [
+                    models.Index(
+                        fields=["table_name", "deleted", "object_id"],
+                        name="deleted_obj_table_n_0e08ad_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import models
+from django.utils import timezone
+
+
+class DeletedObjectQuerySet(models.QuerySet):
+    def has_table_name(self, table_name):
+        return self.filter(table_name=table_name)
+
+    def deleted_after(self, id):
+        return self.filter(id__gt=id).order_by("id")
+
+    def deleted_between(self, since, until):
+        return self.filter(deleted__gte=since, deleted__lt=until)
+
+
+class DeletedObject(models.Model):
+    """
+    A log of deleted rows ("tombstones"), so that the daily delta dumps
+    can tell mirrors which rows to remove.
+    """
+
+    table_name = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+
+    deleted = models.DateTimeField(default=timezone.now)
+
+    objects = models.Manager.from_queryset(DeletedObjectQuerySet)()
+
+    class Meta:
+        db_table = "deleted_objects"
+        indexes = [models.Index(fields=["table_name", "deleted", "object_id"])]
+        verbose_name = "Deleted object"
+        verbose_name_plural = "Deleted objects"
+
+    def __str__(self):
+        return f"{self.table_name} - {self.object_id}"
@@ -133,8 +133,16 @@ def import_product_db(
     :param batch_size: the number of products to create/update in a single
       transaction, defaults to 1000
     """
+    from open_prices.prices.models import Price
     from open_prices.products.models import Product
 
+    def update_unit_prices(products_to_create, products_to_update):
+        # the product quantities may have changed
+        Price.objects.filter(
+            Q(product__code__in=[product.code for product in products_to_create])
+            | Q(product_id__in=[product.id for product in products_to_update])
+        ).update_unit_prices()
+
     print((f"Launching import_product_db (flavor={flavor}, obsolete={obsolete})"))
     existing_product_codes = set(Product.objects.values_list("code", flat=True))
     existing_product_flavor_codes = set(
@@ -210,7 +218,9 @@ def import_product_db(
         # Case 1: new OFF product (not in OP database)
         if product_code not in existing_product_codes:
             product_dict["code"] = product_code
-            products_to_create.append(Product(**product_dict))
+            product = Product(**product_dict)
+            product.set_barcode_fields()  # bulk_create skips Product.save()
+            products_to_create.append(product)
             existing_product_codes.add(product_code)
             added_count += 1
 
@@ -252,6 +262,7 @@ def import_product_db(
                 products_to_update,
                 fields=OFF_UPDATE_FIELDS,
             )
+            update_unit_prices(products_to_create, products_to_update)
             print(f"Products: {added_count} added, {updated_count} updated")
             products_to_create = list()
             products_to_update = list()
@@ -267,4 +278,5 @@ def import_product_db(
         products_to_update,
         fields=OFF_UPDATE_FIELDS,
     )
+    update_unit_prices(products_to_create, products_to_update)
     print(f"Products: {added_count} added, {updated_count} updated. Done!")
@@ -1,7 +1,11 @@
+import datetime
+import json
 import os
+import shutil
 from pathlib import Path
 
 from django.conf import settings
+from django.utils import timezone
 from django_q.models import Schedule
 from django_q.tasks import schedule
 from openfoodfacts import Flavor
@@ -10,7 +14,12 @@ from open_prices.api.locations.serializers import LocationSerializer
 from open_prices.api.prices.serializers import PriceSerializer
 from open_prices.api.proofs.serializers import ProofSerializer
 from open_prices.common.openfoodfacts import import_product_db
-from open_prices.common.utils import export_model_to_jsonl_gz
+from open_prices.common.utils import (
+    export_deletions_to_jsonl_gz,
+    export_model_delta_to_jsonl_gz,
+    export_model_to_jsonl_gz,
+    export_model_to_parquet,
+)
 from open_prices.locations.models import Location
 from open_prices.moderation import rules as moderation_rules
 from open_prices.prices.models import Price
@@ -75,6 +84,26 @@ def update_product_counts_task():
         product.update_proof_count()
 
 
+def update_product_price_summaries_task():
+    """
+    Rebuild all product price summaries (also used as backfill)
+    """
+    product_ids = list(
+        Product.objects.has_prices().order_by("id").values_list("id", flat=True)
+    )
+    for i in range(0, len(product_ids), 1000):
+        Product.objects.filter(
+            id__in=product_ids[i : i + 1000]
+        ).update_price_summaries()
+
+
+def update_price_outliers_task():
+    """
+    Score the new prices (and rescore their groups)
+    """
+    Price.objects.filter(price_is_outlier=None).update_outliers()
+
+
 def update_user_counts_task():
     """
     Update all user field counts
@@ -111,20 +140,105 @@ def moderation_tasks():
     moderation_rules.cleanup_products_with_invalid_barcodes()
 
 
+DUMP_DB_TABLES = (
+    ("prices", Price, PriceSerializer),
+    ("proofs", Proof, ProofSerializer),
+    ("locations", Location, LocationSerializer),
+)
+DUMP_DB_DELTA_RETENTION_COUNT = 30
+
+
+def dump_db_delta(output_dir, since, until):
+    """
+    Dump the rows created/updated (and the rows deleted) between 2 dumps
+    Return the manifest entry of the delta
+    """
+    delta_dir_name = f"deltas/{until:%Y-%m-%dT%H%M%S}"
+    delta_dir = output_dir / delta_dir_name
+    delta_dir.mkdir(parents=True, exist_ok=True)
+
+    for table_name, model_class, schema_class in DUMP_DB_TABLES:
+        export_model_delta_to_jsonl_gz(
+            table_name, model_class, schema_class, delta_dir, since, until
+        )
+    export_deletions_to_jsonl_gz(
+        [model_class._meta.db_table for _, model_class, _ in DUMP_DB_TABLES],
+        delta_dir,
+        since,
+        until,
+    )
+
+    return {
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "files": sorted(
+            f"{delta_dir_name}/{path.name}" for path in delta_dir.iterdir()
+        ),
+    }
+
+
 def dump_db_task():
     """
     Dump the database as JSONL files to the data directory
+    Also dump it as Parquet files (columnar, with the products table)
+
+    Alongside the full snapshot, a delta is dumped (rows created/updated
+    since the previous dump + deletion log), and a manifest.json file lists
+    the snapshot & the deltas, so that mirrors can sync incrementally.
     """
     output_dir = Path(os.path.join(settings.BASE_DIR, "data"))
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    for table_name, model_class, schema_class in (
-        ("prices", Price, PriceSerializer),
-        ("proofs", Proof, ProofSerializer),
-        ("locations", Location, LocationSerializer),
-    ):
+    manifest_path = output_dir / "manifest.json"
+    manifest = {"snapshot": None, "deltas": []}
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+    dump_created = timezone.now()
+
+    # delta since the previous snapshot
+    if manifest["snapshot"]:
+        previous_dump_created = datetime.datetime.fromisoformat(
+            manifest["snapshot"]["created"]
+        )
+        manifest["deltas"].append(
+            dump_db_delta(output_dir, previous_dump_created, dump_created)
+        )
+        # only keep the most recent deltas
+        for delta in manifest["deltas"][:-DUMP_DB_DELTA_RETENTION_COUNT]:
+            delta_dir = output_dir / delta["files"][0].rsplit("/", 1)[0]
+            shutil.rmtree(delta_dir, ignore_errors=True)
+        manifest["deltas"] = manifest["deltas"][-DUMP_DB_DELTA_RETENTION_COUNT:]
+
+    # full snapshot
+    for table_name, model_class, schema_class in DUMP_DB_TABLES:
         export_model_to_jsonl_gz(table_name, model_class, schema_class, output_dir)
 
+    for table_name, model_class, dictionary_columns in (
+        (
+            "prices",
+            Price,
+            ["type", "category_tag", "price_per", "currency", "location_osm_type"],
+        ),
+        ("proofs", Proof, ["type", "currency", "location_osm_type"]),
+        (
+            "locations",
+            Location,
+            ["type", "osm_type", "osm_address_country", "osm_address_country_code"],
+        ),
+        ("products", Product, ["source", "nutriscore_grade", "ecoscore_grade"]),
+    ):
+        export_model_to_parquet(table_name, model_class, output_dir, dictionary_columns)
+
+    manifest["snapshot"] = {
+        "created": dump_created.isoformat(),
+        "files": sorted(
+            path.name
+            for path in output_dir.iterdir()
+            if path.name.endswith((".jsonl.gz", ".parquet"))
+        ),
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
 
 CRON_SCHEDULES = {
     "import_obf_db_task": "0 15 * * *",  # daily at 15:00
@@ -134,9 +248,11 @@ CRON_SCHEDULES = {
     "update_total_stats_task": "0 1 * * *",  # daily at 01:00
     "fix_proof_fields_task": "10 1 * * *",  # daily at 01:10
     "moderation_tasks": "20 1 * * *",  # daily at 01:20
+    "update_price_outliers_task": "30 1 * * *",  # daily at 01:30
     "update_user_counts_task": "0 2 * * 1",  # every start of the week
     "update_location_counts_task": "10 2 * * 1",  # every start of the week
     "update_product_counts_task": "20 2 * * 1",  # every start of the week
+    "update_product_price_summaries_task": "30 2 * * 1",  # every start of the week
     "dump_db_task": "0 23 * * *",  # daily at 23:00
 }
 
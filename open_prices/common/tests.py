@@ -1,14 +1,31 @@
+import datetime
+import gzip
+import json
+import tempfile
 from decimal import Decimal
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from django.test import TestCase
 
+from open_prices.api.prices.serializers import PriceSerializer
+from open_prices.common.models import DeletedObject
 from open_prices.common.utils import (
+    export_deletions_to_jsonl_gz,
+    export_model_delta_to_jsonl_gz,
+    export_model_to_parquet,
     is_float,
     match_decimal_with_float,
+    max_score_assignment,
     truncate_decimal,
     url_add_missing_https,
     url_keep_only_domain,
 )
+from open_prices.prices.factories import PriceFactory
+from open_prices.prices.models import Price
+from open_prices.proofs.factories import ProofFactory
+from open_prices.proofs.models import Proof
 
 
 class UtilsTest(TestCase):
@@ -36,6 +53,19 @@ class UtilsTest(TestCase):
         self.assertTrue(match_decimal_with_float(Decimal("1.0"), 1.0))
         self.assertTrue(match_decimal_with_float(Decimal("1.0"), 1.00))
 
+    def test_max_score_assignment(self):
+        self.assertEqual(max_score_assignment(np.zeros((0, 3))), [])
+        # a greedy assignment would pick (0, 0) and leave row 1 unassigned
+        self.assertEqual(
+            max_score_assignment([[3, 2], [3, 0]]),
+            [(0, 1), (1, 0)],
+        )
+        # more rows than columns, zero scores are not assigned
+        self.assertEqual(
+            max_score_assignment([[1, 0], [0, 0], [5, 0]]),
+            [(2, 0)],
+        )
+
     def url_add_missing_https(self):
         self.assertEqual(
             url_add_missing_https("http://abc.hostname.com/somethings/anything/"),
@@ -67,3 +97,70 @@ class UtilsTest(TestCase):
             url_keep_only_domain("abc.hostname.com"),
             "https://abc.hostname.com",
         )
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for created in ["2024-12-31", "2025-01-01", "2025-01-15", "2025-02-01"]:
+            PriceFactory(
+                price=Decimal("1.50"),
+                currency="EUR",
+                created=datetime.datetime.fromisoformat(f"{created}T12:00:00Z"),
+            )
+
+    def test_export_model_to_parquet(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            export_model_to_parquet(
+                "prices", Price, tmpdirname, dictionary_columns=["currency"]
+            )
+            parquet_file = pq.ParquetFile(f"{tmpdirname}/prices.parquet")
+            # one row group per month
+            self.assertEqual(parquet_file.metadata.num_rows, 4)
+            self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+            self.assertEqual(parquet_file.metadata.row_group(1).num_rows, 2)
+            # typed columns
+            table = parquet_file.read(columns=["price", "currency", "product_id"])
+            self.assertEqual(table.schema.field("price").type, pa.decimal128(10, 2))
+            self.assertEqual(table.column("price")[0].as_py(), Decimal("1.50"))
+            self.assertEqual(table.column("currency")[0].as_py(), "EUR")
+            self.assertIsNotNone(table.column("product_id")[0].as_py())
+            # dictionary-encoded column
+            column_metadata = parquet_file.metadata.row_group(0).column(
+                parquet_file.schema_arrow.get_field_index("currency")
+            )
+            self.assertIn("RLE_DICTIONARY", column_metadata.encodings)
+
+    def test_export_model_to_parquet_private_fields(self):
+        ProofFactory(image_sha256="a" * 64, image_phash="b" * 16)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            export_model_to_parquet("proofs", Proof, tmpdirname)
+            schema = pq.read_schema(f"{tmpdirname}/proofs.parquet")
+        self.assertIn("file_path", schema.names)
+        for field_name in Proof.PRIVATE_FIELDS:
+            self.assertNotIn(field_name, schema.names)
+
+    def test_export_model_delta_to_jsonl_gz(self):
+        since = datetime.datetime.now(datetime.timezone.utc)
+        price_updated = Price.objects.first()
+        price_updated.receipt_quantity = 2
+        price_updated.save()
+        price_deleted = Price.objects.last()
+        price_deleted_id = price_deleted.id
+        price_deleted.delete()
+        until = datetime.datetime.now(datetime.timezone.utc)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            export_model_delta_to_jsonl_gz(
+                "prices", Price, PriceSerializer, tmpdirname, since, until
+            )
+            with gzip.open(f"{tmpdirname}/prices.jsonl.gz", "rt") as f:
+                rows = [json.loads(line) for line in f]
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]["id"], price_updated.id)
+            export_deletions_to_jsonl_gz(["prices"], tmpdirname, since, until)
+            with gzip.open(f"{tmpdirname}/deletions.jsonl.gz", "rt") as f:
+                rows = [json.loads(line) for line in f]
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]["table_name"], "prices")
+            self.assertEqual(rows[0]["object_id"], price_deleted_id)
+        self.assertEqual(DeletedObject.objects.has_table_name("prices").count(), 1)
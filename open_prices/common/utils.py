@@ -1,11 +1,22 @@
 import gzip
+import hashlib
 import json
 import os
 from decimal import Decimal
 from urllib.parse import urlparse
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import tqdm
+from django.contrib.postgres.fields import ArrayField
 from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from open_prices.common import constants
+from open_prices.common.models import DeletedObject
+
+EARTH_RADIUS_KM = 6371.0
 
 
 def is_float(string):
@@ -31,6 +42,111 @@ def match_decimal_with_float(price_decimal: Decimal, price_float: float) -> bool
     return float(price_decimal) == price_float
 
 
+def max_score_assignment(scores: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Find the one-to-one assignment of rows to columns maximizing the total
+    score (Hungarian algorithm, O(n^2 * m)).
+    Pairs with a score <= 0 are not returned.
+    Returns the list of (row, column) pairs.
+    """
+    scores = np.asarray(scores, dtype=float)
+    if scores.size == 0:
+        return []
+    # the algorithm assigns each row: we need n_rows <= n_cols
+    transposed = scores.shape[0] > scores.shape[1]
+    cost = -(scores.T if transposed else scores)
+    n, m = cost.shape
+    # potentials, and (1-indexed) row assigned to each column (0: none)
+    u, v = np.zeros(n + 1), np.zeros(m + 1)
+    col_row = np.zeros(m + 1, dtype=int)
+    way = np.zeros(m + 1, dtype=int)
+    for row in range(1, n + 1):
+        col_row[0] = row
+        col = 0
+        min_values = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while col_row[col] != 0:
+            used[col] = True
+            current_row = col_row[col]
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+            improved = ~used[1:] & (reduced < min_values[1:])
+            min_values[1:][improved] = reduced[improved]
+            way[1:][improved] = col
+            candidates = np.where(used[1:], np.inf, min_values[1:])
+            next_col = int(np.argmin(candidates)) + 1
+            delta = candidates[next_col - 1]
+            u[col_row[used]] += delta
+            v[used] -= delta
+            min_values[~used] -= delta
+            col = next_col
+        # augmenting path
+        while col:
+            previous_col = way[col]
+            col_row[col] = col_row[previous_col]
+            col = previous_col
+    pairs = [(col_row[col] - 1, col - 1) for col in range(1, m + 1) if col_row[col]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted((int(row), int(col)) for row, col in pairs if scores[row, col] > 0)
+
+
+class PercentileCont(models.Aggregate):
+    """
+    Postgres percentile_cont ordered-set aggregate.
+    Several percentiles can be computed in a single sort:
+    PercentileCont("price", percentiles=[0.1, 0.5, 0.9]) returns a list.
+    """
+
+    function = "PERCENTILE_CONT"
+    template = "%(function)s(%(percentiles)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+
+    def __init__(self, expression, percentiles, **extra):
+        if isinstance(percentiles, (list, tuple)):
+            output_field = ArrayField(models.FloatField())
+            percentiles = "ARRAY[%s]::float[]" % ", ".join(
+                str(float(percentile)) for percentile in percentiles
+            )
+        else:
+            output_field = models.FloatField()
+            percentiles = str(float(percentiles))
+        super().__init__(
+            expression, percentiles=percentiles, output_field=output_field, **extra
+        )
+
+
+def haversine_distances(lat, lon, lats, lons) -> np.ndarray:
+    """
+    Great-circle distances (in km) between a point and arrays of points
+    """
+    lat, lon = np.radians(float(lat)), np.radians(float(lon))
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    a = (
+        np.sin((lats - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def get_source_category(source: str | None) -> str:
+    """
+    Normalize the raw source (app name, version...) of a price or proof
+    """
+    for source_substring, source_category in constants.SOURCE_CATEGORY_MATCH_LIST:
+        if source and source_substring in source:
+            return source_category
+    return constants.SOURCE_OTHER
+
+
+def get_advisory_lock_id(namespace: str, key) -> int:
+    """
+    Stable signed 64-bit id of a key, for the PostgreSQL advisory locks
+    (pg_advisory_xact_lock)
+    """
+    digest = hashlib.blake2b(f"{namespace}:{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
 def add_validation_error(dict, key, value):
     """
     Build a dictionary of validation errors
@@ -46,14 +162,144 @@ def add_validation_error(dict, key, value):
     return dict
 
 
+def export_queryset_to_jsonl_gz(output_path, queryset, schema_class, desc=None):
+    with gzip.open(output_path, "wt") as f:
+        for item in tqdm.tqdm(queryset, desc=desc):
+            f.write(json.dumps(schema_class(item).data, cls=DjangoJSONEncoder))
+            f.write("\n")
+
+
 def export_model_to_jsonl_gz(table_name, model_class, schema_class, output_dir):
     output_path = os.path.join(output_dir, f"{table_name}.jsonl.gz")
+    export_queryset_to_jsonl_gz(
+        output_path, model_class.objects.all(), schema_class, desc=table_name
+    )
+
+
+def export_model_delta_to_jsonl_gz(
+    table_name, model_class, schema_class, output_dir, since, until
+):
+    """
+    Export the rows created or updated between since (included)
+    and until (excluded), using the index on `updated`
+    """
+    output_path = os.path.join(output_dir, f"{table_name}.jsonl.gz")
+    queryset = model_class.objects.filter(
+        updated__gte=since, updated__lt=until
+    ).order_by("updated", "id")
+    export_queryset_to_jsonl_gz(
+        output_path, queryset, schema_class, desc=f"{table_name} (delta)"
+    )
+
+
+def export_deletions_to_jsonl_gz(table_name_list, output_dir, since, until):
+    """
+    Export the deletion log between since (included) and until (excluded)
+    """
+    output_path = os.path.join(output_dir, "deletions.jsonl.gz")
+    queryset = (
+        DeletedObject.objects.filter(table_name__in=table_name_list)
+        .deleted_between(since, until)
+        .order_by("deleted", "id")
+        .values("table_name", "object_id", "deleted")
+    )
     with gzip.open(output_path, "wt") as f:
-        for item in tqdm.tqdm(model_class.objects.all(), desc=table_name):
-            f.write(json.dumps(schema_class(item).data, cls=DjangoJSONEncoder))
+        for item in queryset.iterator():
+            f.write(json.dumps(item, cls=DjangoJSONEncoder))
             f.write("\n")
 
 
+def get_parquet_type(field):
+    """
+    Map a Django model field to its Parquet (Arrow) type
+    - foreign keys are exported as their id
+    - JSON fields are exported as JSON strings
+    """
+    if isinstance(field, ArrayField):
+        return pa.list_(get_parquet_type(field.base_field))
+    if isinstance(field, models.ForeignKey):
+        return get_parquet_type(field.target_field)
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.IntegerField):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    return pa.string()
+
+
+def export_model_to_parquet(
+    table_name,
+    model_class,
+    output_dir,
+    dictionary_columns=None,
+    batch_size=10_000,
+    exclude_fields=None,
+):
+    """
+    Stream a table to a Parquet file
+    - rows are ordered by `created`, with one row group per month
+    (a month is split in several row groups if it has more than batch_size)
+    - only batch_size rows are kept in memory at a time
+    - dictionary_columns: low-cardinality columns to dictionary-encode
+    - exclude_fields: fields not exported, defaults to the model
+    PRIVATE_FIELDS (not exposed in the API, so not published either)
+    """
+    if exclude_fields is None:
+        exclude_fields = getattr(model_class, "PRIVATE_FIELDS", [])
+    fields = [
+        field
+        for field in model_class._meta.concrete_fields
+        if field.name not in exclude_fields
+    ]
+    schema = pa.schema(
+        [pa.field(field.attname, get_parquet_type(field)) for field in fields]
+    )
+    json_column_indexes = [
+        index
+        for index, field in enumerate(fields)
+        if isinstance(field, models.JSONField)
+    ]
+    created_index = schema.get_field_index("created")
+    output_path = os.path.join(output_dir, f"{table_name}.parquet")
+
+    def write_row_group(writer, rows):
+        columns = [list(column) for column in zip(*rows)]
+        for index in json_column_indexes:
+            columns[index] = [
+                None if value is None else json.dumps(value, cls=DjangoJSONEncoder)
+                for value in columns[index]
+            ]
+        arrays = [
+            pa.array(column, type=field.type) for column, field in zip(columns, schema)
+        ]
+        writer.write_table(
+            pa.Table.from_arrays(arrays, schema=schema), row_group_size=len(rows)
+        )
+
+    queryset = model_class.objects.order_by("created", "id").values_list(*schema.names)
+    with pq.ParquetWriter(
+        output_path, schema, use_dictionary=dictionary_columns or False
+    ) as writer:
+        rows = []
+        row_group_month = None
+        for row in tqdm.tqdm(queryset.iterator(chunk_size=batch_size), desc=table_name):
+            row_month = (row[created_index].year, row[created_index].month)
+            if rows and (row_month != row_group_month or len(rows) >= batch_size):
+                write_row_group(writer, rows)
+                rows = []
+            row_group_month = row_month
+            rows.append(row)
+        if rows:
+            write_row_group(writer, rows)
+
+
 def url_add_missing_https(url):
     if not url.startswith(("http://", "https://")):
         url = f"https://{url}"
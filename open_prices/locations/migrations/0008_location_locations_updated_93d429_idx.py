@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("locations", "0007_alter_location_osm_brand_and_osm_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(
+                fields=["updated", "id"], name="locations_updated_93d429_idx"
+            ),
+        ),
+    ]
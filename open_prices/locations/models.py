@@ -1,12 +1,16 @@
+import math
+
 from django.conf import settings
 from django.core.validators import ValidationError
 from django.db import models
-from django.db.models import Count, Q, UniqueConstraint, signals
+from django.db.models import Count, OuterRef, Q, Subquery, UniqueConstraint, signals
+from django.db.models.functions import Coalesce
 from django.dispatch import receiver
 from django.utils import timezone
 from django_q.tasks import async_task
 
 from open_prices.common import utils
+from open_prices.common.models import DeletedObject
 from open_prices.common.utils import truncate_decimal
 from open_prices.locations import constants as location_constants
 
@@ -24,6 +28,54 @@ class LocationQuerySet(models.QuerySet):
     def with_stats(self):
         return self.annotate(price_count_annotated=Count("prices", distinct=True))
 
+    def closest(self, lat, lon, radius_km, limit=None):
+        """
+        Locations within radius_km of (lat, lon), closest first
+        (bounding box pre-filter in SQL, exact distances with numpy)
+        Returns a list of (location_id, distance_km)
+        """
+        lat_delta = radius_km / utils.EARTH_RADIUS_KM * 180 / math.pi
+        lon_delta = lat_delta / max(math.cos(math.radians(lat)), 0.01)
+        candidates = list(
+            self.filter(
+                osm_lat__gte=lat - lat_delta,
+                osm_lat__lte=lat + lat_delta,
+                osm_lon__gte=lon - lon_delta,
+                osm_lon__lte=lon + lon_delta,
+            ).values_list("id", "osm_lat", "osm_lon")
+        )
+        if not candidates:
+            return []
+        ids, lats, lons = zip(*candidates)
+        distances = utils.haversine_distances(lat, lon, lats, lons)
+        order = [i for i in distances.argsort() if distances[i] <= radius_km]
+        return [(ids[i], float(distances[i])) for i in order[:limit]]
+
+    def update_price_counts(self):
+        """
+        Update the price_count & product_count of all the locations
+        with a single UPDATE (instead of Location.update_*_count on each)
+        """
+        from open_prices.prices.models import Price
+
+        location_prices = (
+            Price.objects.filter(location=OuterRef("pk")).order_by().values("location")
+        )
+        return self.update(
+            price_count=Coalesce(
+                Subquery(location_prices.annotate(count=Count("id")).values("count")),
+                0,
+            ),
+            product_count=Coalesce(
+                Subquery(
+                    location_prices.annotate(
+                        count=Count("product_id", distinct=True)
+                    ).values("count")
+                ),
+                0,
+            ),
+        )
+
 
 class Location(models.Model):
     CREATE_FIELDS = ["type", "osm_id", "osm_type", "website_url"]
@@ -104,6 +156,7 @@ class Location(models.Model):
                 condition=Q(type=location_constants.TYPE_ONLINE),
             ),
         ]
+        indexes = [models.Index(fields=["updated", "id"])]
         verbose_name = "Location"
         verbose_name_plural = "Locations"
 
@@ -235,3 +288,10 @@ def location_post_create_fetch_and_save_data_from_openstreetmap(
                     "open_prices.locations.tasks.fetch_and_save_data_from_openstreetmap",
                     instance,
                 )
+
+
+@receiver(signals.post_delete, sender=Location)
+def location_post_delete_log_deletion(sender, instance, **kwargs):
+    DeletedObject.objects.create(
+        table_name=Location._meta.db_table, object_id=instance.id
+    )
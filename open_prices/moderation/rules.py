@@ -1,89 +1,67 @@
 """
 A list of rules, to clean up the data
 """
-import openfoodfacts
 from django.db.models import Q
 from django.db.models.functions import Length
 
+from open_prices.moderation.utils import delete_prices_in_bulk
 from open_prices.prices import constants as price_constants
+from open_prices.prices.models import Price
 from open_prices.products.models import Product
 
 
-def cleanup_products_with_long_barcodes():
+def cleanup_product_prices_from_validation(product_queryset, dry_run=False) -> dict:
+    """
+    Remove the prices of the products that came from the validation
+    workflows, and the products left without prices.
+    The prices are selected in one query, and deleted in bulk.
+    """
+    # build the price source filter query
+    source_query = Q()
+    for source in price_constants.PRICE_CREATED_FROM_PRICE_TAG_VALIDATION_SOURCE_LIST:
+        source_query |= Q(source__contains=source)
+
+    price_queryset = Price.objects.filter(source_query, product__in=product_queryset)
+    report = delete_prices_in_bulk(
+        price_queryset, delete_empty_products=True, dry_run=dry_run
+    )
+
+    # recap
+    print(
+        f"{'Would delete' if dry_run else 'Deleted'} "
+        f"{report['product_deleted_count']} products "
+        f"and {report['price_deleted_count']} prices"
+    )
+    return report
+
+
+def cleanup_products_with_long_barcodes(dry_run=False):
     """
     Remove products (and their prices) that have (too) long barcodes
     - long barcode = more than 13 characters
     - only if the product has an unknown source (aka not from OxF)
     - only if the price came from the validation workflows
+    - dry_run: only print (and return) what would be removed
     """
-    # init
-    product_deleted_count = 0
-    price_deleted_count = 0
-
     # products with long barcodes
     product_queryset = Product.objects.annotate(
         code_length_annotated=Length("code")
     ).filter(source=None, code_length_annotated__gt=13)
     print(f"Found {product_queryset.count()} products with long barcodes")
 
-    # build the price source filter query
-    source_query = Q()
-    for source in price_constants.PRICE_CREATED_FROM_PRICE_TAG_VALIDATION_SOURCE_LIST:
-        source_query |= Q(source__contains=source)
-
-    # loop on each product
-    for product in product_queryset:
-        product_prices_from_source_queryset = product.prices.filter(source_query)
-        if product_prices_from_source_queryset.exists():
-            for price in product_prices_from_source_queryset.all():
-                price.delete()  # delete 1 by 1 to trigger signals
-                price_deleted_count += 1
-            if product.prices.count() == 0:
-                product.delete()
-                product_deleted_count += 1
-
-    # recap
-    print(f"Deleted {product_deleted_count} products and {price_deleted_count} prices")
+    return cleanup_product_prices_from_validation(product_queryset, dry_run=dry_run)
 
 
-def cleanup_products_with_invalid_barcodes():
+def cleanup_products_with_invalid_barcodes(dry_run=False):
     """
     Remove products (and their prices) that have invalid barcodes
     invalid barcode = invalid check digit
     - only if the product has an unknown source (aka not from OxF)
     - only if the price came from the validation workflows
+    - dry_run: only print (and return) what would be removed
     """
-    # init
-    product_deleted_count = 0
-    price_deleted_count = 0
-
-    # products with invalid barcodes
-    product_code_list = Product.objects.filter(source=None).values_list(
-        "code", flat=True
-    )
-    product_code_invalid_list = [
-        code
-        for code in product_code_list
-        if not openfoodfacts.barcode.has_valid_check_digit(code)
-    ]
-    product_queryset = Product.objects.filter(code__in=product_code_invalid_list)
+    # products with invalid barcodes (stored check digit validity)
+    product_queryset = Product.objects.filter(source=None).has_invalid_barcode()
     print(f"Found {product_queryset.count()} products with invalid barcodes")
 
-    # build the price source filter query
-    source_query = Q()
-    for source in price_constants.PRICE_CREATED_FROM_PRICE_TAG_VALIDATION_SOURCE_LIST:
-        source_query |= Q(source__contains=source)
-
-    # loop on each product
-    for product in product_queryset:
-        product_prices_from_source_queryset = product.prices.filter(source_query)
-        if product_prices_from_source_queryset.exists():
-            for price in product_prices_from_source_queryset.all():
-                price.delete()  # delete 1 by 1 to trigger signals
-                price_deleted_count += 1
-            if product.prices.count() == 0:
-                product.delete()
-                product_deleted_count += 1
-
-    # recap
-    print(f"Deleted {product_deleted_count} products and {price_deleted_count} prices")
+    return cleanup_product_prices_from_validation(product_queryset, dry_run=dry_run)
@@ -1,14 +1,23 @@
 from django.test import TestCase
 
+from open_prices.common.models import DeletedObject
+from open_prices.locations.factories import LocationFactory
+from open_prices.locations.models import Location
 from open_prices.moderation.rules import (
     cleanup_products_with_invalid_barcodes,
     cleanup_products_with_long_barcodes,
 )
+from open_prices.moderation.utils import delete_prices_in_bulk
 from open_prices.prices.factories import PriceFactory
-from open_prices.prices.models import Price
+from open_prices.prices.models import LatestPrice, Price
 from open_prices.products import constants as product_constants
 from open_prices.products.factories import ProductFactory
 from open_prices.products.models import Product
+from open_prices.proofs import constants as proof_constants
+from open_prices.proofs.factories import PriceTagFactory, ProofFactory
+from open_prices.proofs.models import PriceTag, Proof
+from open_prices.users.factories import UserFactory
+from open_prices.users.models import User
 
 
 class ModerationRulesTest(TestCase):
@@ -50,9 +59,106 @@ class ModerationRulesTest(TestCase):
         self.assertEqual(Product.objects.count(), 2)  # 1 product deleted
         self.assertEqual(Price.objects.count(), 4)  # 1 price deleted
 
+    def test_cleanup_products_with_long_barcodes_dry_run(self):
+        report = cleanup_products_with_long_barcodes(dry_run=True)
+        self.assertEqual(report["product_deleted_count"], 1)
+        self.assertEqual(report["price_deleted_count"], 1)
+        self.assertEqual(Product.objects.count(), 3)  # nothing deleted
+        self.assertEqual(Price.objects.count(), 5)
+
     def test_cleanup_products_with_invalid_barcodes(self):
         self.assertEqual(Product.objects.count(), 3)
         self.assertEqual(Price.objects.count(), 5)
         cleanup_products_with_invalid_barcodes()
         self.assertEqual(Product.objects.count(), 2)  # 1 product deleted
         self.assertEqual(Price.objects.count(), 3)  # 2 prices deleted
+        # the product with a remaining price is kept, and its count updated
+        self.product_with_barcode_invalid.refresh_from_db()
+        self.assertEqual(self.product_with_barcode_invalid.price_count, 1)
+
+
+class DeletePricesInBulkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.location = LocationFactory()
+        cls.product = ProductFactory(code="8001505005707")
+        cls.proof = ProofFactory(
+            type=proof_constants.TYPE_PRICE_TAG,
+            location_osm_id=cls.location.osm_id,
+            location_osm_type=cls.location.osm_type,
+            owner=cls.user.user_id,
+        )
+        cls.prices = [
+            PriceFactory(
+                product_code=cls.product.code,
+                proof_id=cls.proof.id,
+                location_osm_id=cls.location.osm_id,
+                location_osm_type=cls.location.osm_type,
+                owner=cls.user.user_id,
+                price=price,
+            )
+            for price in [1, 2, 3]
+        ]
+        cls.price_tag = PriceTagFactory(
+            proof=cls.proof,
+            price=cls.prices[0],
+            status=proof_constants.PriceTagStatus.linked_to_price.value,
+        )
+
+    def test_delete_prices_in_bulk_dry_run(self):
+        report = delete_prices_in_bulk(
+            Price.objects.filter(price__lte=2), delete_empty_products=True, dry_run=True
+        )
+        self.assertEqual(report["price_deleted_count"], 2)
+        self.assertEqual(report["product_deleted_count"], 0)
+        self.assertEqual(report["price_tag_reset_count"], 1)
+        self.assertEqual(report["price_count_deltas"]["users"], {self.user.user_id: 2})
+        self.assertEqual(report["price_count_deltas"]["proofs"], {self.proof.id: 2})
+        self.assertEqual(Price.objects.count(), 3)
+        self.assertEqual(DeletedObject.objects.count(), 0)
+
+    def test_delete_prices_in_bulk(self):
+        self.assertEqual(Proof.objects.get(id=self.proof.id).price_count, 3)
+        delete_prices_in_bulk(Price.objects.filter(price__lte=2), batch_size=1)
+        self.assertEqual(Price.objects.count(), 1)
+        # counters are decremented in aggregate
+        self.assertEqual(User.objects.get(user_id=self.user.user_id).price_count, 1)
+        self.assertEqual(Proof.objects.get(id=self.proof.id).price_count, 1)
+        self.assertEqual(Product.objects.get(id=self.product.id).price_count, 1)
+        self.assertEqual(Location.objects.get(id=self.location.id).price_count, 1)
+        # the latest price is recomputed
+        self.assertEqual(
+            LatestPrice.objects.get(product=self.product).price_id, self.prices[2].id
+        )
+        # linked price tags are reset
+        price_tag = PriceTag.objects.get(id=self.price_tag.id)
+        self.assertIsNone(price_tag.status)
+        self.assertIsNone(price_tag.price_id)
+        # deletions are logged
+        self.assertEqual(
+            set(DeletedObject.objects.values_list("object_id", flat=True)),
+            {self.prices[0].id, self.prices[1].id},
+        )
+
+    def test_delete_prices_in_bulk_empty_products(self):
+        delete_prices_in_bulk(Price.objects.all(), delete_empty_products=True)
+        self.assertEqual(Price.objects.count(), 0)
+        self.assertFalse(Product.objects.filter(id=self.product.id).exists())
+
+    def test_delete_prices_in_bulk_update_counts(self):
+        Product.objects.filter(id=self.product.id).update_price_counts()
+        Location.objects.filter(id=self.location.id).update_price_counts()
+        product = Product.objects.get(id=self.product.id)
+        location = Location.objects.get(id=self.location.id)
+        self.assertEqual(product.location_count, 1)
+        self.assertTrue(product.price_currency_count)
+        self.assertEqual(location.product_count, 1)
+        delete_prices_in_bulk(Price.objects.all())
+        product.refresh_from_db()
+        location.refresh_from_db()
+        self.assertEqual(product.price_count, 0)
+        self.assertEqual(product.location_count, 0)
+        self.assertEqual(product.price_currency_count, 0)
+        self.assertEqual(location.price_count, 0)
+        self.assertEqual(location.product_count, 0)
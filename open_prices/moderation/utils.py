@@ -0,0 +1,127 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+
+from open_prices.common.models import DeletedObject
+from open_prices.locations.models import Location
+from open_prices.prices import utils as price_utils
+from open_prices.prices.models import LatestPrice, Price
+from open_prices.products.models import Product
+from open_prices.proofs.models import PriceTag, Proof, ReceiptItem
+from open_prices.users.models import User
+
+PRICE_DELETE_BATCH_SIZE = 1000
+
+
+def decrement_price_counts(model, key_field: str, counts: Counter) -> int:
+    """
+    Decrement the price_count of many rows in a single UPDATE
+    (price_count = price_count - CASE key WHEN ... END)
+    """
+    if not counts:
+        return 0
+    delta = Case(
+        *[When(**{key_field: key}, then=Value(count)) for key, count in counts.items()],
+        default=Value(0),
+    )
+    return model.objects.filter(**{f"{key_field}__in": list(counts)}).update(
+        price_count=F("price_count") - delta
+    )
+
+
+def delete_prices_in_bulk(
+    price_queryset,
+    delete_empty_products=False,
+    dry_run=False,
+    batch_size=PRICE_DELETE_BATCH_SIZE,
+) -> dict:
+    """
+    Delete prices without going through the per-row signals:
+    - the counter deltas (users, proofs) are computed in aggregate, and
+    applied with one UPDATE per table; the product & location counts are
+    recomputed in bulk (update_price_counts)
+    - the linked price tags are reset (status & price), the linked receipt
+    items are unlinked, the latest prices are recomputed
+    - the prices are deleted in batches, the deletions are logged
+    - everything runs in a single transaction
+
+    :param delete_empty_products: also delete the products left without
+        prices
+    :param dry_run: only return the report, without deleting anything
+    :return: a report of what was (or would be) removed
+    """
+    rows = list(
+        price_queryset.order_by("id").values_list(
+            "id", "owner", "proof_id", "product_id", "location_id", "category_tag"
+        )
+    )
+    price_ids = [row[0] for row in rows]
+    counts = {
+        "users": Counter(row[1] for row in rows if row[1]),
+        "proofs": Counter(row[2] for row in rows if row[2]),
+        "products": Counter(row[3] for row in rows if row[3]),
+        "locations": Counter(row[4] for row in rows if row[4]),
+    }
+    # products whose prices are all going to be deleted
+    empty_product_ids = []
+    if delete_empty_products and counts["products"]:
+        empty_product_ids = list(
+            Product.objects.filter(id__in=list(counts["products"]))
+            .exclude(
+                Exists(
+                    Price.objects.filter(product=OuterRef("pk")).exclude(
+                        id__in=price_ids
+                    )
+                )
+            )
+            .values_list("id", flat=True)
+        )
+    report = {
+        "price_deleted_count": len(price_ids),
+        "product_deleted_count": len(empty_product_ids),
+        "price_tag_reset_count": PriceTag.objects.filter(
+            price_id__in=price_ids
+        ).count(),
+        "price_count_deltas": {key: dict(value) for key, value in counts.items()},
+        "dry_run": dry_run,
+    }
+    if dry_run or not price_ids:
+        return report
+
+    with transaction.atomic():
+        for i in range(0, len(price_ids), batch_size):
+            batch_ids = price_ids[i : i + batch_size]
+            PriceTag.objects.filter(price_id__in=batch_ids).update(
+                status=None, price=None
+            )
+            ReceiptItem.objects.filter(price_id__in=batch_ids).update(price=None)
+            LatestPrice.objects.filter(price_id__in=batch_ids).delete()
+            # QuerySet.delete() would send the per-row Price signals (counts,
+            # price tags, latest prices, summaries, deletion log...), redoing
+            # per price what is done in bulk here (counts decremented twice).
+            # _raw_delete is safe: the rows referencing these prices (price
+            # tags, receipt items, latest prices) were unlinked above, so no
+            # cascade is skipped
+            batch_queryset = Price.objects.filter(id__in=batch_ids)
+            batch_queryset._raw_delete(batch_queryset.db)
+            DeletedObject.objects.bulk_create(
+                DeletedObject(table_name=Price._meta.db_table, object_id=price_id)
+                for price_id in batch_ids
+            )
+        LatestPrice.objects.refresh((row[3], row[5], row[4]) for row in rows)
+        decrement_price_counts(User, "user_id", counts["users"])
+        decrement_price_counts(Proof, "id", counts["proofs"])
+        # products & locations: all the counts depending on their prices
+        # (locations, currencies, countries...)
+        products = Product.objects.filter(id__in=list(counts["products"])).exclude(
+            id__in=empty_product_ids
+        )
+        products.update_price_counts()
+        products.update_price_summaries()
+        Location.objects.filter(id__in=list(counts["locations"])).update_price_counts()
+        if empty_product_ids:
+            Product.objects.filter(id__in=empty_product_ids).delete()
+    price_utils.invalidate_price_stats_cache()
+
+    return report
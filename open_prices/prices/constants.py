@@ -34,7 +34,53 @@ PRICE_PER_KILOGRAM = "KILOGRAM"
 PRICE_PER_LIST = [PRICE_PER_UNIT, PRICE_PER_KILOGRAM]
 PRICE_PER_CHOICES = [(key, key) for key in PRICE_PER_LIST]
 
+"""
+UNIT_PRICE
+The price normalized per kilogram, per litre or per unit, to compare
+products sold in different pack sizes.
+"""
+UNIT_PRICE_UNIT_KILOGRAM = PRICE_PER_KILOGRAM
+UNIT_PRICE_UNIT_LITRE = "LITRE"
+UNIT_PRICE_UNIT_UNIT = PRICE_PER_UNIT
+UNIT_PRICE_UNIT_LIST = [
+    UNIT_PRICE_UNIT_KILOGRAM,
+    UNIT_PRICE_UNIT_LITRE,
+    UNIT_PRICE_UNIT_UNIT,
+]
+UNIT_PRICE_UNIT_CHOICES = [(key, key) for key in UNIT_PRICE_UNIT_LIST]
+UNIT_PRICE_MAX = 10**10  # Price.unit_price max_digits
+# Product.product_quantity_unit: (unit price unit, quantity factor)
+PRODUCT_QUANTITY_UNIT_DICT = {
+    "mg": (UNIT_PRICE_UNIT_KILOGRAM, "0.000001"),
+    "g": (UNIT_PRICE_UNIT_KILOGRAM, "0.001"),
+    "kg": (UNIT_PRICE_UNIT_KILOGRAM, "1"),
+    "ml": (UNIT_PRICE_UNIT_LITRE, "0.001"),
+    "cl": (UNIT_PRICE_UNIT_LITRE, "0.01"),
+    "dl": (UNIT_PRICE_UNIT_LITRE, "0.1"),
+    "l": (UNIT_PRICE_UNIT_LITRE, "1"),
+}
+
 PRICE_CREATED_FROM_PRICE_TAG_VALIDATION_SOURCE_LIST = [
     "/experiments/price-validation-assistant",
     "/experiments/contribution-assistant",
 ]
+
+PRICE_STATS_HISTOGRAM_BINS = 10
+# stats results are cached per filter set, and invalidated
+# (version bump) when a price is created, updated or deleted
+PRICE_STATS_CACHE_KEY_PREFIX = "price_stats"
+PRICE_STATS_CACHE_VERSION_KEY = "price_stats_version"
+PRICE_STATS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+# query params that do not change the stats
+PRICE_STATS_CACHE_IGNORED_PARAMS = ["page", "size", "order_by"]
+
+# exchange rates: 1 EUR = rate currency
+EXCHANGE_RATE_REFERENCE_CURRENCY = "EUR"
+PRICE_EUR_MAX = 10**10  # Price.price_eur max_digits
+
+# outlier detection: modified z-score (median / MAD) within each group of
+# comparable prices (same product or category, currency & price_per)
+PRICE_OUTLIER_SCORE_THRESHOLD = 3.5
+PRICE_OUTLIER_MIN_GROUP_SIZE = 5  # smaller groups are never flagged
+PRICE_OUTLIER_MAD_FACTOR = 0.6745  # MAD to standard deviation (normal dist.)
+PRICE_OUTLIER_MEAN_AD_FACTOR = 0.7979  # fallback when MAD is 0
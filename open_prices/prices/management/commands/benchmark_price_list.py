@@ -0,0 +1,63 @@
+import argparse
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from open_prices.api.prices.serializers import (
+    PriceFullSerializer,
+    price_full_values_serializer,
+)
+from open_prices.prices.models import Price
+
+
+class Command(BaseCommand):
+    help = """Benchmark the price list rendering (GET /api/v1/prices):
+    PriceFullSerializer (model instances + DRF fields) vs the values() read
+    path (ValuesSerializer). Each run fetches & renders one page (to JSON)."""
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--size", type=int, default=100, help="Number of prices per page."
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Number of runs per serializer."
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore
+        size, repeat = options["size"], options["repeat"]
+        queryset = Price.objects.select_related("product", "location", "proof")
+        queryset = queryset.order_by("-created")
+
+        def render_serializer():
+            return PriceFullSerializer(queryset[:size], many=True).data
+
+        def render_values_serializer():
+            return price_full_values_serializer.to_representation(
+                price_full_values_serializer.values(queryset)[:size]
+            )
+
+        if JSONRenderer().render(render_serializer()) != JSONRenderer().render(
+            render_values_serializer()
+        ):
+            self.stderr.write("Warning: the outputs differ")
+
+        timings = {}
+        for name, render in [
+            ("PriceFullSerializer", render_serializer),
+            ("ValuesSerializer", render_values_serializer),
+        ]:
+            durations = []
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                JSONRenderer().render(render())
+                durations.append(time.perf_counter() - start_time)
+            timings[name] = statistics.median(durations)
+            self.stdout.write(
+                f"{name}: {timings[name] * 1000:.1f} ms per page of {size} "
+                f"(median of {repeat} runs)"
+            )
+        if timings["ValuesSerializer"]:
+            speedup = timings["PriceFullSerializer"] / timings["ValuesSerializer"]
+            self.stdout.write(f"speedup: x{speedup:.1f}")
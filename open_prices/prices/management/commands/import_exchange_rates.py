@@ -0,0 +1,112 @@
+import argparse
+import csv
+import datetime
+import decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from open_prices.common import constants
+from open_prices.prices.models import ExchangeRate, Price
+
+EXCHANGE_RATES_PATH = Path(settings.BASE_DIR) / "data" / "eurofxref-hist.csv"
+
+
+def read_exchange_rates_csv(path: Path) -> list[ExchangeRate]:
+    """
+    Read the daily rates of a CSV file in the ECB format
+    (eurofxref-hist.csv): a Date column, then one column per currency
+    (1 EUR = rate currency), "N/A" if there is no rate that day
+    """
+    exchange_rates = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            date = datetime.date.fromisoformat(row.pop("Date").strip())
+            for currency, rate in row.items():
+                currency, rate = (currency or "").strip(), (rate or "").strip()
+                if currency not in constants.CURRENCY_LIST:
+                    continue
+                try:
+                    rate = decimal.Decimal(rate)
+                except decimal.InvalidOperation:  # N/A
+                    continue
+                exchange_rates.append(
+                    ExchangeRate(currency=currency, date=date, rate=rate)
+                )
+    return exchange_rates
+
+
+def get_affected_prices_filter(exchange_rates: list[ExchangeRate]) -> Q:
+    """
+    The prices whose EUR price may depend on the new rates: same currency,
+    dated on or after the oldest new rate of the currency (or without date:
+    the rate of the day is used)
+    """
+    min_dates = dict()
+    for rate in exchange_rates:
+        if rate.currency not in min_dates or rate.date < min_dates[rate.currency]:
+            min_dates[rate.currency] = rate.date
+    price_filter = Q()
+    for currency, min_date in min_dates.items():
+        price_filter |= Q(currency=currency) & (Q(date__gte=min_date) | Q(date=None))
+    return price_filter
+
+
+class Command(BaseCommand):
+    """
+    Load the daily exchange rates from a local file (only the new or changed
+    rates), then recompute the EUR prices that depend on them (same currency,
+    dated on or after the oldest new rate)
+    """
+
+    help = "Import the daily exchange rates (ECB CSV format)."
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--path",
+            type=Path,
+            default=EXCHANGE_RATES_PATH,
+            help="Path of the CSV file.",
+        )
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Recompute the EUR price of all the prices.",
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore
+        exchange_rates = read_exchange_rates_csv(options["path"])
+        # only keep the new (or changed) rates: the full history file is
+        # loaded every time
+        rates_before = {
+            (currency, date): rate
+            for currency, date, rate in ExchangeRate.objects.filter(
+                currency__in={rate.currency for rate in exchange_rates}
+            ).values_list("currency", "date", "rate")
+        }
+        exchange_rates = [
+            rate
+            for rate in exchange_rates
+            if rates_before.get((rate.currency, rate.date)) != rate.rate
+        ]
+        ExchangeRate.objects.bulk_create(
+            exchange_rates,
+            batch_size=10000,
+            update_conflicts=True,
+            unique_fields=["currency", "date"],
+            update_fields=["rate"],
+        )
+        self.stdout.write(f"{len(exchange_rates)} exchange rates imported")
+
+        if options["backfill"]:
+            price_queryset = Price.objects.all()
+        elif exchange_rates:
+            price_queryset = Price.objects.filter(
+                get_affected_prices_filter(exchange_rates)
+            )
+        else:
+            return
+        updated_count = price_queryset.update_eur_prices()
+        self.stdout.write(f"{updated_count} EUR prices updated")
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("prices", "0009_alter_price_receipt_quantity"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="price",
+            index=models.Index(
+                fields=["updated", "id"], name="prices_updated_a6dbb4_idx"
+            ),
+        ),
+    ]
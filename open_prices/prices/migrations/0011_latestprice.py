@@ -0,0 +1,91 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+INIT_LATEST_PRICES_SQL = """
+INSERT INTO latest_prices (product_id, category_tag, location_id, price_id, date)
+SELECT DISTINCT ON (product_id, category_tag, location_id)
+    product_id, category_tag, location_id, id, date
+FROM prices
+WHERE location_id IS NOT NULL
+    AND (product_id IS NOT NULL OR category_tag IS NOT NULL)
+ORDER BY product_id, category_tag, location_id, date DESC NULLS LAST, id DESC
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("locations", "0008_location_locations_updated_93d429_idx"),
+        ("prices", "0010_price_prices_updated_a6dbb4_idx"),
+        ("products", "0007_productpricesummary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatestPrice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("category_tag", models.CharField(blank=True, null=True)),
+                ("date", models.DateField(blank=True, null=True)),
+                (
+                    "location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="latest_prices",
+                        to="locations.location",
+                    ),
+                ),
+                (
+                    "price",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="prices.price",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="latest_prices",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Latest price",
+                "verbose_name_plural": "Latest prices",
+                "db_table": "latest_prices",
+                "indexes": [
+                    models.Index(
+                        fields=["location", "product"],
+                        name="latest_pric_locatio_000d49_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("product__isnull", False)),
+                        fields=("product", "location"),
+                        name="latest_prices_unique_product_location",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("category_tag__isnull", False)),
+                        fields=("category_tag", "location"),
+                        name="latest_prices_unique_category_tag_location",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunSQL(INIT_LATEST_PRICES_SQL, migrations.RunSQL.noop),
+    ]
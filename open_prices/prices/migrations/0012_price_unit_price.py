@@ -0,0 +1,76 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+from open_prices.prices import utils as price_utils
+
+BATCH_SIZE = 10000
+
+
+def init_unit_prices(apps, schema_editor):
+    Price = apps.get_model("prices", "Price")
+    rows = (
+        Price.objects.order_by("id")
+        .values_list(
+            "id",
+            "price",
+            "type",
+            "price_per",
+            "product__product_quantity",
+            "product__product_quantity_unit",
+        )
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    prices = []
+    for price_id, *values in rows:
+        unit_price, unit_price_unit = price_utils.compute_unit_price(*values)
+        if unit_price is not None:
+            prices.append(
+                Price(
+                    id=price_id, unit_price=unit_price, unit_price_unit=unit_price_unit
+                )
+            )
+        if len(prices) == BATCH_SIZE:
+            Price.objects.bulk_update(prices, fields=["unit_price", "unit_price_unit"])
+            prices = []
+    Price.objects.bulk_update(prices, fields=["unit_price", "unit_price_unit"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("prices", "0011_latestprice"),
+        ("products", "0007_productpricesummary"),
+        ("proofs", "0021_predictioncache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="price",
+            name="unit_price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=12, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="price",
+            name="unit_price_unit",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("KILOGRAM", "KILOGRAM"),
+                    ("LITRE", "LITRE"),
+                    ("UNIT", "UNIT"),
+                ],
+                max_length=10,
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="price",
+            index=models.Index(
+                fields=["unit_price_unit", "unit_price"],
+                name="prices_unit_pr_6f5d28_idx",
+            ),
+        ),
+        migrations.RunPython(init_unit_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("prices", "0013_exchangerate_price_price_eur"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="price",
+            name="price_is_outlier",
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="price",
+            name="price_outlier_score",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="price",
+            index=models.Index(
+                condition=models.Q(("price_is_outlier__isnull", True)),
+                fields=["id"],
+                name="prices_outlier_pending_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+INIT_SOURCE_CATEGORY_SQL = """
+UPDATE prices SET source_category = CASE
+    WHEN source LIKE '%Open Prices Web App%' THEN 'WEB'
+    WHEN source LIKE '%Smoothie%' THEN 'MOBILE'
+    WHEN source LIKE '%API%' THEN 'API'
+    ELSE 'OTHER'
+END
+"""
+
+INIT_KIND_SQL = """
+UPDATE prices SET kind = proofs.kind
+FROM proofs
+WHERE prices.proof_id = proofs.id AND prices.kind != proofs.kind
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("prices", "0014_price_outliers"),
+        ("proofs", "0022_proof_kind_proof_source_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="price",
+            name="kind",
+            field=models.CharField(
+                choices=[("COMMUNITY", "COMMUNITY"), ("CONSUMPTION", "CONSUMPTION")],
+                db_index=True,
+                default="COMMUNITY",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="price",
+            name="source_category",
+            field=models.CharField(
+                choices=[
+                    ("WEB", "WEB"),
+                    ("MOBILE", "MOBILE"),
+                    ("API", "API"),
+                    ("OTHER", "OTHER"),
+                ],
+                db_index=True,
+                default="OTHER",
+                max_length=10,
+            ),
+        ),
+        migrations.RunSQL(INIT_SOURCE_CATEGORY_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(INIT_KIND_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("prices", "0015_price_kind_price_source_category"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="price",
+            index=models.Index(fields=["date"], name="prices_date_42875a_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="price",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["created"], name="prices_created_brin_idx"
+            ),
+        ),
+    ]
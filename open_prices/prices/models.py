@@ -1,21 +1,14 @@
 import decimal
 import functools
+import itertools
 
+import numpy as np
+from django.contrib.postgres.indexes import BrinIndex
 from django.core.validators import MinValueValidator, ValidationError
-from django.db import models
-from django.db.models import (
-    Avg,
-    Case,
-    CharField,
-    Count,
-    F,
-    Max,
-    Min,
-    Value,
-    When,
-    signals,
-)
-from django.db.models.functions import Cast, ExtractYear
+from django.db import connection, models, transaction
+from django.db.models import Avg, Count, F, Func, Max, Min, Value, signals
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, ExtractYear, Least
 from django.dispatch import receiver
 from django.utils import timezone
 from openfoodfacts.taxonomy import (
@@ -25,9 +18,11 @@ from openfoodfacts.taxonomy import (
 )
 
 from open_prices.common import constants, utils
+from open_prices.common.models import DeletedObject
 from open_prices.locations import constants as location_constants
 from open_prices.locations.models import Location
 from open_prices.prices import constants as price_constants
+from open_prices.prices import utils as price_utils
 from open_prices.products.models import Product
 from open_prices.proofs import constants as proof_constants
 from open_prices.proofs.models import Proof
@@ -38,6 +33,68 @@ from open_prices.users.models import User
 _cached_create_taxonomy_mapping = functools.lru_cache()(create_taxonomy_mapping)
 
 
+class ExchangeRateQuerySet(models.QuerySet):
+    def get_rate(self, currency, date):
+        """
+        The EUR exchange rate of a currency at a date (the most recent
+        rate on or before the date: no rates on week-ends & holidays)
+        """
+        if currency == price_constants.EXCHANGE_RATE_REFERENCE_CURRENCY:
+            return decimal.Decimal(1)
+        return (
+            self.filter(currency=currency, date__lte=date)
+            .order_by("-date")
+            .values_list("rate", flat=True)
+            .first()
+        )
+
+    def get_rate_arrays(self, currencies):
+        """
+        The rates of each currency, as (dates, rates) numpy arrays sorted
+        by date (to look up many prices at once with np.searchsorted)
+        """
+        rate_arrays = dict()
+        rows = (
+            self.filter(currency__in=currencies)
+            .order_by("currency", "date")
+            .values_list("currency", "date", "rate")
+        )
+        for currency, group in itertools.groupby(rows, key=lambda row: row[0]):
+            _, dates, rates = zip(*group)
+            rate_arrays[currency] = (
+                np.array(dates, dtype="datetime64[D]"),
+                np.array(rates, dtype=object),
+            )
+        return rate_arrays
+
+
+class ExchangeRate(models.Model):
+    """
+    Daily exchange rates: 1 EUR = `rate` `currency`
+    (loaded from a local file, see the import_exchange_rates command)
+    """
+
+    currency = models.CharField(max_length=3, choices=constants.CURRENCY_CHOICES)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=18, decimal_places=6)
+
+    objects = models.Manager.from_queryset(ExchangeRateQuerySet)()
+
+    class Meta:
+        db_table = "exchange_rates"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["currency", "date"],
+                name="exchange_rates_unique_currency_date",
+            )
+        ]
+        verbose_name = "Exchange rate"
+        verbose_name_plural = "Exchange rates"
+
+    def __str__(self):
+        return f"{self.date} - {self.currency}: {self.rate}"
+
+
 class PriceQuerySet(models.QuerySet):
     def has_discount(self):
         return self.filter(price_is_discounted=True)
@@ -45,6 +102,10 @@ class PriceQuerySet(models.QuerySet):
     def exclude_discounted(self):
         return self.filter(price_is_discounted=False)
 
+    def exclude_outliers(self):
+        # prices not checked yet (price_is_outlier null) are kept
+        return self.exclude(price_is_outlier=True)
+
     def has_type_product(self):
         return self.filter(type=price_constants.TYPE_PRODUCT)
 
@@ -52,30 +113,32 @@ class PriceQuerySet(models.QuerySet):
         return self.filter(type=price_constants.TYPE_CATEGORY)
 
     def has_kind_community(self):
-        return self.prefetch_related("proof").exclude(proof__owner_consumption=True)
+        return self.filter(kind=constants.KIND_COMMUNITY)
 
     def has_kind_consumption(self):
-        return self.prefetch_related("proof").filter(
-            proof__type__in=proof_constants.TYPE_GROUP_CONSUMPTION_LIST,
-            proof__owner_consumption=True,
-        )
+        return self.filter(kind=constants.KIND_CONSUMPTION)
+
+    def changed_after(self, updated, id):
+        """
+        Rows changed strictly after the (updated, id) cursor,
+        in (updated, id) order.
+        A row-value comparison: a single range scan on the (updated, id)
+        index (the equivalent OR is not used as an index condition)
+        """
+        return self.filter(
+            RawSQL(
+                f'("{self.model._meta.db_table}"."updated", '
+                f'"{self.model._meta.db_table}"."id") > (%s, %s)',
+                (updated, id),
+                output_field=models.BooleanField(),
+            )
+        ).order_by("updated", "id")
 
     def with_extra_fields(self):
         return self.annotate(
             date_year_annotated=ExtractYear("date"),
-            source_annotated=Case(
-                When(
-                    source__contains="Open Prices Web App",
-                    then=Value(constants.SOURCE_WEB),
-                ),
-                When(
-                    source__contains="Smoothie",
-                    then=Value(constants.SOURCE_MOBILE),
-                ),
-                When(source__contains="API", then=Value(constants.SOURCE_API)),
-                default=Value(constants.SOURCE_OTHER),
-                output_field=CharField(),
-            ),
+            # stored column (see Price.set_source_category)
+            source_annotated=F("source_category"),
         )
 
     def calculate_min(self):
@@ -103,6 +166,246 @@ class PriceQuerySet(models.QuerySet):
             ),
         )
 
+    def update_unit_prices(self, batch_size=10000):
+        """
+        Recompute the stored unit prices (after a product quantity change,
+        or as a backfill): computed in batches, only the prices whose unit
+        price changed are saved (bulk_update)
+        """
+        rows = self.order_by("id").values_list(
+            "id",
+            "unit_price",
+            "unit_price_unit",
+            "price",
+            "type",
+            "price_per",
+            "product__product_quantity",
+            "product__product_quantity_unit",
+        )
+        fields = ["unit_price", "unit_price_unit", "updated"]  # bulk: no auto_now
+        updated_count = 0
+        prices = []
+        for (
+            price_id,
+            unit_price_before,
+            unit_price_unit_before,
+            *values,
+        ) in rows.iterator(chunk_size=batch_size):
+            unit_price, unit_price_unit = price_utils.compute_unit_price(*values)
+            if (unit_price, unit_price_unit) == (
+                unit_price_before,
+                unit_price_unit_before,
+            ):
+                continue
+            prices.append(
+                Price(
+                    id=price_id,
+                    unit_price=unit_price,
+                    unit_price_unit=unit_price_unit,
+                    updated=timezone.now(),
+                )
+            )
+            if len(prices) == batch_size:
+                updated_count += Price.objects.bulk_update(prices, fields=fields)
+                prices = []
+        if prices:
+            updated_count += Price.objects.bulk_update(prices, fields=fields)
+        return updated_count
+
+    def update_eur_prices(self, batch_size=10000):
+        """
+        Recompute the stored EUR prices (after an exchange rate import,
+        or as a backfill): the rates are loaded once, and looked up for each
+        batch of prices with np.searchsorted. Only the prices whose EUR price
+        changed are saved (bulk_update)
+        """
+        currencies = list(
+            self.exclude(currency=None)
+            .order_by()
+            .values_list("currency", flat=True)
+            .distinct()
+        )
+        rate_arrays = ExchangeRate.objects.get_rate_arrays(currencies)
+        today = timezone.now().date()
+
+        def bulk_update_eur_prices(rows):
+            price_eur_before = {row[0]: row[4] for row in rows}
+            prices = [
+                Price(id=price_id, price_eur=price_eur, updated=timezone.now())
+                for price_id, price_eur in price_utils.compute_eur_prices(
+                    rows, rate_arrays, today
+                )
+                if price_eur != price_eur_before[price_id]
+            ]
+            # bulk: no auto_now
+            return Price.objects.bulk_update(prices, fields=["price_eur", "updated"])
+
+        updated_count = 0
+        rows = self.order_by("id").values_list(
+            "id", "price", "currency", "date", "price_eur"
+        )
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                updated_count += bulk_update_eur_prices(batch)
+                batch = []
+        if batch:
+            updated_count += bulk_update_eur_prices(batch)
+        return updated_count
+
+    def update_outliers(self, batch_size=1000):
+        """
+        Recompute the outlier scores of the groups of comparable prices
+        (same product or category, currency & price_per) of the prices
+        of the queryset. Incremental run: filter(price_is_outlier=None)
+        (the new prices), their whole groups are rescored.
+        The prices of each batch of groups are loaded at once, and scored
+        with NumPy (see price_utils.detect_outliers).
+        A new price shifts the scores of its whole group: to avoid rewriting
+        (and re-publishing, see `updated`) the group every day, only the
+        pending prices and the prices whose price_is_outlier flips are
+        saved (bulk_update). The other scores are kept as is.
+        """
+        group_fields = ["product_id", "category_tag", "currency", "price_per"]
+        group_keys = list(self.order_by().values_list(*group_fields).distinct())
+        fields = ["price_outlier_score", "price_is_outlier", "updated"]
+        updated_count = 0
+        for i in range(0, len(group_keys), batch_size):
+            batch_keys = set(group_keys[i : i + batch_size])
+            product_ids = {key[0] for key in batch_keys if key[0]}
+            category_tags = {key[1] for key in batch_keys if key[1]}
+            rows = Price.objects.filter(
+                models.Q(product_id__in=product_ids)
+                | models.Q(category_tag__in=category_tags)
+            ).values_list(
+                "id", *group_fields, "price", "price_outlier_score", "price_is_outlier"
+            )
+            current_values = {}
+            score_rows = []
+            for price_id, *key, price, score, is_outlier in rows:
+                if tuple(key) not in batch_keys or price is None:
+                    continue
+                current_values[price_id] = is_outlier
+                # sortable group key (no None)
+                group_key = tuple("" if value is None else value for value in key)
+                score_rows.append((price_id, group_key, price))
+            prices = [
+                # bulk: no auto_now
+                Price(
+                    id=price_id,
+                    price_outlier_score=score,
+                    price_is_outlier=is_outlier,
+                    updated=timezone.now(),
+                )
+                for price_id, score, is_outlier in price_utils.detect_outliers(
+                    score_rows
+                )
+                if current_values[price_id] in (None, not is_outlier)
+            ]
+            updated_count += Price.objects.bulk_update(
+                prices, fields=fields, batch_size=batch_size
+            )
+        if updated_count:
+            price_utils.invalidate_price_stats_cache()
+        return updated_count
+
+    def calculate_histogram(self, price_min, price_max, bins):
+        """
+        Count the prices in `bins` equal-width buckets between price_min
+        and price_max (single GROUP BY width_bucket query)
+        """
+        if price_min is None:
+            return []
+        if price_min == price_max:
+            return [{"min": price_min, "max": price_max, "count": self.count()}]
+        bucket_counts = dict(
+            self.annotate(
+                bucket_annotated=Least(
+                    Func(
+                        F("price"),
+                        Value(price_min),
+                        Value(price_max),
+                        Value(bins),
+                        function="WIDTH_BUCKET",
+                        output_field=models.IntegerField(),
+                    ),
+                    Value(bins),  # the max price is in the last bucket
+                )
+            )
+            .order_by()
+            .values_list("bucket_annotated")
+            .annotate(count=Count("pk"))
+        )
+        bucket_width = (price_max - price_min) / bins
+        return [
+            {
+                "min": round(price_min + bucket_width * index, 2),
+                "max": round(price_min + bucket_width * (index + 1), 2),
+                "count": bucket_counts.get(index + 1, 0),
+            }
+            for index in range(bins)
+        ]
+
+    def calculate_distribution_stats(
+        self, histogram_bins=price_constants.PRICE_STATS_HISTOGRAM_BINS
+    ):
+        """
+        calculate_stats, with the median, the 10th & 90th percentiles
+        (less sensitive to outliers than the average) and a histogram
+        Also the unit price stats (prices with a unit price only: filter
+        on a unit_price_unit to compare prices across pack sizes), and the
+        EUR price stats (comparable across currencies)
+        """
+        stats = self.aggregate(
+            price__count=Count("pk"),
+            price__min=Min("price"),
+            price__max=Max("price"),
+            price__avg=Cast(
+                Avg("price"),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+            price__percentiles=utils.PercentileCont(
+                "price", percentiles=[0.1, 0.5, 0.9]
+            ),
+            unit_price__count=Count("unit_price"),
+            unit_price__min=Min("unit_price"),
+            unit_price__max=Max("unit_price"),
+            unit_price__avg=Cast(
+                Avg("unit_price"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            unit_price__median=utils.PercentileCont("unit_price", percentiles=0.5),
+            price_eur__count=Count("price_eur"),
+            price_eur__min=Min("price_eur"),
+            price_eur__max=Max("price_eur"),
+            price_eur__avg=Cast(
+                Avg("price_eur"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            price_eur__median=utils.PercentileCont("price_eur", percentiles=0.5),
+        )
+        percentiles = stats.pop("price__percentiles") or [None] * 3
+        for key, percentile in zip(
+            [
+                "price__p10",
+                "price__median",
+                "price__p90",
+                "unit_price__median",
+                "price_eur__median",
+            ],
+            percentiles + [stats["unit_price__median"], stats["price_eur__median"]],
+        ):
+            stats[key] = (
+                round(decimal.Decimal(percentile), 2)
+                if percentile is not None
+                else None
+            )
+        stats["price__histogram"] = self.calculate_histogram(
+            stats["price__min"], stats["price__max"], histogram_bins
+        )
+        return stats
+
 
 class Price(models.Model):
     UPDATE_FIELDS = [
@@ -186,9 +489,26 @@ class Price(models.Model):
         blank=True,
         null=True,
     )
+    # computed: price per kilogram/litre/unit (see set_unit_price)
+    unit_price = models.DecimalField(
+        max_digits=12, decimal_places=2, blank=True, null=True
+    )
+    unit_price_unit = models.CharField(
+        max_length=10,
+        choices=price_constants.UNIT_PRICE_UNIT_CHOICES,
+        blank=True,
+        null=True,
+    )
     currency = models.CharField(
         max_length=3, choices=constants.CURRENCY_CHOICES, blank=True, null=True
     )
+    # computed: price converted to EUR at the price date (see set_price_eur)
+    price_eur = models.DecimalField(
+        max_digits=12, decimal_places=2, blank=True, null=True
+    )
+    # null: not checked yet (see PriceQuerySet.update_outliers)
+    price_outlier_score = models.FloatField(blank=True, null=True)
+    price_is_outlier = models.BooleanField(blank=True, null=True)
 
     location_osm_id = models.PositiveBigIntegerField(blank=True, null=True)
     location_osm_type = models.CharField(
@@ -229,6 +549,20 @@ class Price(models.Model):
     owner = models.CharField(blank=True, null=True)
     source = models.CharField(blank=True, null=True)
 
+    # denormalized (from the proof kind & the source), set in save
+    kind = models.CharField(
+        max_length=20,
+        choices=constants.KIND_CHOICES,
+        default=constants.KIND_COMMUNITY,
+        db_index=True,
+    )
+    source_category = models.CharField(
+        max_length=10,
+        choices=constants.SOURCE_CHOICES,
+        default=constants.SOURCE_OTHER,
+        db_index=True,
+    )
+
     created = models.DateTimeField(default=timezone.now)
     updated = models.DateTimeField(auto_now=True)
 
@@ -237,6 +571,20 @@ class Price(models.Model):
     class Meta:
         # managed = False
         db_table = "prices"
+        indexes = [
+            models.Index(fields=["updated", "id"]),
+            # date-bounded queries (date__gte, date__year...)
+            models.Index(fields=["date"]),
+            # created follows the insertion order: a (tiny) BRIN index
+            # only reads the block ranges of the requested period
+            BrinIndex(fields=["created"], name="prices_created_brin_idx"),
+            models.Index(fields=["unit_price_unit", "unit_price"]),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(price_is_outlier__isnull=True),
+                name="prices_outlier_pending_idx",
+            ),
+        ]
         verbose_name = "Price"
         verbose_name_plural = "Prices"
 
@@ -580,14 +928,202 @@ class Price(models.Model):
             )
             self.location = location
 
+    def set_unit_price(self):
+        self.unit_price, self.unit_price_unit = price_utils.compute_unit_price(
+            self.price,
+            self.type,
+            self.price_per,
+            self.product.product_quantity if self.product else None,
+            self.product.product_quantity_unit if self.product else None,
+        )
+
+    def set_price_eur(self):
+        rate = None
+        if self.price is not None and self.currency:
+            rate = ExchangeRate.objects.get_rate(
+                self.currency, self.date or timezone.now().date()
+            )
+        self.price_eur = price_utils.convert_to_eur(self.price, rate)
+
+    def set_kind(self):
+        self.kind = self.proof.kind if self.proof else constants.KIND_COMMUNITY
+
+    def set_source_category(self):
+        self.source_category = utils.get_source_category(self.source)
+
     def save(self, *args, **kwargs):
         self.full_clean()
         # self.set_proof()  # should already exist
         self.get_or_create_product()
         self.get_or_create_location()
+        self.set_unit_price()
+        self.set_price_eur()
+        self.set_kind()
+        self.set_source_category()
+        self.price_is_outlier = None  # to be checked again
         super().save(*args, **kwargs)
 
 
+class LatestPriceQuerySet(models.QuerySet):
+    def refresh(self, keys):
+        """
+        Recompute the latest prices of the given
+        (product_id, category_tag, location_id) keys:
+        1 DELETE & 1 DISTINCT ON query, then 1 INSERT, in a transaction.
+        Concurrent refreshes of the same keys are serialized with
+        transaction-level advisory locks (taken in a stable order: no
+        deadlock), and the INSERT ignores conflicts.
+        """
+        keys = {
+            (product_id, category_tag, location_id)
+            for product_id, category_tag, location_id in keys
+            if location_id and (product_id or category_tag)
+        }
+        if not keys:
+            return 0
+        key_query = models.Q()
+        for product_id, category_tag, location_id in keys:
+            key_query |= models.Q(
+                product_id=product_id,
+                category_tag=category_tag,
+                location_id=location_id,
+            )
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                lock_ids = sorted(
+                    utils.get_advisory_lock_id("latest_price", key) for key in keys
+                )
+                # unnest keeps the (sorted) array order
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(lock_id) "
+                    "FROM unnest(%s::bigint[]) AS lock_id",
+                    [lock_ids],
+                )
+            self.filter(key_query).delete()
+            latest_prices = (
+                Price.objects.filter(key_query)
+                .order_by(
+                    "product_id",
+                    "category_tag",
+                    "location_id",
+                    F("date").desc(nulls_last=True),
+                    "-id",
+                )
+                .distinct("product_id", "category_tag", "location_id")
+                .values_list("id", "product_id", "category_tag", "location_id", "date")
+            )
+            return len(
+                self.bulk_create(
+                    [
+                        LatestPrice(
+                            price_id=price_id,
+                            product_id=product_id,
+                            category_tag=category_tag,
+                            location_id=location_id,
+                            date=date,
+                        )
+                        for price_id, product_id, category_tag, location_id, date in (
+                            latest_prices
+                        )
+                    ],
+                    ignore_conflicts=True,
+                )
+            )
+
+    def compare_basket(self, product_codes, location_ids):
+        """
+        Total price of a basket of products at each location, using the
+        latest prices (single query). The prices are loaded in a
+        (store, product) matrix of cents, and summed per store.
+        Returns one item per (location, currency), the stores covering
+        the most products first, then the cheapest.
+        """
+        product_codes = list(dict.fromkeys(product_codes))
+        rows = list(
+            self.filter(
+                product__code__in=product_codes, location_id__in=location_ids
+            ).values_list(
+                "location_id", "price__currency", "product__code", "price__price"
+            )
+        )
+        if not rows:
+            return []
+        store_keys = list(dict.fromkeys((row[0], row[1]) for row in rows))
+        store_index = {key: index for index, key in enumerate(store_keys)}
+        product_index = {code: index for index, code in enumerate(product_codes)}
+        cents = np.zeros((len(store_keys), len(product_codes)), dtype=np.int64)
+        found = np.zeros(cents.shape, dtype=bool)
+        store_indexes = [store_index[(row[0], row[1])] for row in rows]
+        product_indexes = [product_index[row[2]] for row in rows]
+        cents[store_indexes, product_indexes] = [int(row[3] * 100) for row in rows]
+        found[store_indexes, product_indexes] = True
+        totals = cents.sum(axis=1)
+        product_counts = found.sum(axis=1)
+        product_codes_array = np.array(product_codes, dtype=object)
+        return [
+            {
+                "location_id": store_keys[i][0],
+                "currency": store_keys[i][1],
+                "total": decimal.Decimal(int(totals[i])) / 100,
+                "product_count": int(product_counts[i]),
+                "coverage": round(int(product_counts[i]) / len(product_codes), 4),
+                "missing_product_codes": list(product_codes_array[~found[i]]),
+            }
+            for i in np.lexsort((totals, -product_counts))
+        ]
+
+    def refresh_for_prices(self, price_queryset):
+        return self.refresh(
+            price_queryset.order_by()
+            .values_list("product_id", "category_tag", "location_id")
+            .distinct()
+        )
+
+
+class LatestPrice(models.Model):
+    """
+    The most recent price of each product (or category) at each location,
+    maintained from the price signals (see LatestPriceQuerySet.refresh)
+    """
+
+    product = models.ForeignKey(
+        "products.Product",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="latest_prices",
+    )
+    category_tag = models.CharField(blank=True, null=True)
+    location = models.ForeignKey(
+        "locations.Location", on_delete=models.CASCADE, related_name="latest_prices"
+    )
+    price = models.OneToOneField(Price, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField(blank=True, null=True)
+
+    objects = models.Manager.from_queryset(LatestPriceQuerySet)()
+
+    class Meta:
+        db_table = "latest_prices"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "location"],
+                condition=models.Q(product__isnull=False),
+                name="latest_prices_unique_product_location",
+            ),
+            models.UniqueConstraint(
+                fields=["category_tag", "location"],
+                condition=models.Q(category_tag__isnull=False),
+                name="latest_prices_unique_category_tag_location",
+            ),
+        ]
+        indexes = [models.Index(fields=["location", "product"])]
+        verbose_name = "Latest price"
+        verbose_name_plural = "Latest prices"
+
+    def __str__(self):
+        return f"{self.product_id or self.category_tag} - {self.location_id}"
+
+
 @receiver(signals.post_save, sender=Price)
 def price_post_create_increment_counts(sender, instance, created, **kwargs):
     if created:
@@ -635,3 +1171,37 @@ def price_post_delete_decrement_counts(sender, instance, **kwargs):
         Location.objects.filter(id=instance.location.id).update(
             price_count=F("price_count") - 1
         )
+
+
+@receiver(signals.post_delete, sender=Price)
+def price_post_delete_log_deletion(sender, instance, **kwargs):
+    DeletedObject.objects.create(table_name=Price._meta.db_table, object_id=instance.id)
+
+
+@receiver(signals.post_save, sender=Price)
+@receiver(signals.post_delete, sender=Price)
+def price_post_save_or_delete_invalidate_stats_cache(sender, instance, **kwargs):
+    price_utils.invalidate_price_stats_cache()
+
+
+@receiver(signals.post_save, sender=Price)
+@receiver(signals.post_delete, sender=Price)
+def price_post_save_or_delete_update_product_price_summaries(
+    sender, instance, **kwargs
+):
+    if instance.product_id:
+        Product.objects.filter(id=instance.product_id).update_price_summaries()
+
+
+@receiver(signals.post_save, sender=Price)
+@receiver(signals.post_delete, sender=Price)
+def price_post_save_or_delete_update_latest_prices(sender, instance, **kwargs):
+    # also refresh the previous key (if the price's category_tag changed)
+    LatestPrice.objects.refresh(
+        [(instance.product_id, instance.category_tag, instance.location_id)]
+        + list(
+            LatestPrice.objects.filter(price_id=instance.id).values_list(
+                "product_id", "category_tag", "location_id"
+            )
+        )
+    )
@@ -1,15 +1,23 @@
+import io
+import tempfile
+import threading
 from decimal import Decimal
 
+import numpy as np
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
 
 from open_prices.common import constants
+from open_prices.common.models import DeletedObject
 from open_prices.locations import constants as location_constants
 from open_prices.locations.factories import LocationFactory
 from open_prices.locations.models import Location
 from open_prices.prices import constants as price_constants
+from open_prices.prices import utils as price_utils
 from open_prices.prices.factories import PriceFactory
-from open_prices.prices.models import Price
+from open_prices.prices.models import ExchangeRate, LatestPrice, Price
 from open_prices.products.factories import ProductFactory
 from open_prices.products.models import Product
 from open_prices.proofs import constants as proof_constants
@@ -67,6 +75,15 @@ class PriceQuerySetTest(TestCase):
         self.assertEqual(Price.objects.count(), 3)
         self.assertEqual(Price.objects.has_kind_consumption().count(), 1)
 
+    def test_source_category(self):
+        self.assertEqual(Price.objects.count(), 3)
+        self.assertEqual(
+            Price.objects.filter(source_category=constants.SOURCE_WEB).count(), 1
+        )
+        self.assertEqual(
+            Price.objects.filter(source_category=constants.SOURCE_OTHER).count(), 2
+        )
+
     def with_extra_fields(self):
         self.assertEqual(Price.objects.count(), 3)
         self.assertEqual(
@@ -112,6 +129,19 @@ class PriceQuerySetTest(TestCase):
             },
         )
 
+    def test_calculate_distribution_stats(self):
+        stats = Price.objects.calculate_distribution_stats(histogram_bins=5)
+        self.assertEqual(stats["price__count"], 3)
+        self.assertEqual(stats["price__median"], 8)
+        self.assertEqual(len(stats["price__histogram"]), 5)
+        self.assertEqual(sum(b["count"] for b in stats["price__histogram"]), 3)
+        # single value: a single bucket
+        stats = Price.objects.filter(price=10).calculate_distribution_stats()
+        self.assertEqual(stats["price__median"], 10)
+        self.assertEqual(
+            stats["price__histogram"], [{"min": 10, "max": 10, "count": 1}]
+        )
+
 
 class PriceModelSaveTest(TestCase):
     @classmethod
@@ -577,6 +607,235 @@ class PriceModelSaveTest(TestCase):
         self.assertEqual(Product.objects.get(id=product.id).price_count, 2)
 
 
+class PriceUnitPriceTest(TestCase):
+    def test_compute_unit_price(self):
+        for args, expected in [
+            ((3, price_constants.TYPE_PRODUCT, None, 500, "g"), ("6.00", "KILOGRAM")),
+            ((1.5, price_constants.TYPE_PRODUCT, None, 33, "cl"), ("4.55", "LITRE")),
+            ((2, price_constants.TYPE_PRODUCT, None, 2, "L"), ("1.00", "LITRE")),
+            ((2, price_constants.TYPE_PRODUCT, None, None, None), (None, None)),
+            ((2, price_constants.TYPE_PRODUCT, None, 6, "pieces"), (None, None)),
+            (
+                (2, price_constants.TYPE_CATEGORY, "KILOGRAM", None, None),
+                ("2", "KILOGRAM"),
+            ),
+            ((2, price_constants.TYPE_CATEGORY, "UNIT", None, None), ("2", "UNIT")),
+        ]:
+            with self.subTest(args=args):
+                unit_price, unit = price_utils.compute_unit_price(*args)
+                self.assertEqual(
+                    (unit_price, unit),
+                    (Decimal(expected[0]) if expected[0] else None, expected[1]),
+                )
+
+    def test_price_unit_price_set_on_save(self):
+        product = ProductFactory(product_quantity=250, product_quantity_unit="g")
+        price = PriceFactory(product_code=product.code, price=2)
+        self.assertEqual(price.unit_price, 8)
+        self.assertEqual(
+            price.unit_price_unit, price_constants.UNIT_PRICE_UNIT_KILOGRAM
+        )
+        price.price = 3
+        price.save()
+        self.assertEqual(Price.objects.get(id=price.id).unit_price, 12)
+
+    def test_update_unit_prices(self):
+        product = ProductFactory()
+        price = PriceFactory(product_code=product.code, price=2)
+        self.assertIsNone(price.unit_price)
+        # the product quantity is fetched later
+        Product.objects.filter(id=product.id).update(
+            product_quantity=1, product_quantity_unit="kg"
+        )
+        self.assertEqual(product.prices.update_unit_prices(), 1)
+        price.refresh_from_db()
+        self.assertEqual(price.unit_price, 2)
+        self.assertEqual(
+            price.unit_price_unit, price_constants.UNIT_PRICE_UNIT_KILOGRAM
+        )
+        # nothing changed: the price is not saved again
+        self.assertEqual(product.prices.update_unit_prices(), 0)
+        self.assertEqual(Price.objects.get(id=price.id).updated, price.updated)
+
+
+class PriceEurTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for date, rate in [("2024-01-05", "1.1"), ("2024-01-08", "1.25")]:
+            ExchangeRate.objects.create(currency="USD", date=date, rate=rate)
+
+    def test_get_rate(self):
+        self.assertEqual(ExchangeRate.objects.get_rate("EUR", "2024-01-01"), 1)
+        self.assertIsNone(ExchangeRate.objects.get_rate("USD", "2024-01-04"))
+        # week-end: the rate of the previous day
+        self.assertEqual(
+            ExchangeRate.objects.get_rate("USD", "2024-01-07"), Decimal("1.1")
+        )
+
+    def test_price_eur_set_on_save(self):
+        price = PriceFactory(price=11, currency="USD", date="2024-01-06")
+        self.assertEqual(price.price_eur, 10)
+        price = PriceFactory(price=11, currency="EUR", date="2024-01-06")
+        self.assertEqual(price.price_eur, 11)
+        price = PriceFactory(price=11, currency="GBP", date="2024-01-06")
+        self.assertIsNone(price.price_eur)
+
+    def test_update_eur_prices(self):
+        prices = [
+            PriceFactory(price=10, currency=currency, date=date)
+            for currency, date in [
+                ("USD", "2024-01-04"),
+                ("USD", "2024-01-06"),
+                ("USD", "2024-01-09"),
+                ("EUR", "2024-01-06"),
+            ]
+        ]
+        Price.objects.update(price_eur=None)
+        # the first price has no rate: unchanged (None)
+        self.assertEqual(Price.objects.update_eur_prices(batch_size=3), 3)
+        self.assertEqual(
+            [Price.objects.get(id=price.id).price_eur for price in prices],
+            [None, Decimal("9.09"), Decimal("8.00"), Decimal("10.00")],
+        )
+        # nothing changed
+        self.assertEqual(Price.objects.update_eur_prices(), 0)
+
+    def test_import_exchange_rates(self):
+        price = PriceFactory(price=10, currency="USD", date="2024-01-10")
+        self.assertEqual(price.price_eur, Decimal("8.00"))
+        price_old = PriceFactory(price=10, currency="USD", date="2024-01-06")
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            # the 2024-01-05 rate is already known
+            f.write(
+                "Date,USD,JPY,ABC,\n"
+                "2024-01-10,2.0,N/A,1.0,\n"
+                "2024-01-05,1.1,N/A,1.0,\n"
+            )
+            f.flush()
+            stdout = io.StringIO()
+            call_command("import_exchange_rates", path=f.name, stdout=stdout)
+            self.assertIn("1 exchange rates imported", stdout.getvalue())
+            self.assertIn("1 EUR prices updated", stdout.getvalue())
+            self.assertEqual(ExchangeRate.objects.count(), 3)
+            self.assertEqual(Price.objects.get(id=price.id).price_eur, 5)
+            # older prices are not looked at
+            self.assertEqual(
+                Price.objects.get(id=price_old.id).updated, price_old.updated
+            )
+            # same file again: nothing to do
+            stdout = io.StringIO()
+            call_command("import_exchange_rates", path=f.name, stdout=stdout)
+            self.assertIn("0 exchange rates imported", stdout.getvalue())
+
+
+class PriceOutlierTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = ProductFactory(code="8001505005707")
+        cls.prices = [
+            PriceFactory(product_code=cls.product.code, price=price, currency="EUR")
+            for price in [2, 2, 3, 2, 3, 250]
+        ]
+        # other group: not enough prices to be scored
+        cls.price_usd = PriceFactory(
+            product_code=cls.product.code, price=3, currency="USD"
+        )
+
+    def test_compute_outlier_scores(self):
+        scores = price_utils.compute_outlier_scores(
+            np.array([1.0, 1.1, 1.2, 1.0, 12.0])
+        )
+        self.assertEqual((np.abs(scores) > 3.5).tolist(), [False] * 4 + [True])
+        # MAD = 0: mean absolute deviation
+        scores = price_utils.compute_outlier_scores(np.array([1.0, 1, 1, 1, 100]))
+        self.assertTrue(scores[-1] > 3.5)
+        self.assertEqual(scores[0], 0)
+        scores = price_utils.compute_outlier_scores(np.array([1.0, 1, 1]))
+        self.assertEqual(scores.tolist(), [0, 0, 0])
+
+    def test_update_outliers(self):
+        self.assertEqual(Price.objects.filter(price_is_outlier=None).count(), 7)
+        self.assertEqual(
+            Price.objects.filter(price_is_outlier=None).update_outliers(), 7
+        )
+        self.assertEqual(
+            list(Price.objects.filter(price_is_outlier=True)), [self.prices[-1]]
+        )
+        self.assertTrue(Price.objects.get(id=self.prices[-1].id).price_outlier_score)
+        price_usd = Price.objects.get(id=self.price_usd.id)
+        self.assertFalse(price_usd.price_is_outlier)
+        self.assertIsNone(price_usd.price_outlier_score)
+        self.assertEqual(Price.objects.exclude_outliers().count(), 6)
+        self.assertEqual(
+            self.product.price__stats(exclude_outliers=True)["price__max"], 3
+        )
+        # incremental: nothing new
+        self.assertEqual(
+            Price.objects.filter(price_is_outlier=None).update_outliers(), 0
+        )
+        # a new price: its group is rescored, but only the new price is saved
+        # (no flip in the group)
+        updated_before = dict(Price.objects.values_list("id", "updated"))
+        price_new = PriceFactory(
+            product_code=self.product.code, price=250, currency="EUR"
+        )
+        self.assertEqual(Price.objects.exclude_outliers().count(), 7)
+        self.assertEqual(
+            Price.objects.filter(price_is_outlier=None).update_outliers(), 1
+        )
+        self.assertEqual(Price.objects.filter(price_is_outlier=True).count(), 2)
+        self.assertIsNotNone(Price.objects.get(id=price_new.id).price_outlier_score)
+        self.assertEqual(
+            dict(Price.objects.exclude(id=price_new.id).values_list("id", "updated")),
+            updated_before,
+        )
+
+
+class PriceListBenchmarkTest(TestCase):
+    def test_benchmark_price_list(self):
+        PriceFactory(price=10)
+        PriceFactory(
+            type=price_constants.TYPE_CATEGORY,
+            category_tag="en:apples",
+            price_per=price_constants.PRICE_PER_KILOGRAM,
+            price=2,
+        )
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(
+            "benchmark_price_list", size=5, repeat=1, stdout=stdout, stderr=stderr
+        )
+        self.assertIn("speedup", stdout.getvalue())
+        self.assertEqual(stderr.getvalue(), "")
+
+
+class LatestPriceRefreshTest(TransactionTestCase):
+    def test_concurrent_refresh(self):
+        price = PriceFactory(
+            location_osm_id=652825274,
+            location_osm_type=location_constants.OSM_TYPE_NODE,
+        )
+        key = (price.product_id, None, price.location_id)
+        errors = []
+
+        def refresh_in_thread():
+            try:
+                LatestPrice.objects.refresh([key])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            LatestPrice.objects.refresh([key])
+            thread = threading.Thread(target=refresh_in_thread)
+            thread.start()
+            thread.join(timeout=0.5)
+            self.assertTrue(thread.is_alive())  # waits for the lock
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(LatestPrice.objects.get().price_id, price.id)
+
+
 class PriceModelUpdateTest(TestCase):
     def test_price_update(self):
         user_session = SessionFactory()
@@ -620,3 +879,13 @@ class PriceModelDeleteTest(TestCase):
         self.assertEqual(Proof.objects.get(id=user_proof.id).price_count, 0)
         self.assertEqual(Location.objects.get(id=location.id).price_count, 0)
         self.assertEqual(Product.objects.get(id=product.id).price_count, 0)
+
+    def test_price_deletion_logged(self):
+        price = PriceFactory()
+        price_id = price.id
+        price.delete()
+        self.assertTrue(
+            DeletedObject.objects.filter(
+                table_name="prices", object_id=price_id
+            ).exists()
+        )
@@ -0,0 +1,170 @@
+import datetime
+import decimal
+import hashlib
+import itertools
+import json
+
+import numpy as np
+from django.core.cache import cache
+
+from open_prices.prices import constants as price_constants
+
+
+def get_price_stats_cache_version() -> int:
+    return cache.get_or_set(price_constants.PRICE_STATS_CACHE_VERSION_KEY, 1, None)
+
+
+def invalidate_price_stats_cache():
+    """
+    Invalidate all the cached stats at once (the version is part of the keys)
+    """
+    try:
+        cache.incr(price_constants.PRICE_STATS_CACHE_VERSION_KEY)
+    except ValueError:  # version not set yet: nothing cached
+        pass
+
+
+def get_price_stats_cache_key(query_params) -> str:
+    """
+    Build the cache key of a filter set: the query params are normalized
+    (ignored params removed, empty values removed, keys & values sorted)
+    so that equivalent requests share the same key.
+    """
+    normalized_params = {
+        key: sorted(value for value in query_params.getlist(key) if value != "")
+        for key in sorted(query_params.keys())
+        if key not in price_constants.PRICE_STATS_CACHE_IGNORED_PARAMS
+    }
+    normalized_params = {
+        key: value for key, value in normalized_params.items() if value
+    }
+    params_hash = hashlib.sha256(
+        json.dumps(normalized_params, sort_keys=True).encode()
+    ).hexdigest()
+    return (
+        f"{price_constants.PRICE_STATS_CACHE_KEY_PREFIX}:"
+        f"{get_price_stats_cache_version()}:{params_hash}"
+    )
+
+
+def compute_unit_price(
+    price, price_type, price_per, product_quantity, product_quantity_unit
+) -> tuple[decimal.Decimal | None, str | None]:
+    """
+    Normalize a price per kilogram, litre or unit:
+    - category prices: already per kilogram or per unit (price_per)
+    - product prices: divided by the product quantity (converted to kg or L)
+    Returns (unit_price, unit), (None, None) if the price cannot be normalized
+    """
+    if price is None:
+        return None, None
+    price = decimal.Decimal(str(price))
+    if price_type == price_constants.TYPE_CATEGORY:
+        if price_per in price_constants.UNIT_PRICE_UNIT_LIST:
+            return price, price_per
+        return None, None
+    unit_and_factor = price_constants.PRODUCT_QUANTITY_UNIT_DICT.get(
+        (product_quantity_unit or "").lower()
+    )
+    if not product_quantity or not unit_and_factor:
+        return None, None
+    unit, factor = unit_and_factor
+    quantity = decimal.Decimal(product_quantity) * decimal.Decimal(factor)
+    unit_price = (price / quantity).quantize(
+        decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
+    )
+    if unit_price >= price_constants.UNIT_PRICE_MAX:  # wrong quantity
+        return None, None
+    return unit_price, unit
+
+
+def convert_to_eur(price, rate) -> decimal.Decimal | None:
+    """
+    Convert a price with its EUR exchange rate (1 EUR = rate currency)
+    """
+    if price is None or not rate:
+        return None
+    price_eur = (decimal.Decimal(str(price)) / decimal.Decimal(rate)).quantize(
+        decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
+    )
+    if price_eur >= price_constants.PRICE_EUR_MAX:
+        return None
+    return price_eur
+
+
+def compute_eur_prices(
+    rows: list[tuple], rate_arrays: dict, default_date: datetime.date
+) -> list[tuple]:
+    """
+    Convert many prices to EUR at once: for each currency, the rate of each
+    price date is found with a single np.searchsorted on the rate dates
+    (most recent rate on or before the date).
+
+    :param rows: (id, price, currency, date, ...) tuples (extra items ignored)
+    :param rate_arrays: see ExchangeRateQuerySet.get_rate_arrays
+    :return: (id, price_eur) tuples
+    """
+    result = []
+    rows = sorted(rows, key=lambda row: row[2] or "")
+    for currency, group in itertools.groupby(rows, key=lambda row: row[2]):
+        group = list(group)
+        if currency == price_constants.EXCHANGE_RATE_REFERENCE_CURRENCY:
+            rates = [1] * len(group)
+        elif currency in rate_arrays:
+            rate_dates, rate_values = rate_arrays[currency]
+            price_dates = np.array(
+                [row[3] or default_date for row in group], dtype="datetime64[D]"
+            )
+            indexes = np.searchsorted(rate_dates, price_dates, side="right") - 1
+            rates = [rate_values[i] if i >= 0 else None for i in indexes]
+        else:
+            rates = [None] * len(group)
+        result.extend(
+            (row[0], convert_to_eur(row[1], rate)) for row, rate in zip(group, rates)
+        )
+    return result
+
+
+def compute_outlier_scores(values: np.ndarray) -> np.ndarray:
+    """
+    Modified z-scores of a group of prices (Iglewicz & Hoaglin):
+    0.6745 * (x - median) / MAD
+    When more than half of the prices are equal (MAD = 0), the mean absolute
+    deviation is used instead. All the scores are 0 if the prices are equal.
+    """
+    median = np.median(values)
+    deviations = values - median
+    mad = np.median(np.abs(deviations))
+    if mad:
+        return price_constants.PRICE_OUTLIER_MAD_FACTOR * deviations / mad
+    mean_ad = np.mean(np.abs(deviations))
+    if mean_ad:
+        return price_constants.PRICE_OUTLIER_MEAN_AD_FACTOR * deviations / mean_ad
+    return np.zeros(len(values))
+
+
+def detect_outliers(rows: list[tuple]) -> list[tuple]:
+    """
+    Score many prices at once: the rows are grouped by key, and each group
+    is scored with a single vectorized computation.
+    Groups smaller than PRICE_OUTLIER_MIN_GROUP_SIZE are not scored.
+
+    :param rows: (id, group key, price) tuples
+    :return: (id, outlier_score, is_outlier) tuples
+    """
+    result = []
+    rows = sorted(rows, key=lambda row: row[1])
+    for _, group in itertools.groupby(rows, key=lambda row: row[1]):
+        group = list(group)
+        if len(group) < price_constants.PRICE_OUTLIER_MIN_GROUP_SIZE:
+            result.extend((row[0], None, False) for row in group)
+            continue
+        scores = compute_outlier_scores(
+            np.array([row[2] for row in group], dtype=np.float64)
+        )
+        is_outliers = np.abs(scores) > price_constants.PRICE_OUTLIER_SCORE_THRESHOLD
+        result.extend(
+            (row[0], round(float(score), 2), bool(is_outlier))
+            for row, score, is_outlier in zip(group, scores, is_outliers)
+        )
+    return result
@@ -15,5 +15,5 @@ class ProductAdmin(admin.ModelAdmin):
         "proof_count",
         "created",
     )
-    list_filter = ("source",)
+    list_filter = ("source", "code_type", "code_has_valid_check_digit")
     search_fields = ("code",)
@@ -3,3 +3,17 @@ from openfoodfacts import Flavor
 SOURCE_OFF = Flavor.off
 SOURCE_LIST = [Flavor.off, Flavor.obf, Flavor.opff, Flavor.opf, Flavor.off_pro]
 SOURCE_CHOICES = [(key, key) for key in SOURCE_LIST]
+
+# barcode length classes (GTIN)
+BARCODE_TYPE_EAN8 = "EAN8"
+BARCODE_TYPE_UPCA = "UPCA"
+BARCODE_TYPE_EAN13 = "EAN13"
+BARCODE_TYPE_GTIN14 = "GTIN14"
+BARCODE_TYPE_LENGTH_DICT = {
+    8: BARCODE_TYPE_EAN8,
+    12: BARCODE_TYPE_UPCA,
+    13: BARCODE_TYPE_EAN13,
+    14: BARCODE_TYPE_GTIN14,
+}
+BARCODE_TYPE_LIST = list(BARCODE_TYPE_LENGTH_DICT.values())
+BARCODE_TYPE_CHOICES = [(key, key) for key in BARCODE_TYPE_LIST]
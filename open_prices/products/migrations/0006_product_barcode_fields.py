@@ -0,0 +1,71 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+import itertools
+
+from django.db import migrations, models
+
+from open_prices.products import utils as product_utils
+
+BATCH_SIZE = 10000
+
+
+def init_barcode_fields(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    # stream the products (server-side cursor), one batch in memory at a time
+    products = Product.objects.only("id", "code").order_by("id")
+    products = products.iterator(chunk_size=BATCH_SIZE)
+    while batch := list(itertools.islice(products, BATCH_SIZE)):
+        for product, barcode_fields in zip(
+            batch,
+            product_utils.compute_barcode_fields([product.code for product in batch]),
+        ):
+            for field_name, value in barcode_fields.items():
+                setattr(product, field_name, value)
+        Product.objects.bulk_update(
+            batch,
+            fields=["code_type", "code_normalized", "code_has_valid_check_digit"],
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0005_product_location_type_osm_country_count_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="code_has_valid_check_digit",
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="code_normalized",
+            field=models.CharField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="code_type",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("EAN8", "EAN8"),
+                    ("UPCA", "UPCA"),
+                    ("EAN13", "EAN13"),
+                    ("GTIN14", "GTIN14"),
+                ],
+                db_index=True,
+                max_length=10,
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("code_has_valid_check_digit", False)),
+                fields=["code_has_valid_check_digit"],
+                name="products_invalid_barcode_idx",
+            ),
+        ),
+        migrations.RunPython(init_barcode_fields, migrations.RunPython.noop),
+    ]
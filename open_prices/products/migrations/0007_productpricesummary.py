@@ -0,0 +1,384 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("locations", "0008_location_locations_updated_93d429_idx"),
+        ("products", "0006_product_barcode_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductPriceSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("ADP", "ADP"),
+                            ("AED", "AED"),
+                            ("AFA", "AFA"),
+                            ("AFN", "AFN"),
+                            ("ALK", "ALK"),
+                            ("ALL", "ALL"),
+                            ("AMD", "AMD"),
+                            ("ANG", "ANG"),
+                            ("AOA", "AOA"),
+                            ("AOK", "AOK"),
+                            ("AON", "AON"),
+                            ("AOR", "AOR"),
+                            ("ARA", "ARA"),
+                            ("ARL", "ARL"),
+                            ("ARM", "ARM"),
+                            ("ARP", "ARP"),
+                            ("ARS", "ARS"),
+                            ("ATS", "ATS"),
+                            ("AUD", "AUD"),
+                            ("AWG", "AWG"),
+                            ("AZM", "AZM"),
+                            ("AZN", "AZN"),
+                            ("BAD", "BAD"),
+                            ("BAM", "BAM"),
+                            ("BAN", "BAN"),
+                            ("BBD", "BBD"),
+                            ("BDT", "BDT"),
+                            ("BEC", "BEC"),
+                            ("BEF", "BEF"),
+                            ("BEL", "BEL"),
+                            ("BGL", "BGL"),
+                            ("BGM", "BGM"),
+                            ("BGN", "BGN"),
+                            ("BGO", "BGO"),
+                            ("BHD", "BHD"),
+                            ("BIF", "BIF"),
+                            ("BMD", "BMD"),
+                            ("BND", "BND"),
+                            ("BOB", "BOB"),
+                            ("BOL", "BOL"),
+                            ("BOP", "BOP"),
+                            ("BOV", "BOV"),
+                            ("BRB", "BRB"),
+                            ("BRC", "BRC"),
+                            ("BRE", "BRE"),
+                            ("BRL", "BRL"),
+                            ("BRN", "BRN"),
+                            ("BRR", "BRR"),
+                            ("BRZ", "BRZ"),
+                            ("BSD", "BSD"),
+                            ("BTN", "BTN"),
+                            ("BUK", "BUK"),
+                            ("BWP", "BWP"),
+                            ("BYB", "BYB"),
+                            ("BYN", "BYN"),
+                            ("BYR", "BYR"),
+                            ("BZD", "BZD"),
+                            ("CAD", "CAD"),
+                            ("CDF", "CDF"),
+                            ("CHE", "CHE"),
+                            ("CHF", "CHF"),
+                            ("CHW", "CHW"),
+                            ("CLE", "CLE"),
+                            ("CLF", "CLF"),
+                            ("CLP", "CLP"),
+                            ("CNH", "CNH"),
+                            ("CNX", "CNX"),
+                            ("CNY", "CNY"),
+                            ("COP", "COP"),
+                            ("COU", "COU"),
+                            ("CRC", "CRC"),
+                            ("CSD", "CSD"),
+                            ("CSK", "CSK"),
+                            ("CUC", "CUC"),
+                            ("CUP", "CUP"),
+                            ("CVE", "CVE"),
+                            ("CYP", "CYP"),
+                            ("CZK", "CZK"),
+                            ("DDM", "DDM"),
+                            ("DEM", "DEM"),
+                            ("DJF", "DJF"),
+                            ("DKK", "DKK"),
+                            ("DOP", "DOP"),
+                            ("DZD", "DZD"),
+                            ("ECS", "ECS"),
+                            ("ECV", "ECV"),
+                            ("EEK", "EEK"),
+                            ("EGP", "EGP"),
+                            ("ERN", "ERN"),
+                            ("ESA", "ESA"),
+                            ("ESB", "ESB"),
+                            ("ESP", "ESP"),
+                            ("ETB", "ETB"),
+                            ("EUR", "EUR"),
+                            ("FIM", "FIM"),
+                            ("FJD", "FJD"),
+                            ("FKP", "FKP"),
+                            ("FRF", "FRF"),
+                            ("GBP", "GBP"),
+                            ("GEK", "GEK"),
+                            ("GEL", "GEL"),
+                            ("GHC", "GHC"),
+                            ("GHS", "GHS"),
+                            ("GIP", "GIP"),
+                            ("GMD", "GMD"),
+                            ("GNF", "GNF"),
+                            ("GNS", "GNS"),
+                            ("GQE", "GQE"),
+                            ("GRD", "GRD"),
+                            ("GTQ", "GTQ"),
+                            ("GWE", "GWE"),
+                            ("GWP", "GWP"),
+                            ("GYD", "GYD"),
+                            ("HKD", "HKD"),
+                            ("HNL", "HNL"),
+                            ("HRD", "HRD"),
+                            ("HRK", "HRK"),
+                            ("HTG", "HTG"),
+                            ("HUF", "HUF"),
+                            ("IDR", "IDR"),
+                            ("IEP", "IEP"),
+                            ("ILP", "ILP"),
+                            ("ILR", "ILR"),
+                            ("ILS", "ILS"),
+                            ("INR", "INR"),
+                            ("IQD", "IQD"),
+                            ("IRR", "IRR"),
+                            ("ISJ", "ISJ"),
+                            ("ISK", "ISK"),
+                            ("ITL", "ITL"),
+                            ("JMD", "JMD"),
+                            ("JOD", "JOD"),
+                            ("JPY", "JPY"),
+                            ("KES", "KES"),
+                            ("KGS", "KGS"),
+                            ("KHR", "KHR"),
+                            ("KMF", "KMF"),
+                            ("KPW", "KPW"),
+                            ("KRH", "KRH"),
+                            ("KRO", "KRO"),
+                            ("KRW", "KRW"),
+                            ("KWD", "KWD"),
+                            ("KYD", "KYD"),
+                            ("KZT", "KZT"),
+                            ("LAK", "LAK"),
+                            ("LBP", "LBP"),
+                            ("LKR", "LKR"),
+                            ("LRD", "LRD"),
+                            ("LSL", "LSL"),
+                            ("LTL", "LTL"),
+                            ("LTT", "LTT"),
+                            ("LUC", "LUC"),
+                            ("LUF", "LUF"),
+                            ("LUL", "LUL"),
+                            ("LVL", "LVL"),
+                            ("LVR", "LVR"),
+                            ("LYD", "LYD"),
+                            ("MAD", "MAD"),
+                            ("MAF", "MAF"),
+                            ("MCF", "MCF"),
+                            ("MDC", "MDC"),
+                            ("MDL", "MDL"),
+                            ("MGA", "MGA"),
+                            ("MGF", "MGF"),
+                            ("MKD", "MKD"),
+                            ("MKN", "MKN"),
+                            ("MLF", "MLF"),
+                            ("MMK", "MMK"),
+                            ("MNT", "MNT"),
+                            ("MOP", "MOP"),
+                            ("MRO", "MRO"),
+                            ("MRU", "MRU"),
+                            ("MTL", "MTL"),
+                            ("MTP", "MTP"),
+                            ("MUR", "MUR"),
+                            ("MVP", "MVP"),
+                            ("MVR", "MVR"),
+                            ("MWK", "MWK"),
+                            ("MXN", "MXN"),
+                            ("MXP", "MXP"),
+                            ("MXV", "MXV"),
+                            ("MYR", "MYR"),
+                            ("MZE", "MZE"),
+                            ("MZM", "MZM"),
+                            ("MZN", "MZN"),
+                            ("NAD", "NAD"),
+                            ("NGN", "NGN"),
+                            ("NIC", "NIC"),
+                            ("NIO", "NIO"),
+                            ("NLG", "NLG"),
+                            ("NOK", "NOK"),
+                            ("NPR", "NPR"),
+                            ("NZD", "NZD"),
+                            ("OMR", "OMR"),
+                            ("PAB", "PAB"),
+                            ("PEI", "PEI"),
+                            ("PEN", "PEN"),
+                            ("PES", "PES"),
+                            ("PGK", "PGK"),
+                            ("PHP", "PHP"),
+                            ("PKR", "PKR"),
+                            ("PLN", "PLN"),
+                            ("PLZ", "PLZ"),
+                            ("PTE", "PTE"),
+                            ("PYG", "PYG"),
+                            ("QAR", "QAR"),
+                            ("RHD", "RHD"),
+                            ("ROL", "ROL"),
+                            ("RON", "RON"),
+                            ("RSD", "RSD"),
+                            ("RUB", "RUB"),
+                            ("RUR", "RUR"),
+                            ("RWF", "RWF"),
+                            ("SAR", "SAR"),
+                            ("SBD", "SBD"),
+                            ("SCR", "SCR"),
+                            ("SDD", "SDD"),
+                            ("SDG", "SDG"),
+                            ("SDP", "SDP"),
+                            ("SEK", "SEK"),
+                            ("SGD", "SGD"),
+                            ("SHP", "SHP"),
+                            ("SIT", "SIT"),
+                            ("SKK", "SKK"),
+                            ("SLE", "SLE"),
+                            ("SLL", "SLL"),
+                            ("SOS", "SOS"),
+                            ("SRD", "SRD"),
+                            ("SRG", "SRG"),
+                            ("SSP", "SSP"),
+                            ("STD", "STD"),
+                            ("STN", "STN"),
+                            ("SUR", "SUR"),
+                            ("SVC", "SVC"),
+                            ("SYP", "SYP"),
+                            ("SZL", "SZL"),
+                            ("THB", "THB"),
+                            ("TJR", "TJR"),
+                            ("TJS", "TJS"),
+                            ("TMM", "TMM"),
+                            ("TMT", "TMT"),
+                            ("TND", "TND"),
+                            ("TOP", "TOP"),
+                            ("TPE", "TPE"),
+                            ("TRL", "TRL"),
+                            ("TRY", "TRY"),
+                            ("TTD", "TTD"),
+                            ("TWD", "TWD"),
+                            ("TZS", "TZS"),
+                            ("UAH", "UAH"),
+                            ("UAK", "UAK"),
+                            ("UGS", "UGS"),
+                            ("UGX", "UGX"),
+                            ("USD", "USD"),
+                            ("USN", "USN"),
+                            ("USS", "USS"),
+                            ("UYI", "UYI"),
+                            ("UYP", "UYP"),
+                            ("UYU", "UYU"),
+                            ("UYW", "UYW"),
+                            ("UZS", "UZS"),
+                            ("VEB", "VEB"),
+                            ("VED", "VED"),
+                            ("VEF", "VEF"),
+                            ("VES", "VES"),
+                            ("VND", "VND"),
+                            ("VNN", "VNN"),
+                            ("VUV", "VUV"),
+                            ("WST", "WST"),
+                            ("XAF", "XAF"),
+                            ("XAG", "XAG"),
+                            ("XAU", "XAU"),
+                            ("XBA", "XBA"),
+                            ("XBB", "XBB"),
+                            ("XBC", "XBC"),
+                            ("XBD", "XBD"),
+                            ("XCD", "XCD"),
+                            ("XDR", "XDR"),
+                            ("XEU", "XEU"),
+                            ("XFO", "XFO"),
+                            ("XFU", "XFU"),
+                            ("XOF", "XOF"),
+                            ("XPD", "XPD"),
+                            ("XPF", "XPF"),
+                            ("XPT", "XPT"),
+                            ("XRE", "XRE"),
+                            ("XSU", "XSU"),
+                            ("XTS", "XTS"),
+                            ("XUA", "XUA"),
+                            ("XXX", "XXX"),
+                            ("YDD", "YDD"),
+                            ("YER", "YER"),
+                            ("YUD", "YUD"),
+                            ("YUM", "YUM"),
+                            ("YUN", "YUN"),
+                            ("YUR", "YUR"),
+                            ("ZAL", "ZAL"),
+                            ("ZAR", "ZAR"),
+                            ("ZMK", "ZMK"),
+                            ("ZMW", "ZMW"),
+                            ("ZRN", "ZRN"),
+                            ("ZRZ", "ZRZ"),
+                            ("ZWD", "ZWD"),
+                            ("ZWL", "ZWL"),
+                            ("ZWR", "ZWR"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("price_count", models.PositiveIntegerField(default=0)),
+                ("price_min", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("price_max", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("price_avg", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("price_median", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("last_price_date", models.DateField(blank=True, null=True)),
+                ("updated", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "last_location",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="locations.location",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="price_summaries",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Product price summary",
+                "verbose_name_plural": "Product price summaries",
+                "db_table": "product_price_summaries",
+                "indexes": [
+                    models.Index(
+                        fields=["currency", "price_min"],
+                        name="product_pri_currenc_53b9b7_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "currency"),
+                        name="product_price_summaries_unique_product_currency",
+                    )
+                ],
+            },
+        ),
+    ]
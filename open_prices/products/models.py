@@ -1,21 +1,138 @@
+from decimal import Decimal
+
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
-from django.db.models import Count, signals
+from django.db.models import Avg, Count, F, Max, Min, OuterRef, Subquery, signals
+from django.db.models.functions import Coalesce
 from django.dispatch import receiver
 from django.utils import timezone
 from django_q.tasks import async_task
 
+from open_prices.common import constants
 from open_prices.products import constants as product_constants
+from open_prices.products import utils as product_utils
 
 
 class ProductQuerySet(models.QuerySet):
     def has_prices(self):
         return self.filter(price_count__gt=0)
 
+    def has_invalid_barcode(self):
+        return self.filter(code_has_valid_check_digit=False)
+
     def with_stats(self):
         return self.annotate(price_count_annotated=Count("prices", distinct=True))
 
+    def update_price_summaries(self):
+        """
+        Recompute the price summaries (one per currency) of the products:
+        2 aggregate queries, 1 upsert & 1 delete (stale currencies)
+        """
+        from open_prices.common.utils import PercentileCont
+        from open_prices.prices.models import Price
+
+        product_ids = self.values("id")
+        prices = Price.objects.filter(
+            product_id__in=product_ids, currency__isnull=False
+        ).order_by()
+        summary_rows = prices.values("product_id", "currency").annotate(
+            price_count=Count("id"),
+            price_min=Min("price"),
+            price_max=Max("price"),
+            price_avg=Avg("price"),
+            price_median=PercentileCont("price", percentiles=0.5),
+            last_price_date=Max("date"),
+        )
+        # location of the most recent price, per product & currency
+        last_location_dict = {
+            (product_id, currency): location_id
+            for product_id, currency, location_id in prices.order_by(
+                "product_id", "currency", F("date").desc(nulls_last=True), "-id"
+            )
+            .distinct("product_id", "currency")
+            .values_list("product_id", "currency", "location_id")
+        }
+        summaries = ProductPriceSummary.objects.bulk_create(
+            [
+                ProductPriceSummary(
+                    **{
+                        **row,
+                        "price_avg": round(row["price_avg"], 2),
+                        "price_median": round(Decimal(row["price_median"]), 2),
+                    },
+                    last_location_id=last_location_dict.get(
+                        (row["product_id"], row["currency"])
+                    ),
+                )
+                for row in summary_rows
+            ],
+            update_conflicts=True,
+            unique_fields=["product", "currency"],
+            update_fields=ProductPriceSummary.SUMMARY_FIELDS + ["updated"],
+        )
+        ProductPriceSummary.objects.filter(product_id__in=product_ids).exclude(
+            id__in=[summary.id for summary in summaries]
+        ).delete()
+        return len(summaries)
+
+    def update_barcode_fields(self, batch_size=10000):
+        """
+        Backfill the stored barcode fields (computed in batches,
+        see product_utils.compute_barcode_fields)
+        """
+        updated_count = 0
+        products = []
+        for product in self.only("id", "code").iterator(chunk_size=batch_size):
+            products.append(product)
+            if len(products) == batch_size:
+                updated_count += bulk_update_barcode_fields(products)
+                products = []
+        if products:
+            updated_count += bulk_update_barcode_fields(products)
+        return updated_count
+
+    def update_price_counts(self):
+        """
+        Update the price & location counts of all the products
+        with a single UPDATE (instead of Product.update_*_count on each)
+        """
+        from open_prices.locations import constants as location_constants
+        from open_prices.prices.models import Price
+
+        product_prices = (
+            Price.objects.filter(product=OuterRef("pk")).order_by().values("product")
+        )
+
+        def count_subquery(prices, expression):
+            return Coalesce(
+                Subquery(prices.annotate(count=expression).values("count")), 0
+            )
+
+        return self.update(
+            price_count=count_subquery(product_prices, Count("id")),
+            price_currency_count=count_subquery(
+                product_prices, Count("currency", distinct=True)
+            ),
+            location_count=count_subquery(
+                product_prices, Count("location_id", distinct=True)
+            ),
+            location_type_osm_country_count=count_subquery(
+                product_prices.filter(location__type=location_constants.TYPE_OSM),
+                Count("location__osm_address_country", distinct=True),
+            ),
+        )
+
+
+def bulk_update_barcode_fields(products: list) -> int:
+    for product, barcode_fields in zip(
+        products,
+        product_utils.compute_barcode_fields([product.code for product in products]),
+    ):
+        for field_name, value in barcode_fields.items():
+            setattr(product, field_name, value)
+    return Product.objects.bulk_update(products, fields=Product.BARCODE_FIELDS)
+
 
 class Product(models.Model):
     ARRAY_FIELDS = ["categories_tags", "brands_tags", "labels_tags"]
@@ -25,6 +142,7 @@ class Product(models.Model):
         "nova_group",
         "unique_scans_n",
     ]
+    BARCODE_FIELDS = ["code_type", "code_normalized", "code_has_valid_check_digit"]
     COUNT_FIELDS = [
         "price_count",
         "price_currency_count",
@@ -35,6 +153,15 @@ class Product(models.Model):
     ]
 
     code = models.CharField(unique=True)
+    code_type = models.CharField(
+        max_length=10,
+        choices=product_constants.BARCODE_TYPE_CHOICES,
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+    code_normalized = models.CharField(blank=True, null=True, db_index=True)
+    code_has_valid_check_digit = models.BooleanField(blank=True, null=True)
 
     source = models.CharField(
         max_length=10, choices=product_constants.SOURCE_CHOICES, blank=True, null=True
@@ -74,6 +201,13 @@ class Product(models.Model):
     class Meta:
         # managed = False
         db_table = "products"
+        indexes = [
+            models.Index(
+                fields=["code_has_valid_check_digit"],
+                condition=models.Q(code_has_valid_check_digit=False),
+                name="products_invalid_barcode_idx",
+            )
+        ]
         verbose_name = "Product"
         verbose_name_plural = "Products"
 
@@ -82,12 +216,21 @@ class Product(models.Model):
             if getattr(self, field_name) is None:
                 setattr(self, field_name, [])
 
+    def set_barcode_fields(self):
+        if self.code:
+            for field_name, value in product_utils.compute_barcode_fields([self.code])[
+                0
+            ].items():
+                setattr(self, field_name, value)
+
     def save(self, *args, **kwargs):
         """
         - set default values
+        - set barcode fields (type, normalized code, check digit validity)
         - run validations
         """
         self.set_default_values()
+        self.set_barcode_fields()
         self.full_clean()
         super().save(*args, **kwargs)
 
@@ -106,10 +249,13 @@ class Product(models.Model):
             return self.prices.exclude_discounted().calculate_avg()
         return self.prices.calculate_avg()
 
-    def price__stats(self, exclude_discounted=False):
+    def price__stats(self, exclude_discounted=False, exclude_outliers=False):
+        prices = self.prices.all()
         if exclude_discounted:
-            return self.prices.exclude_discounted().calculate_stats()
-        return self.prices.calculate_stats()
+            prices = prices.exclude_discounted()
+        if exclude_outliers:
+            prices = prices.exclude_outliers()
+        return prices.calculate_stats()
 
     def update_price_count(self):
         self.price_count = self.prices.count()
@@ -163,6 +309,59 @@ class Product(models.Model):
         self.save(update_fields=["proof_count"])
 
 
+class ProductPriceSummary(models.Model):
+    """
+    Precomputed price statistics of a product, per currency
+    (maintained from the price signals, see update_price_summaries)
+    """
+
+    SUMMARY_FIELDS = [
+        "price_count",
+        "price_min",
+        "price_max",
+        "price_avg",
+        "price_median",
+        "last_price_date",
+        "last_location_id",
+    ]
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="price_summaries"
+    )
+    currency = models.CharField(max_length=3, choices=constants.CURRENCY_CHOICES)
+
+    price_count = models.PositiveIntegerField(default=0)
+    price_min = models.DecimalField(max_digits=10, decimal_places=2)
+    price_max = models.DecimalField(max_digits=10, decimal_places=2)
+    price_avg = models.DecimalField(max_digits=10, decimal_places=2)
+    price_median = models.DecimalField(max_digits=10, decimal_places=2)
+    last_price_date = models.DateField(blank=True, null=True)
+    last_location = models.ForeignKey(
+        "locations.Location",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+
+    updated = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "product_price_summaries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "currency"],
+                name="product_price_summaries_unique_product_currency",
+            )
+        ]
+        indexes = [models.Index(fields=["currency", "price_min"])]
+        verbose_name = "Product price summary"
+        verbose_name_plural = "Product price summaries"
+
+    def __str__(self):
+        return f"{self.product} - {self.currency}"
+
+
 @receiver(signals.post_save, sender=Product)
 def product_post_create_fetch_and_save_data_from_openfoodfacts(
     sender, instance, created, **kwargs
@@ -14,6 +14,8 @@ def fetch_and_save_data_from_openfoodfacts(product: Product):
         for key, value in product_openfoodfacts_details.items():
             setattr(product, key, value)
         product.save()
+        # the product quantity is usually fetched after the first price
+        product.prices.update_unit_prices()
 
 
 def process_update(code: str, flavor: Flavor) -> None:
@@ -42,6 +44,7 @@ def process_update(code: str, flavor: Flavor) -> None:
                 setattr(product, key, value)
 
         product.save()
+        product.prices.update_unit_prices()
 
 
 def process_delete(code: str, flavor: Flavor):
@@ -11,7 +11,7 @@ from open_prices.locations.factories import LocationFactory
 from open_prices.prices.factories import PriceFactory
 from open_prices.products import constants as product_constants
 from open_prices.products.factories import ProductFactory
-from open_prices.products.models import Product
+from open_prices.products.models import Product, ProductPriceSummary
 from open_prices.products.tasks import process_update
 from open_prices.proofs.factories import ProofFactory
 from open_prices.users.factories import UserFactory
@@ -94,6 +94,25 @@ class ProductModelSaveTest(TransactionTestCase):
         # full OFF object
         ProductFactory(**PRODUCT_OFF)
 
+    def test_product_barcode_fields(self):
+        product = ProductFactory(code="8001505005707")
+        self.assertEqual(product.code_type, product_constants.BARCODE_TYPE_EAN13)
+        self.assertEqual(product.code_normalized, "8001505005707")
+        self.assertTrue(product.code_has_valid_check_digit)
+        product = ProductFactory(code="0036000291452")  # UPC-A padded to 13
+        self.assertEqual(product.code_type, product_constants.BARCODE_TYPE_EAN13)
+        self.assertEqual(product.code_normalized, "0036000291452")
+        self.assertTrue(product.code_has_valid_check_digit)
+        product = ProductFactory(code="036000291452")
+        self.assertEqual(product.code_type, product_constants.BARCODE_TYPE_UPCA)
+        self.assertEqual(product.code_normalized, "0036000291452")
+        product = ProductFactory(code="0123456789100")
+        self.assertFalse(product.code_has_valid_check_digit)
+        product = ProductFactory(code="test-code")
+        self.assertIsNone(product.code_type)
+        self.assertIsNone(product.code_normalized)
+        self.assertFalse(product.code_has_valid_check_digit)
+
 
 class ProductQuerySetTest(TestCase):
     @classmethod
@@ -105,6 +124,25 @@ class ProductQuerySetTest(TestCase):
     def test_has_prices(self):
         self.assertEqual(Product.objects.has_prices().count(), 1)
 
+    def test_has_invalid_barcode(self):
+        ProductFactory(code="8001505005707")
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertEqual(Product.objects.has_invalid_barcode().count(), 2)
+
+    def test_update_barcode_fields(self):
+        Product.objects.update(
+            code_type=None, code_normalized=None, code_has_valid_check_digit=None
+        )
+        self.assertEqual(Product.objects.has_invalid_barcode().count(), 0)
+        self.assertEqual(Product.objects.update_barcode_fields(batch_size=1), 2)
+        self.assertEqual(Product.objects.has_invalid_barcode().count(), 2)
+        self.assertEqual(
+            Product.objects.filter(
+                code_type=product_constants.BARCODE_TYPE_EAN13
+            ).count(),
+            2,
+        )
+
     def test_with_stats(self):
         product = Product.objects.with_stats().get(id=self.product_without_price.id)
         self.assertEqual(product.price_count_annotated, 0)
@@ -220,6 +258,51 @@ class ProductPropertyTest(TestCase):
         self.assertEqual(self.product.proof_count, 1)
 
 
+class ProductPriceSummaryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = LocationFactory()
+        cls.product = ProductFactory(code="8001505005707")
+        cls.prices = [
+            PriceFactory(
+                product_code=cls.product.code,
+                location_osm_id=cls.location.osm_id,
+                location_osm_type=cls.location.osm_type,
+                price=price,
+                currency="EUR",
+                date=date,
+            )
+            for price, date in [(1, "2024-01-01"), (2, "2024-03-01"), (6, "2024-02-01")]
+        ]
+        PriceFactory(product_code=cls.product.code, price=5, currency="USD")
+
+    def test_price_summaries_maintained_from_prices(self):
+        summary = ProductPriceSummary.objects.get(product=self.product, currency="EUR")
+        self.assertEqual(summary.price_count, 3)
+        self.assertEqual(summary.price_min, 1)
+        self.assertEqual(summary.price_max, 6)
+        self.assertEqual(summary.price_avg, 3)
+        self.assertEqual(summary.price_median, 2)
+        self.assertEqual(str(summary.last_price_date), "2024-03-01")
+        self.assertEqual(summary.last_location_id, self.location.id)
+        self.assertEqual(self.product.price_summaries.count(), 2)
+        # deletion
+        self.prices[2].delete()
+        summary.refresh_from_db()
+        self.assertEqual(summary.price_count, 2)
+        self.assertEqual(summary.price_max, 2)
+        # currency without prices anymore
+        self.product.prices.filter(currency="USD").get().delete()
+        self.assertEqual(self.product.price_summaries.count(), 1)
+
+    def test_update_price_summaries(self):
+        ProductPriceSummary.objects.all().delete()
+        self.assertEqual(Product.objects.all().update_price_summaries(), 2)
+        self.assertEqual(
+            ProductPriceSummary.objects.get(currency="USD").price_median, 5
+        )
+
+
 class TestProcessUpdate(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+import numpy as np
+from openfoodfacts.barcode import normalize_barcode
+
+from open_prices.products import constants as product_constants
+
+
+def compute_barcode_check_digit_validity(codes: list[str]) -> list[bool]:
+    """
+    Vectorized version of openfoodfacts.barcode.has_valid_check_digit:
+    the codes are grouped by length, and each group is checked with a
+    single matrix operation.
+    Codes that are not numeric (or too short) are considered invalid.
+    """
+    result = [False] * len(codes)
+    indexes_by_length = defaultdict(list)
+    for index, code in enumerate(codes):
+        if code and len(code) >= 2 and code.isascii() and code.isdigit():
+            indexes_by_length[len(code)].append(index)
+
+    for length, indexes in indexes_by_length.items():
+        digits = np.frombuffer(
+            "".join(codes[i] for i in indexes).encode(), dtype=np.uint8
+        ).reshape(len(indexes), length).astype(np.int64) - ord("0")
+        # weights 3, 1, 3... from right to left (excluding the check digit)
+        weights = np.where(np.arange(length - 1)[::-1] % 2 == 0, 3, 1)
+        check_digits = (10 - (digits[:, :-1] @ weights) % 10) % 10
+        for i, is_valid in zip(indexes, check_digits == digits[:, -1]):
+            result[i] = bool(is_valid)
+    return result
+
+
+def compute_barcode_fields(codes: list[str]) -> list[dict]:
+    """
+    Compute the stored barcode fields of a list of product codes:
+    - code_type: the length class (EAN-8, UPC-A, EAN-13, GTIN-14)
+    - code_normalized: leading zeros removed, padded to 8 or 13 digits
+    - code_has_valid_check_digit
+    """
+    check_digit_validity = compute_barcode_check_digit_validity(codes)
+    return [
+        {
+            "code_type": product_constants.BARCODE_TYPE_LENGTH_DICT.get(len(code))
+            if code.isascii() and code.isdigit()
+            else None,
+            "code_normalized": normalize_barcode(code)
+            if code.isascii() and code.isdigit()
+            else None,
+            "code_has_valid_check_digit": is_valid,
+        }
+        for code, is_valid in zip(codes, check_digit_validity)
+    ]
@@ -44,6 +44,11 @@ PROOF_PREDICTION_TYPE_CHOICES = [(key, key) for key in PROOF_PREDICTION_LIST]
 
 PRICE_TAG_EXTRACTION_TYPE = "PRICE_TAG_EXTRACTION"
 
+OCR_STATUS_SUCCESS = "SUCCESS"
+OCR_STATUS_ERROR = "ERROR"
+OCR_STATUS_LIST = [OCR_STATUS_SUCCESS, OCR_STATUS_ERROR]
+OCR_STATUS_CHOICES = [(key, key) for key in OCR_STATUS_LIST]
+
 PRICE_TAG_PREDICTION_TYPE_CHOICES = [
     (PRICE_TAG_EXTRACTION_TYPE, PRICE_TAG_EXTRACTION_TYPE)
 ]
@@ -0,0 +1,121 @@
+"""
+Fake Triton Inference Server
+- a local stand-in for the Triton gRPC server, serving the proof
+classification & price tag detection models (with batching)
+- returns deterministic outputs: no model weights needed
+- usable in tests, and to benchmark run_ml_models (with --latency to
+simulate the inference time)
+"""
+
+import time
+from concurrent import futures
+
+import grpc
+import numpy as np
+from tritonclient.grpc import service_pb2, service_pb2_grpc
+
+from open_prices.proofs.ml import (
+    PRICE_TAG_DETECTOR_IMAGE_SIZE,
+    PRICE_TAG_DETECTOR_LABEL_NAMES,
+    PRICE_TAG_DETECTOR_MODEL_NAME,
+    PROOF_CLASSIFICATION_LABEL_NAMES,
+    PROOF_CLASSIFICATION_MODEL_NAME,
+)
+
+# number of candidate boxes returned by the detection model (Yolo)
+FAKE_DETECTION_NUM_BOXES = 100
+
+
+class FakeTritonServicer(service_pb2_grpc.GRPCInferenceServiceServicer):
+    def __init__(self, latency: float = 0.0):
+        """
+        :param latency: the simulated inference time (in seconds) per request
+        """
+        self.latency = latency
+        self.request_count = 0
+        self.image_count = 0
+
+    def ServerLive(self, request, context):
+        return service_pb2.ServerLiveResponse(live=True)
+
+    def ServerReady(self, request, context):
+        return service_pb2.ServerReadyResponse(ready=True)
+
+    def ModelReady(self, request, context):
+        return service_pb2.ModelReadyResponse(
+            ready=request.name
+            in (PROOF_CLASSIFICATION_MODEL_NAME, PRICE_TAG_DETECTOR_MODEL_NAME)
+        )
+
+    def ModelInfer(self, request, context):
+        batch_size = request.inputs[0].shape[0]
+        self.request_count += 1
+        self.image_count += batch_size
+        if self.latency:
+            time.sleep(self.latency)
+
+        if request.model_name == PROOF_CLASSIFICATION_MODEL_NAME:
+            output = self.classification_output(batch_size)
+        elif request.model_name == PRICE_TAG_DETECTOR_MODEL_NAME:
+            output = self.detection_output(batch_size)
+        else:
+            context.abort(
+                grpc.StatusCode.NOT_FOUND, f"Unknown model: {request.model_name}"
+            )
+
+        response = service_pb2.ModelInferResponse(
+            model_name=request.model_name, model_version=request.model_version
+        )
+        response.outputs.add(name="output0", datatype="FP32", shape=list(output.shape))
+        response.raw_output_contents.append(output.tobytes())
+        return response
+
+    @staticmethod
+    def classification_output(batch_size: int) -> np.ndarray:
+        """Always predict the first label (score: 0.9)."""
+        num_labels = len(PROOF_CLASSIFICATION_LABEL_NAMES)
+        output = np.full(
+            (batch_size, num_labels), 0.1 / (num_labels - 1), dtype=np.float32
+        )
+        output[:, 0] = 0.9
+        return output
+
+    @staticmethod
+    def detection_output(batch_size: int) -> np.ndarray:
+        """Always detect a single box, in the top-left quarter of the model
+        input (score: 0.9)."""
+        output = np.zeros(
+            (
+                batch_size,
+                4 + len(PRICE_TAG_DETECTOR_LABEL_NAMES),
+                FAKE_DETECTION_NUM_BOXES,
+            ),
+            dtype=np.float32,
+        )
+        # (x_center, y_center, width, height), in model input pixels
+        output[:, 0:4, 0] = (
+            np.array([0.25, 0.25, 0.5, 0.5]) * PRICE_TAG_DETECTOR_IMAGE_SIZE
+        )
+        output[:, 4, 0] = 0.9
+        return output
+
+
+def start_fake_triton_server(
+    port: int = 0, latency: float = 0.0, max_workers: int = 4
+) -> tuple[grpc.Server, FakeTritonServicer, str]:
+    """Start a fake Triton server in a background thread.
+
+    :param port: the port to listen on, defaults to 0 (any free port)
+    :return: the gRPC server (call server.stop(None) to stop it),
+        the servicer (to inspect the request counts) & the server URI
+    """
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        # batched detection requests are large (~11MB per image)
+        options=[("grpc.max_receive_message_length", -1)],
+    )
+    servicer = FakeTritonServicer(latency=latency)
+    service_pb2_grpc.add_GRPCInferenceServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port(f"localhost:{port}")
+    server.start()
+    return server, servicer, f"localhost:{port}"
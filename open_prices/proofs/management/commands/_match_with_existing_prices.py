@@ -0,0 +1,87 @@
+import argparse
+import datetime
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class MatchWithExistingPricesCommand(BaseCommand):
+    """
+    Base command to match the items generated from proofs (price tags,
+    receipt items...) with the existing prices of their proof
+    - only the proofs changed since the last run are processed (the date of
+    the last run is saved in a checkpoint file)
+    - the proofs are matched by batches of --batch-size proofs
+
+    Subclasses define:
+    - checkpoint_path: the default path of the checkpoint file
+    - item_name: the name of the matched items, for the output
+    - match(proof_ids): the matcher, returns the list of matched items
+    - get_proofs_to_match(since): the proofs to match (since a date, or all)
+    - stats(): print stats about the matched items
+    """
+
+    checkpoint_path: Path
+    item_name: str
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Process all the proofs, not only the ones changed since the last run.",  # noqa
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of proofs matched together.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            default=self.checkpoint_path,
+            help="Path of the checkpoint file (date of the last run).",
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore
+        self.stdout.write("=== Stats before ===")
+        self.stats()
+
+        checkpoint_path = options["checkpoint"]
+        since = None
+        if checkpoint_path.exists() and not options["all"]:
+            since = datetime.datetime.fromisoformat(
+                json.loads(checkpoint_path.read_text())["last_run"]
+            )
+        # changes made during the run are processed by the next run
+        run_start = timezone.now()
+
+        self.stdout.write("=== Running matching script...")
+        proof_ids = list(
+            self.get_proofs_to_match(since).order_by("id").values_list("id", flat=True)
+        )
+        batch_size = options["batch_size"]
+        matched = 0
+        for index in range(0, len(proof_ids), batch_size):
+            matched += len(self.match(proof_ids[index : index + batch_size]))
+            self.stdout.write(
+                f"Processed {min(index + batch_size, len(proof_ids))}/{len(proof_ids)} proofs"  # noqa
+            )
+        self.stdout.write(f"{matched} {self.item_name} matched")
+
+        checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint_path.write_text(json.dumps({"last_run": run_start.isoformat()}))
+
+        self.stdout.write("=== Stats after ===")
+        self.stats()
+
+    def match(self, proof_ids: list[int]) -> list:
+        raise NotImplementedError
+
+    def get_proofs_to_match(self, since: datetime.datetime | None):
+        raise NotImplementedError
+
+    def stats(self) -> None:
+        raise NotImplementedError
@@ -1,94 +1,69 @@
+import datetime
 from collections import Counter
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
 
-from open_prices.prices import constants as price_constants
-from open_prices.proofs.models import PriceTag, Proof
-from open_prices.proofs.utils import (
-    match_category_price_tag_with_category_price,
-    match_price_tag_with_price,
-    match_product_price_tag_with_product_price,
+from open_prices.prices.models import Price
+from open_prices.proofs.management.commands._match_with_existing_prices import (
+    MatchWithExistingPricesCommand,
 )
+from open_prices.proofs.models import PriceTag, PriceTagPrediction, Proof
+from open_prices.proofs.utils import match_price_tags_with_prices
 
+CHECKPOINT_PATH = settings.CHECKPOINTS_DIR / "match_price_tags_checkpoint.json"
 
-def stats():
-    print("PriceTag:", PriceTag.objects.count())
-    print("Proof PRICE_TAG:", Proof.objects.has_type_price_tag().count())
-    print(
-        "PriceTag per status:",
-        Counter(PriceTag.objects.all().values_list("status", flat=True)),
-    )
-    print(
-        "PriceTag without a price_id:",
-        PriceTag.objects.filter(price_id__isnull=True).count(),
-    )
 
-
-class Command(BaseCommand):
+class Command(MatchWithExistingPricesCommand):
     """
-    For each proof...
+    For each proof changed since the last run...
     try to match generated price_tags with existing prices
-    - skip proofs without price_tags or without prices
-    - skip price_tags that already have a price_id or that have no predictions
-    - finally loop on each price and try to match with the price_tag prediction data  # noqa
+    - skip proofs without unreviewed price_tags or without prices
+    - score all the (price_tag, price) pairs of the proof (barcode, category, price)  # noqa
+    - keep the optimal one-to-one assignment, and save the matches in bulk
     """
 
     help = "Match price tags with existing prices."
+    checkpoint_path = CHECKPOINT_PATH
+    item_name = "price tags"
 
-    def handle(self, *args, **options) -> None:  # type: ignore
-        self.stdout.write("=== Stats before ===")
-        stats()
+    def match(self, proof_ids: list[int]) -> list[PriceTag]:
+        return match_price_tags_with_prices(proof_ids)
 
-        self.stdout.write("=== Running matching script...")
-        proof_qs = Proof.objects.has_type_price_tag().prefetch_related(
-            "prices", "price_tags", "price_tags__predictions"
+    def stats(self) -> None:
+        print("PriceTag:", PriceTag.objects.count())
+        print("Proof PRICE_TAG:", Proof.objects.has_type_price_tag().count())
+        print(
+            "PriceTag per status:",
+            Counter(PriceTag.objects.all().values_list("status", flat=True)),
+        )
+        print(
+            "PriceTag without a price_id:",
+            PriceTag.objects.filter(price_id__isnull=True).count(),
         )
-        for index, proof in enumerate(proof_qs):
-            if proof.price_tags.count() == 0:
-                continue
-            elif proof.prices.count() == 0:
-                continue
-            else:
-                for price_tag in proof.price_tags.all():
-                    if price_tag.price_id is not None:
-                        continue
-                    elif price_tag.predictions.count() == 0:
-                        continue
-                    else:
-                        for price in proof.prices.all():
-                            # skip if price already has a price_tag match
-                            if price.price_tags.count() > 0:
-                                continue
-                            # match product price
-                            elif (
-                                price.type == price_constants.TYPE_PRODUCT
-                                and match_product_price_tag_with_product_price(
-                                    price_tag, price
-                                )
-                            ):
-                                price_tag.price_id = price.id
-                                price_tag.status = 1
-                                price_tag.save()
-                                break
-                            # match category price
-                            elif (
-                                price.type == price_constants.TYPE_CATEGORY
-                                and match_category_price_tag_with_category_price(
-                                    price_tag, price
-                                )
-                            ):
-                                price_tag.price_id = price.id
-                                price_tag.status = 1
-                                price_tag.save()
-                                break
-                            # match only on price
-                            elif match_price_tag_with_price(price_tag, price):
-                                price_tag.price_id = price.id
-                                price_tag.status = 1
-                                price_tag.save()
-                                break
-            if index % 500 == 0:
-                self.stdout.write(f"Processed {index} proofs")
 
-        self.stdout.write("=== Stats after ===")
-        stats()
+    def get_proofs_to_match(self, since: datetime.datetime | None):
+        """PRICE_TAG proofs with unreviewed price tags and with prices
+        (changed since the last run, if provided)."""
+        proofs = Proof.objects.has_type_price_tag().filter(
+            Exists(
+                PriceTag.objects.filter(
+                    proof=OuterRef("pk"), status__isnull=True, price__isnull=True
+                )
+            ),
+            Exists(Price.objects.filter(proof=OuterRef("pk"))),
+        )
+        if since is not None:
+            proofs = proofs.filter(
+                Q(updated__gt=since)
+                | Exists(
+                    PriceTag.objects.filter(proof=OuterRef("pk"), updated__gt=since)
+                )
+                | Exists(
+                    PriceTagPrediction.objects.filter(
+                        price_tag__proof=OuterRef("pk"), created__gt=since
+                    )
+                )
+                | Exists(Price.objects.filter(proof=OuterRef("pk"), updated__gt=since))
+            )
+        return proofs
@@ -1,67 +1,64 @@
+import datetime
 from collections import Counter
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
 
+from open_prices.prices.models import Price
+from open_prices.proofs.management.commands._match_with_existing_prices import (
+    MatchWithExistingPricesCommand,
+)
 from open_prices.proofs.models import Proof, ReceiptItem
-from open_prices.proofs.utils import match_receipt_item_with_price
+from open_prices.proofs.utils import match_receipt_items_with_prices
 
+CHECKPOINT_PATH = settings.CHECKPOINTS_DIR / "match_receipt_items_checkpoint.json"
 
-def stats():
-    print("ReceiptItem:", ReceiptItem.objects.count())
-    print("Proof RECEIPT:", Proof.objects.has_type_receipt().count())
-    print(
-        "ReceiptItem per status:",
-        Counter(ReceiptItem.objects.all().values_list("status", flat=True)),
-    )
-    print(
-        "ReceiptItem without a price_id:",
-        ReceiptItem.objects.filter(price_id__isnull=True).count(),
-    )
 
-
-class Command(BaseCommand):
+class Command(MatchWithExistingPricesCommand):
     """
-    For each proof...
+    For each proof changed since the last run...
     try to match generated receipt_items with existing prices
-    - skip proofs without receipt_items or without prices
-    - skip receipt_items that already have a price_id or that have no predictions
-    - finally loop on each price and try to match with the receipt_item prediction data  # noqa
+    - skip proofs without unreviewed receipt_items or without prices
+    - score all the (receipt_item, price) pairs of the proof (price, product name, order)  # noqa
+    - keep the optimal one-to-one assignment, and save the matches in bulk
     """
 
     help = "Match receipt items with existing prices."
+    checkpoint_path = CHECKPOINT_PATH
+    item_name = "receipt items"
 
-    def handle(self, *args, **options) -> None:  # type: ignore
-        self.stdout.write("=== Stats before ===")
-        stats()
+    def match(self, proof_ids: list[int]) -> list[ReceiptItem]:
+        return match_receipt_items_with_prices(proof_ids)
 
-        self.stdout.write("=== Running matching script...")
-        proof_qs = Proof.objects.has_type_receipt().prefetch_related(
-            "prices", "receipt_items"
+    def stats(self) -> None:
+        print("ReceiptItem:", ReceiptItem.objects.count())
+        print("Proof RECEIPT:", Proof.objects.has_type_receipt().count())
+        print(
+            "ReceiptItem per status:",
+            Counter(ReceiptItem.objects.all().values_list("status", flat=True)),
+        )
+        print(
+            "ReceiptItem without a price_id:",
+            ReceiptItem.objects.filter(price_id__isnull=True).count(),
         )
-        for index, proof in enumerate(proof_qs):
-            if proof.receipt_items.count() == 0:
-                continue
-            elif proof.prices.count() == 0:
-                continue
-            else:
-                for receipt_item in proof.receipt_items.all():
-                    if receipt_item.price_id is not None:
-                        continue
-                    elif receipt_item.predicted_data is None:
-                        continue
-                    else:
-                        for price in proof.prices.all():
-                            # skip if price already has a receipt_item match
-                            if price.receipt_items.count() > 0:
-                                continue
-                            # match only on price
-                            elif match_receipt_item_with_price(receipt_item, price):
-                                receipt_item.price_id = price.id
-                                receipt_item.status = 1
-                                receipt_item.save()
-                                break
-            if index % 500 == 0:
-                self.stdout.write(f"Processed {index} proofs")
 
-        self.stdout.write("=== Stats after ===")
-        stats()
+    def get_proofs_to_match(self, since: datetime.datetime | None):
+        """RECEIPT proofs with unreviewed receipt items and with prices
+        (changed since the last run, if provided)."""
+        proofs = Proof.objects.has_type_receipt().filter(
+            Exists(
+                ReceiptItem.objects.filter(
+                    proof=OuterRef("pk"), status__isnull=True, price__isnull=True
+                )
+            ),
+            Exists(Price.objects.filter(proof=OuterRef("pk"))),
+        )
+        if since is not None:
+            proofs = proofs.filter(
+                Q(updated__gt=since)
+                | Exists(
+                    ReceiptItem.objects.filter(proof=OuterRef("pk"), updated__gt=since)
+                )
+                | Exists(Price.objects.filter(proof=OuterRef("pk"), updated__gt=since))
+            )
+        return proofs
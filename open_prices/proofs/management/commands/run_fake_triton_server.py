@@ -0,0 +1,26 @@
+import argparse
+
+from django.core.management.base import BaseCommand
+
+from open_prices.proofs.fake_triton import start_fake_triton_server
+
+
+class Command(BaseCommand):
+    help = """Run a fake Triton Inference Server (deterministic outputs), to test
+    or benchmark run_ml_models without the ML models."""
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--port", type=int, default=5504, help="gRPC port.")
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Simulated inference time per request (in seconds).",
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore
+        server, _, triton_uri = start_fake_triton_server(
+            port=options["port"], latency=options["latency"]
+        )
+        self.stdout.write(f"Fake Triton server listening on {triton_uri}...")
+        server.wait_for_termination()
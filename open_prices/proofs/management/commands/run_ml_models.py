@@ -1,26 +1,49 @@
 import argparse
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 
-import tqdm
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db.models import Q
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
 from openfoodfacts.utils import get_logger
 
 from open_prices.proofs import constants as proof_constants
 from open_prices.proofs.ml import (
     PRICE_TAG_DETECTOR_MODEL_NAME,
     PROOF_CLASSIFICATION_MODEL_NAME,
+    get_prediction_cache_stats,
+    reset_prediction_cache_stats,
     run_and_save_price_tag_extraction,
-    run_and_save_proof_prediction,
+    run_and_save_proof_predictions_batch,
+    warmup_triton_models,
+)
+from open_prices.proofs.models import (
+    PriceTag,
+    PriceTagPrediction,
+    Proof,
+    ProofPrediction,
 )
-from open_prices.proofs.models import PriceTagPrediction, Proof
 
 # Initializing root logger
-get_logger()
+logger = get_logger()
+
+CHECKPOINT_PATH = settings.CHECKPOINTS_DIR / "run_ml_models_checkpoint.json"
 
 
 class Command(BaseCommand):
     help = """Run ML models on images with proof predictions, and save the predictions
-    in DB."""
+    in DB.
+
+    The pending proofs (and price tags) are selected with an anti-join, so an
+    interrupted run resumes where it stopped. The items that were processed
+    without producing a prediction (missing image, failed extraction, Triton
+    error...) are saved with their number of failed attempts in a checkpoint
+    file: they are retried by the next runs, and skipped once they failed
+    --max-attempts times."""
     _allowed_types = [
         "proof_classification",
         "price_tag_detection",
@@ -37,6 +60,35 @@ class Command(BaseCommand):
             help="Type of model to run. Supported values are `proof_classification` "
             "and `price_tag_detection`",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=16,
+            help="Number of proofs sent to Triton in a single inference request.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of batches processed in parallel.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            default=CHECKPOINT_PATH,
+            help="Path of the checkpoint file.",
+        )
+        parser.add_argument(
+            "--reset-checkpoint",
+            action="store_true",
+            help="Forget the failed attempts saved by the previous runs.",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=3,
+            help="Number of failed attempts after which an item is skipped.",
+        )
 
     def handle(self, *args, **options) -> None:  # type: ignore
         self.stdout.write(
@@ -44,6 +96,12 @@ class Command(BaseCommand):
         )
         limit = options["limit"]
         types_str = options["types"]
+        self.workers = options["workers"]
+        self.max_attempts = options["max_attempts"]
+        self.checkpoint_path = options["checkpoint"]
+        self.checkpoint = {}
+        if self.checkpoint_path.exists() and not options["reset_checkpoint"]:
+            self.checkpoint = json.loads(self.checkpoint_path.read_text())
 
         if types_str:
             types = types_str.split(",")
@@ -55,64 +113,198 @@ class Command(BaseCommand):
                 f"Invalid type(s) provided: '{types}', allowed: {self._allowed_types}"
             )
 
+        reset_prediction_cache_stats()
+
         if "proof_classification" in types or "price_tag_detection" in types:
-            self.handle_proof_prediction_job(types, limit)
+            self.handle_proof_prediction_job(types, limit, options["batch_size"])
 
         if "price_tag_extraction" in types:
             self.handle_price_tag_extraction_job(limit)
 
-    def handle_proof_prediction_job(self, types: list[str], limit: int) -> None:
-        exclusion_filters_list = []
-        if "proof_classification" in types:
-            exclusion_filters_list.append(
-                Q(predictions__model_name=PROOF_CLASSIFICATION_MODEL_NAME)
+        for model_name, stats in get_prediction_cache_stats().items():
+            self.stdout.write(
+                f"prediction cache ({model_name}): {stats['hits']} hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)"
             )
 
+    def get_pending_proofs(self, types: list[str]):
+        """Proofs missing a prediction for one of the models (anti-join)."""
+        pending_filter = Q()
+        if "proof_classification" in types:
+            pending_filter |= ~Exists(
+                ProofPrediction.objects.filter(
+                    proof=OuterRef("pk"), model_name=PROOF_CLASSIFICATION_MODEL_NAME
+                )
+            )
         if "price_tag_detection" in types:
-            exclusion_filters_list.append(
-                Q(predictions__model_name=PRICE_TAG_DETECTOR_MODEL_NAME)
+            # only PRICE_TAG proofs are run through the price tag detector
+            pending_filter |= Q(type=proof_constants.TYPE_PRICE_TAG) & ~Exists(
+                ProofPrediction.objects.filter(
+                    proof=OuterRef("pk"), model_name=PRICE_TAG_DETECTOR_MODEL_NAME
+                )
             )
+        return Proof.objects.filter(pending_filter)
+
+    def get_pending_price_tags(self):
+        """Price tags of PRICE_TAG proofs without extraction (anti-join)."""
+        return PriceTag.objects.filter(
+            ~Exists(
+                PriceTagPrediction.objects.filter(
+                    price_tag=OuterRef("pk"),
+                    type=proof_constants.PRICE_TAG_EXTRACTION_TYPE,
+                )
+            ),
+            proof__type=proof_constants.TYPE_PRICE_TAG,
+        )
 
-        exclusion_filter = exclusion_filters_list.pop()
-        for remaining_filter in exclusion_filters_list:
-            exclusion_filter &= remaining_filter
-        # Get proofs that don't have a proof prediction with
-        # one of the model by performing an
-        # outer join on the Proof and Prediction tables.
-        proofs = (
-            (
-                Proof.objects.filter(predictions__model_name__isnull=True)
-                | Proof.objects.exclude(exclusion_filter)
-            ).distinct()
-            # Order by -id to process the most recent proofs first
+    def handle_proof_prediction_job(
+        self, types: list[str], limit: int, batch_size: int
+    ) -> None:
+        job_name = "proof_prediction"
+        pending_proofs = self.get_pending_proofs(types)
+        # Order by -id to process the most recent proofs first
+        proof_ids = list(
+            pending_proofs.exclude(id__in=self.get_skipped_ids(job_name))
             .order_by("-id")
+            .values_list("id", flat=True)[:limit]
         )
+        batches = [
+            proof_ids[i : i + batch_size] for i in range(0, len(proof_ids), batch_size)
+        ]
 
-        if limit:
-            proofs = proofs[:limit]
+        def process_batch(batch: list[int]) -> int:
+            proofs = list(Proof.objects.filter(id__in=batch).order_by("-id"))
+            return run_and_save_proof_predictions_batch(proofs)
 
-        for proof in tqdm.tqdm(proofs):
-            self.stdout.write(f"Processing proof {proof.id}...")
-            run_and_save_proof_prediction(proof)
-            self.stdout.write("Done.")
+        if batches:
+            # open the Triton connection (and load the models) before timing
+            warmup_triton_models()
+        self.run_job(job_name, batches, process_batch, pending_proofs)
 
     def handle_price_tag_extraction_job(self, limit: int) -> None:
-        # Get all proofs of type PRICE_TAG
-        proofs = Proof.objects.filter(type=proof_constants.TYPE_PRICE_TAG).order_by(
-            "-id"
+        job_name = "price_tag_extraction"
+        pending_price_tags = self.get_pending_price_tags()
+        price_tags = list(
+            pending_price_tags.exclude(id__in=self.get_skipped_ids(job_name))
+            .order_by("-proof_id", "id")
+            .values_list("id", "proof_id")[:limit]
         )
+        # one batch per proof: its price tags are extracted concurrently
+        batches = [
+            [price_tag_id for price_tag_id, _ in group]
+            for _, group in itertools.groupby(price_tags, key=lambda row: row[1])
+        ]
+
+        def process_batch(batch: list[int]) -> int:
+            price_tags = list(
+                PriceTag.objects.filter(id__in=batch).select_related("proof")
+            )
+            run_and_save_price_tag_extraction(price_tags, price_tags[0].proof)
+            return len(price_tags)
+
+        self.run_job(job_name, batches, process_batch, pending_price_tags)
+
+    def run_job(
+        self, job_name: str, batches: list[list[int]], process_batch, pending_qs
+    ):
+        """Process the batches (in parallel if --workers > 1), print the
+        progress and save the checkpoint after each batch.
+
+        :param batches: the batches of ids to process
+        :param process_batch: the function processing a batch of ids, returns
+            the number of images processed
+        :param pending_qs: the pending items queryset, to find the items that
+            are still pending after being processed (they are then counted as
+            failed, and retried by the next runs)
+        """
+        total = sum(len(batch) for batch in batches)
+        self.stdout.write(f"{job_name}: {total} pending items")
+        done, processed = 0, 0
+        failed_attempts = self.get_failed_attempts(job_name)
+        start_time = time.monotonic()
+
+        def on_batch_done(batch: list[int], batch_processed: int) -> None:
+            nonlocal done, processed
+            done += len(batch)
+            processed += batch_processed
+            failed_ids = set(
+                pending_qs.filter(id__in=batch).values_list("id", flat=True)
+            )
+            for item_id in batch:
+                if item_id in failed_ids:
+                    failed_attempts[item_id] = failed_attempts.get(item_id, 0) + 1
+                else:
+                    failed_attempts.pop(item_id, None)
+            self.save_checkpoint(job_name, failed_attempts)
+            elapsed = time.monotonic() - start_time
+            rate = done / elapsed if elapsed else 0
+            eta = (total - done) / rate if rate else 0
+            self.stdout.write(
+                f"{job_name}: {done}/{total} ({rate:.2f} items/sec, ETA {eta:.0f}s)"
+            )
+
+        def run_batch(batch: list[int]) -> int:
+            # a failing batch (Triton or network error...) must not stop the
+            # job: its items are still pending, and retried by the next runs
+            try:
+                return process_batch(batch)
+            except Exception:
+                logger.exception("%s: error processing batch %s", job_name, batch)
+                return 0
+
+        if self.workers > 1:
+
+            def run_in_thread(batch: list[int]) -> int:
+                try:
+                    return run_batch(batch)
+                finally:
+                    # each thread has its own DB connection
+                    connections.close_all()
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {
+                    executor.submit(run_in_thread, batch): batch for batch in batches
+                }
+                for future in as_completed(futures):
+                    on_batch_done(futures[future], future.result())
+        else:
+            for batch in batches:
+                on_batch_done(batch, run_batch(batch))
+
+        elapsed = time.monotonic() - start_time
+        skipped_count = sum(
+            attempts >= self.max_attempts for attempts in failed_attempts.values()
+        )
+        self.stdout.write(
+            f"{job_name}: processed {processed} images in {elapsed:.1f}s "
+            f"({processed / elapsed if elapsed else 0:.2f} images/sec), "
+            f"{len(failed_attempts) - skipped_count} to retry, "
+            f"{skipped_count} skipped"
+        )
+
+    def get_failed_attempts(self, job_name: str) -> dict[int, int]:
+        """Number of failed attempts per item id, from the checkpoint."""
+        return {
+            int(item_id): attempts
+            for item_id, attempts in self.checkpoint.get(job_name, {})
+            .get("failed_attempts", {})
+            .items()
+        }
+
+    def get_skipped_ids(self, job_name: str) -> list[int]:
+        """Ids of the items that failed too many times."""
+        return [
+            item_id
+            for item_id, attempts in self.get_failed_attempts(job_name).items()
+            if attempts >= self.max_attempts
+        ]
 
-        added = 0
-        for proof in tqdm.tqdm(proofs):
-            for price_tag in proof.price_tags.all():
-                # Check if the price tag already has a prediction
-                if not PriceTagPrediction.objects.filter(
-                    type=proof_constants.PRICE_TAG_EXTRACTION_TYPE, price_tag=price_tag
-                ).exists():
-                    self.stdout.write(
-                        f"Processing price tag {price_tag.id} (proof {proof.id})..."
-                    )
-                    run_and_save_price_tag_extraction([price_tag], proof)
-                    added += 1
-                    if limit and added >= limit:
-                        return
+    def save_checkpoint(self, job_name: str, failed_attempts: dict[int, int]) -> None:
+        self.checkpoint[job_name] = {
+            "failed_attempts": {
+                str(item_id): failed_attempts[item_id]
+                for item_id in sorted(failed_attempts)
+            }
+        }
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_path.write_text(json.dumps(self.checkpoint))
@@ -1,34 +1,112 @@
 import argparse
-import glob
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import tqdm
-from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
 
-from open_prices.proofs.ml import fetch_and_save_ocr_data
+from open_prices.common import google as common_google
+from open_prices.proofs import constants as proof_constants
+from open_prices.proofs.ml import fetch_and_save_proof_ocr_batch, save_proof_ocr_result
+from open_prices.proofs.models import Proof
 
 
 class Command(BaseCommand):
-    help = "Run OCR on images with missing OCR files."
+    help = "Run OCR on proofs without OCR result."
 
     def add_arguments(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument(
             "--override", action="store_true", help="Override existing OCR data."
         )
+        parser.add_argument(
+            "--retry-errors",
+            action="store_true",
+            help="Run OCR again on proofs with an OCR error.",
+        )
+        parser.add_argument(
+            "--import-existing",
+            action="store_true",
+            help="Import the existing OCR files (.json.gz) in DB, without "
+            "running OCR on them again.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of concurrent OCR requests.",
+        )
+        parser.add_argument(
+            "--max-size",
+            type=int,
+            default=common_google.GOOGLE_CLOUD_VISION_OCR_MAX_IMAGE_SIZE,
+            help="Downscale the images to this max edge before upload (0 to disable).",
+        )
+        parser.add_argument(
+            "--features",
+            type=str,
+            default=",".join(common_google.GOOGLE_CLOUD_VISION_OCR_FEATURES),
+            help="Comma-separated list of Cloud Vision features to request.",
+        )
 
     def handle(self, *args, **options) -> None:  # type: ignore
         self.stdout.write("Starting OCR processing...")
-        override = options["override"]
+        features = options["features"].split(",")
+        max_size = options["max_size"] or None
         processed = 0
 
-        for image_path_str in tqdm.tqdm(
-            glob.iglob("**/*", root_dir=settings.IMAGES_DIR), desc="images"
-        ):
-            image_path = settings.IMAGES_DIR / image_path_str
-            if ".400." in image_path.name:
-                # Skip thumbnails
-                continue
-            result = fetch_and_save_ocr_data(image_path, override=override)
-            processed += int(result)
+        proofs = Proof.objects.filter(file_path__isnull=False)
+        if options["retry_errors"]:
+            proofs = proofs.exclude(
+                ocr_result__status=proof_constants.OCR_STATUS_SUCCESS
+            )
+        elif not options["override"]:
+            proofs = proofs.filter(ocr_result__isnull=True)
+        proofs = proofs.order_by("id")
+
+        if options["import_existing"]:
+            proofs = self.import_existing_ocr_files(proofs)
+        else:
+            proofs = list(proofs)
+
+        batch_size = common_google.GOOGLE_CLOUD_VISION_OCR_MAX_BATCH_SIZE
+        batches = [
+            proofs[i : i + batch_size] for i in range(0, len(proofs), batch_size)
+        ]
+
+        def run_batch(batch: list[Proof]) -> int:
+            try:
+                return fetch_and_save_proof_ocr_batch(
+                    batch, features=features, max_size=max_size
+                )
+            finally:
+                # each thread has its own DB connection
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for result in tqdm.tqdm(
+                executor.map(run_batch, batches), total=len(batches), desc="batches"
+            ):
+                processed += result
 
         self.stdout.write("%d OCR saved" % processed)
+
+    def import_existing_ocr_files(self, proofs) -> list[Proof]:
+        """Save the existing OCR files in DB.
+
+        :return: the proofs without OCR file
+        """
+        remaining_proofs = []
+        imported = 0
+        for proof in tqdm.tqdm(proofs.iterator(), desc="import"):
+            ocr_json_path = Path(proof.file_path_full).with_suffix(".json.gz")
+            if ocr_json_path.exists():
+                with gzip.open(ocr_json_path, "rt") as f:
+                    save_proof_ocr_result(proof.id, json.load(f))
+                imported += 1
+            else:
+                remaining_proofs.append(proof)
+        self.stdout.write("%d OCR files imported" % imported)
+        return remaining_proofs
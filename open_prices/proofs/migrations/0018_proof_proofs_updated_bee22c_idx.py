@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("proofs", "0017_receiptitem"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="proof",
+            index=models.Index(
+                fields=["updated", "id"], name="proofs_updated_bee22c_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("proofs", "0018_proof_proofs_updated_bee22c_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProofOcrResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("SUCCESS", "SUCCESS"), ("ERROR", "ERROR")],
+                        max_length=10,
+                        verbose_name="The status of the OCR request",
+                    ),
+                ),
+                (
+                    "text",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        verbose_name="The full text detected in the image",
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        blank=True,
+                        null=True,
+                        verbose_name="The raw Cloud Vision response (or error)",
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name="The size of the raw response (in bytes)",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="When the OCR was run",
+                    ),
+                ),
+                (
+                    "proof",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ocr_result",
+                        to="proofs.proof",
+                        verbose_name="The proof this OCR result belongs to",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Proof OCR result",
+                "verbose_name_plural": "Proof OCR results",
+                "db_table": "proof_ocr_results",
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("proofs", "0019_proofocrresult"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="proof",
+            name="image_phash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=16,
+                null=True,
+                verbose_name="Perceptual hash (dHash) of the uploaded image",
+            ),
+        ),
+        migrations.AddField(
+            model_name="proof",
+            name="image_sha256",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=64,
+                null=True,
+                verbose_name="SHA-256 of the uploaded file",
+            ),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("proofs", "0020_proof_image_phash_proof_image_sha256"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PredictionCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "image_digest",
+                    models.CharField(
+                        help_text="The SHA-256 digest of the input image", max_length=64
+                    ),
+                ),
+                (
+                    "crop_box",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="The crop box of the input image (y_min,x_min,y_max,x_max). Empty for the whole image.",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "model_name",
+                    models.CharField(help_text="The name of the model", max_length=100),
+                ),
+                (
+                    "model_version",
+                    models.CharField(
+                        help_text="The version of the model", max_length=100
+                    ),
+                ),
+                ("data", models.JSONField(help_text="The model output")),
+                (
+                    "hit_count",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="The number of times the cached output was reused",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="When the output was cached",
+                    ),
+                ),
+                (
+                    "last_hit",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="When the cached output was last reused",
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Prediction Cache",
+                "verbose_name_plural": "Prediction Cache",
+                "db_table": "prediction_cache",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "image_digest",
+                            "crop_box",
+                            "model_name",
+                            "model_version",
+                        ),
+                        name="prediction_cache_unique_key",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+INIT_KIND_AND_SOURCE_CATEGORY_SQL = """
+UPDATE proofs SET
+    kind = CASE
+        WHEN type IN ('RECEIPT', 'GDPR_REQUEST') AND owner_consumption
+        THEN 'CONSUMPTION'
+        ELSE 'COMMUNITY'
+    END,
+    source_category = CASE
+        WHEN source LIKE '%Open Prices Web App%' THEN 'WEB'
+        WHEN source LIKE '%Smoothie%' THEN 'MOBILE'
+        WHEN source LIKE '%API%' THEN 'API'
+        ELSE 'OTHER'
+    END
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("proofs", "0021_predictioncache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="proof",
+            name="kind",
+            field=models.CharField(
+                choices=[("COMMUNITY", "COMMUNITY"), ("CONSUMPTION", "CONSUMPTION")],
+                db_index=True,
+                default="COMMUNITY",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="proof",
+            name="source_category",
+            field=models.CharField(
+                choices=[
+                    ("WEB", "WEB"),
+                    ("MOBILE", "MOBILE"),
+                    ("API", "API"),
+                    ("OTHER", "OTHER"),
+                ],
+                db_index=True,
+                default="OTHER",
+                max_length=10,
+            ),
+        ),
+        migrations.RunSQL(INIT_KIND_AND_SOURCE_CATEGORY_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+# the raw OCR data is kept in the .json.gz files: only keep the errors
+INIT_ERROR_SQL = """
+UPDATE proof_ocr_results
+SET error = COALESCE(data -> 'error', data -> 'responses' -> 0 -> 'error')
+WHERE status = 'ERROR';
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("proofs", "0022_proof_kind_proof_source_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="proofocrresult",
+            name="error",
+            field=models.JSONField(
+                blank=True, null=True, verbose_name="The Cloud Vision error, if any"
+            ),
+        ),
+        migrations.RunSQL(INIT_ERROR_SQL, migrations.RunSQL.noop),
+        migrations.RemoveField(
+            model_name="proofocrresult",
+            name="data",
+        ),
+    ]
@@ -3,28 +3,55 @@ Proof ML/AI
 - predict Proof type with triton
 - detect Proof's PriceTags with triton
 - extract data from PriceTags with Gemini
+- cache the model outputs (PredictionCache), keyed by image digest, crop box
+and model version
 """
 
 import base64
+import collections
+import datetime
 import enum
+import functools
 import gzip
+import hashlib
+import io
 import json
 import logging
+import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
+import numpy as np
 import typing_extensions as typing
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from google.api_core import exceptions as google_exceptions
 from openfoodfacts.ml.image_classification import ImageClassifier
 from openfoodfacts.ml.object_detection import ObjectDetectionRawResult, ObjectDetector
+from openfoodfacts.ml.triton import (
+    add_triton_infer_input_tensor,
+    get_triton_inference_stub,
+)
 from openfoodfacts.utils import http_session
 from PIL import Image
+from tritonclient.grpc import service_pb2
 
 from open_prices.common import google as common_google
 
 from . import constants as proof_constants
-from .models import PriceTag, PriceTagPrediction, Proof, ProofPrediction, ReceiptItem
+from .models import (
+    PredictionCache,
+    PriceTag,
+    PriceTagPrediction,
+    Proof,
+    ProofOcrResult,
+    ProofPrediction,
+    ReceiptItem,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +72,16 @@ PRICE_TAG_DETECTOR_MODEL_NAME = "price_tag_detection"
 PRICE_TAG_DETECTOR_MODEL_VERSION = "price_tag_detection-1.0"
 PRICE_TAG_DETECTOR_TRITON_VERSION = "1"
 PRICE_TAG_DETECTOR_IMAGE_SIZE = 960
+# Gemini errors worth retrying (rate limit, transient server errors)
+GEMINI_RETRYABLE_EXCEPTIONS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+GEMINI_MAX_RETRIES = 3
+GEMINI_RETRY_BACKOFF_SECONDS = 2
 
 
 # TODO: what about other categories?
@@ -277,6 +314,47 @@ def extract_from_receipt(image: Image.Image) -> Receipt:
     return json.loads(response.text)
 
 
+@functools.cache
+def get_image_classifier(
+    model_name: str = PROOF_CLASSIFICATION_MODEL_NAME,
+    label_names: tuple[str, ...] = tuple(PROOF_CLASSIFICATION_LABEL_NAMES),
+) -> ImageClassifier:
+    """Return the (long-lived, one per process) image classifier client."""
+    return ImageClassifier(model_name=model_name, label_names=list(label_names))
+
+
+@functools.cache
+def get_object_detector(
+    model_name: str = PRICE_TAG_DETECTOR_MODEL_NAME,
+    label_names: tuple[str, ...] = tuple(PRICE_TAG_DETECTOR_LABEL_NAMES),
+    image_size: int = PRICE_TAG_DETECTOR_IMAGE_SIZE,
+) -> ObjectDetector:
+    """Return the (long-lived, one per process) object detector client."""
+    return ObjectDetector(
+        model_name=model_name, label_names=list(label_names), image_size=image_size
+    )
+
+
+def run_triton_inference(
+    image_array: np.ndarray, model_name: str, model_version: str, triton_uri: str
+) -> service_pb2.ModelInferResponse:
+    """Send a (batched) inference request to Triton.
+
+    The gRPC channel is cached, and reused across requests.
+
+    :param image_array: the preprocessed images, of shape (N, C, H, W)
+    :return: the raw Triton response
+    """
+    request = service_pb2.ModelInferRequest()
+    request.model_name = model_name
+    if model_version:
+        request.model_version = model_version
+    add_triton_infer_input_tensor(
+        request, name="images", data=image_array, datatype="FP32"
+    )
+    return get_triton_inference_stub(triton_uri).ModelInfer(request)
+
+
 def predict_proof_type(
     image: Image.Image,
     model_name: str = PROOF_CLASSIFICATION_MODEL_NAME,
@@ -290,10 +368,7 @@ def predict_proof_type(
     :param model_version: the version of the model to use
     :return: the prediction results as a list of tuples (label, confidence)
     """
-    classifier = ImageClassifier(
-        model_name=model_name,
-        label_names=label_names,
-    )
+    classifier = get_image_classifier(model_name, tuple(label_names))
     return classifier.predict(
         image,
         triton_uri=triton_uri,
@@ -301,6 +376,32 @@ def predict_proof_type(
     )
 
 
+def predict_proof_types(
+    images: list[Image.Image],
+    model_name: str = PROOF_CLASSIFICATION_MODEL_NAME,
+    model_version: str = PROOF_CLASSIFICATION_TRITON_VERSION,
+    label_names: list[str] = PROOF_CLASSIFICATION_LABEL_NAMES,
+    triton_uri: str = settings.TRITON_URI,
+) -> list[list[tuple[str, float]]]:
+    """Predict the type of several proof images, with a single (batched)
+    Triton request.
+
+    :param images: the input Pillow images
+    :return: for each image, the prediction results as a list of tuples
+        (label, confidence)
+    """
+    classifier = get_image_classifier(model_name, tuple(label_names))
+    image_array = np.concatenate([classifier.preprocess(image) for image in images])
+    response = run_triton_inference(image_array, model_name, model_version, triton_uri)
+    output = np.frombuffer(response.raw_output_contents[0], dtype=np.float32).reshape(
+        (len(images), len(label_names))
+    )
+    return [
+        [(label_names[i], float(scores[i])) for i in np.argsort(-scores)]
+        for scores in output
+    ]
+
+
 def detect_price_tags(
     image: Image.Image,
     model_name: str = PRICE_TAG_DETECTOR_MODEL_NAME,
@@ -323,37 +424,297 @@ def detect_price_tags(
         settings.TRITON_URI
     :return: the detection results
     """
-    detector = ObjectDetector(
-        model_name=model_name,
-        label_names=label_names,
-        image_size=image_size,
-    )
+    detector = get_object_detector(model_name, tuple(label_names), image_size)
     return detector.detect_from_image(
         image, triton_uri=triton_uri, threshold=threshold, model_version=model_version
     )
 
 
-def run_ocr_on_image(image_path: Path | str, api_key: str) -> dict[str, Any] | None:
+def detect_price_tags_batch(
+    images: list[Image.Image],
+    model_name: str = PRICE_TAG_DETECTOR_MODEL_NAME,
+    model_version: str = PRICE_TAG_DETECTOR_TRITON_VERSION,
+    label_names: list[str] = PRICE_TAG_DETECTOR_LABEL_NAMES,
+    image_size: int = PRICE_TAG_DETECTOR_IMAGE_SIZE,
+    triton_uri: str = settings.TRITON_URI,
+    threshold: float = 0.5,
+) -> list[ObjectDetectionRawResult]:
+    """Detect the price tags in several proof images, with a single (batched)
+    Triton request.
+
+    :param images: the input Pillow images
+    :return: for each image, the detection results
+    """
+    detector = get_object_detector(model_name, tuple(label_names), image_size)
+    preprocessed = [detector.preprocess(image) for image in images]
+    image_array = np.concatenate([image_array for image_array, _, _ in preprocessed])
+    response = run_triton_inference(image_array, model_name, model_version, triton_uri)
+    outputs = np.frombuffer(response.raw_output_contents[0], dtype=np.float32).reshape(
+        (len(images), -1)
+    )
+    results = []
+    for output, (_, scale_x, scale_y) in zip(outputs, preprocessed):
+        # split the batched response, to reuse the detector postprocessing
+        image_response = service_pb2.ModelInferResponse()
+        image_response.outputs.add(name="output0")
+        image_response.raw_output_contents.append(output.tobytes())
+        results.append(
+            detector.postprocess(
+                image_response, threshold=threshold, scale_x=scale_x, scale_y=scale_y
+            )
+        )
+    return results
+
+
+def warmup_triton_models(triton_uri: str = settings.TRITON_URI) -> None:
+    """Send a first request to each Triton model, so that the connection is
+    opened (and the models are loaded) before processing proofs."""
+    image = Image.new("RGB", (PRICE_TAG_DETECTOR_IMAGE_SIZE,) * 2, "white")
+    predict_proof_types([image], triton_uri=triton_uri)
+    detect_price_tags_batch([image], triton_uri=triton_uri)
+
+
+_prediction_cache_stats: dict[str, collections.Counter] = collections.defaultdict(
+    collections.Counter
+)
+_prediction_cache_stats_lock = threading.Lock()
+
+
+def get_image_digest(image: Image.Image, proof: Proof | None = None) -> str:
+    """Get the digest of an image, used as prediction cache key.
+
+    The SHA-256 of the proof file is used if available, otherwise the
+    SHA-256 of the decoded pixels is computed.
+
+    :param image: the Pillow image
+    :param proof: the Proof instance of the image, defaults to None
+    :return: the hex digest
+    """
+    if proof is not None and proof.image_sha256:
+        return proof.image_sha256
+    digest = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def get_crop_box_key(bounding_box: list[float] | None) -> str:
+    """Get the prediction cache key of a crop box (relative coordinates),
+    or an empty string for the whole image."""
+    if bounding_box is None:
+        return ""
+    return ",".join(f"{value:.4f}" for value in bounding_box)
+
+
+def get_cached_predictions(
+    keys: list[tuple[str, str]], model_name: str, model_version: str
+) -> list[Any | None]:
+    """Get the cached outputs of a model, in a single query.
+
+    :param keys: the (image digest, crop box) keys
+    :param model_name: the name of the model
+    :param model_version: the version of the model
+    :return: for each key, the cached output, or None (cache miss)
+    """
+    if not keys:
+        return []
+    cached = {
+        (cache.image_digest, cache.crop_box): cache
+        for cache in PredictionCache.objects.filter(
+            image_digest__in={image_digest for image_digest, _ in keys},
+            model_name=model_name,
+            model_version=model_version,
+        )
+    }
+    hit_ids = [cached[key].id for key in keys if key in cached]
+    if hit_ids:
+        PredictionCache.objects.filter(id__in=hit_ids).update(
+            hit_count=F("hit_count") + 1, last_hit=timezone.now()
+        )
+    with _prediction_cache_stats_lock:
+        _prediction_cache_stats[model_name]["hits"] += len(hit_ids)
+        _prediction_cache_stats[model_name]["misses"] += len(keys) - len(hit_ids)
+    return [cached[key].data if key in cached else None for key in keys]
+
+
+def set_cached_predictions(
+    keys: list[tuple[str, str]],
+    outputs: list[Any],
+    model_name: str,
+    model_version: str,
+) -> None:
+    """Save the outputs of a model in the prediction cache (the existing
+    outputs are replaced).
+
+    :param keys: the (image digest, crop box) keys
+    :param outputs: the model outputs (JSON-serializable)
+    :param model_name: the name of the model
+    :param model_version: the version of the model
+    """
+    # a key can only be inserted once per query
+    outputs_by_key = dict(zip(keys, outputs))
+    PredictionCache.objects.bulk_create(
+        [
+            PredictionCache(
+                image_digest=image_digest,
+                crop_box=crop_box,
+                model_name=model_name,
+                model_version=model_version,
+                data=output,
+            )
+            for (image_digest, crop_box), output in outputs_by_key.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["image_digest", "crop_box", "model_name", "model_version"],
+        update_fields=["data"],
+    )
+
+
+def get_prediction_cache_stats() -> dict[str, dict[str, int | float]]:
+    """Get the prediction cache hits & misses (per model) since the process
+    started (or since the last reset).
+
+    :return: a dict model name -> {"hits", "misses", "hit_rate"}
+    """
+    with _prediction_cache_stats_lock:
+        return {
+            model_name: {
+                "hits": counter["hits"],
+                "misses": counter["misses"],
+                "hit_rate": counter["hits"] / (counter["hits"] + counter["misses"]),
+            }
+            for model_name, counter in _prediction_cache_stats.items()
+            if counter["hits"] + counter["misses"]
+        }
+
+
+def reset_prediction_cache_stats() -> None:
+    with _prediction_cache_stats_lock:
+        _prediction_cache_stats.clear()
+
+
+def get_or_compute_predictions(
+    keys: list[tuple[str, str]],
+    model_name: str,
+    model_version: str,
+    compute: Callable[[list[int]], list[Any]],
+) -> list[Any]:
+    """Get the outputs of a model from the prediction cache, and compute
+    (then cache) the missing ones.
+
+    :param keys: the (image digest, crop box) keys
+    :param model_name: the name of the model
+    :param model_version: the version of the model
+    :param compute: the function computing the outputs of the cache misses,
+        given their indexes in `keys` (duplicate keys are only computed once).
+        None outputs (failures) are not cached.
+    :return: for each key, the model output
+    """
+    outputs = get_cached_predictions(keys, model_name, model_version)
+    miss_indexes: dict[tuple[str, str], int] = {}
+    for i, (key, output) in enumerate(zip(keys, outputs)):
+        if output is None:
+            miss_indexes.setdefault(key, i)
+    if not miss_indexes:
+        return outputs
+
+    computed = dict(zip(miss_indexes.keys(), compute(list(miss_indexes.values()))))
+    computed = {key: output for key, output in computed.items() if output is not None}
+    if computed:
+        set_cached_predictions(
+            list(computed.keys()), list(computed.values()), model_name, model_version
+        )
+    return [
+        computed.get(key) if output is None else output
+        for key, output in zip(keys, outputs)
+    ]
+
+
+def get_ocr_image_content(
+    image_path: Path | str, max_size: int | None = None
+) -> tuple[str, float]:
+    """Return the base64-encoded image content to send to Cloud Vision,
+    and the scale factor between the original and the uploaded image.
+
+    :param image_path: the path to the image
+    :param max_size: if provided, images with a larger edge are downscaled
+        (and re-encoded as JPEG) before upload
+    :return: the base64 content, and the factor to apply to the coordinates
+        returned by Cloud Vision to map them onto the original image (1.0
+        if the image was not downscaled)
+    """
+    if max_size:
+        with Image.open(image_path) as image:
+            if image.width > max_size or image.height > max_size:
+                original_size = max(image.size)
+                # keep the EXIF data (orientation): Cloud Vision then handles
+                # the downscaled image exactly like the original one
+                exif = image.info.get("exif")
+                image = image.convert("RGB")
+                image.thumbnail((max_size, max_size))
+                buffer = io.BytesIO()
+                if exif:
+                    image.save(buffer, format="JPEG", quality=90, exif=exif)
+                else:
+                    image.save(buffer, format="JPEG", quality=90)
+                return (
+                    base64.b64encode(buffer.getvalue()).decode("utf-8"),
+                    original_size / max(image.size),
+                )
+    with open(image_path, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8"), 1.0
+
+
+def rescale_ocr_vertices(data: Any, scale: float) -> Any:
+    """Multiply (in place) all the absolute vertices coordinates of the
+    Cloud Vision response by `scale`, to map them back onto the original
+    image. The normalized vertices are left untouched."""
+    if scale == 1.0:
+        return data
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == "vertices":
+                for vertex in value:
+                    for axis in ("x", "y"):
+                        if axis in vertex:
+                            vertex[axis] = round(vertex[axis] * scale)
+            else:
+                rescale_ocr_vertices(value, scale)
+    elif isinstance(data, list):
+        for item in data:
+            rescale_ocr_vertices(item, scale)
+    return data
+
+
+def run_ocr_on_image(
+    image_path: Path | str,
+    api_key: str,
+    features: list[str] | None = None,
+    max_size: int | None = None,
+) -> dict[str, Any] | None:
     """Run Google Cloud Vision OCR on the image stored at the given path.
 
     :param image_path: the path to the image
     :param api_key: the Google Cloud Vision API key
+    :param features: the Cloud Vision features to request, defaults to
+        GOOGLE_CLOUD_VISION_OCR_FEATURES
+    :param max_size: if provided, downscale the image to this max edge
+        before upload (the coordinates are mapped back onto the original
+        image)
     :return: the OCR data as a dict or None if an error occurred
 
     This is similar to the run_ocr.py script in openfoodfacts-server:
     https://github.com/openfoodfacts/openfoodfacts-server/blob/main/scripts/run_ocr.py
     """
-    with open(image_path, "rb") as f:
-        image_bytes = f.read()
-
-    base64_content = base64.b64encode(image_bytes).decode("utf-8")
+    base64_content, scale = get_ocr_image_content(image_path, max_size=max_size)
     url = f"{common_google.GOOGLE_CLOUD_VISION_OCR_API_URL}?key={api_key}"
     data = {
         "requests": [
             {
                 "features": [
                     {"type": feature}
-                    for feature in common_google.GOOGLE_CLOUD_VISION_OCR_FEATURES
+                    for feature in (
+                        features or common_google.GOOGLE_CLOUD_VISION_OCR_FEATURES
+                    )
                 ],
                 "image": {"content": base64_content},
             }
@@ -368,18 +729,218 @@ def run_ocr_on_image(image_path: Path | str, api_key: str) -> dict[str, Any] | N
             response.status_code,
             response.text,
         )
-    return response.json()
+    return rescale_ocr_vertices(response.json(), scale)
+
 
+def run_ocr_on_images(
+    image_paths: list[Path],
+    api_key: str,
+    features: list[str] | None = None,
+    max_size: int | None = common_google.GOOGLE_CLOUD_VISION_OCR_MAX_IMAGE_SIZE,
+) -> list[dict[str, Any] | None]:
+    """Run Google Cloud Vision OCR on several images, with a single
+    images:annotate request (at most GOOGLE_CLOUD_VISION_OCR_MAX_BATCH_SIZE
+    images).
 
-def fetch_and_save_ocr_data(image_path: Path | str, override: bool = False) -> bool:
+    :param image_paths: the paths to the images
+    :param api_key: the Google Cloud Vision API key
+    :param features: the Cloud Vision features to request, defaults to
+        GOOGLE_CLOUD_VISION_OCR_FEATURES
+    :param max_size: downscale the images to this max edge before upload,
+        defaults to GOOGLE_CLOUD_VISION_OCR_MAX_IMAGE_SIZE (None to disable).
+        The returned coordinates are mapped back onto the original images
+    :return: for each image, the OCR data (same format as run_ocr_on_image,
+        may contain an error), or None if the request failed
+    """
+    if len(image_paths) > common_google.GOOGLE_CLOUD_VISION_OCR_MAX_BATCH_SIZE:
+        raise ValueError(
+            f"Too many images ({len(image_paths)}), max is "
+            f"{common_google.GOOGLE_CLOUD_VISION_OCR_MAX_BATCH_SIZE}"
+        )
+    features = features or common_google.GOOGLE_CLOUD_VISION_OCR_FEATURES
+    url = f"{common_google.GOOGLE_CLOUD_VISION_OCR_API_URL}?key={api_key}"
+    contents, scales = [], []
+    for image_path in image_paths:
+        content, scale = get_ocr_image_content(image_path, max_size=max_size)
+        contents.append(content)
+        scales.append(scale)
+    data = {
+        "requests": [
+            {
+                "features": [{"type": feature} for feature in features],
+                "image": {"content": content},
+            }
+            for content in contents
+        ]
+    }
+    response = http_session.post(url, json=data)
+
+    if not response.ok:
+        logger.error(
+            "Error running OCR on %d images, HTTP %s\n%s",
+            len(image_paths),
+            response.status_code,
+            response.text,
+        )
+        return [None] * len(image_paths)
+
+    results = []
+    for image_path, scale, image_response in zip(
+        image_paths, scales, response.json().get("responses", [])
+    ):
+        if "error" in image_response:
+            logger.error(
+                "Error running OCR on image %s: %s", image_path, image_response["error"]
+            )
+        # the coordinates are relative to the uploaded (possibly downscaled)
+        # image: map them back onto the stored image
+        results.append({"responses": [rescale_ocr_vertices(image_response, scale)]})
+    return results
+
+
+def get_ocr_data_error(data: dict[str, Any]) -> dict[str, Any] | None:
+    """Return the error of the OCR data, if any."""
+    if "error" in data:
+        return data["error"]
+    for response in data.get("responses", []):
+        if "error" in response:
+            return response["error"]
+    return None
+
+
+def get_ocr_data_text(data: dict[str, Any]) -> str:
+    """Return the full text detected in the image."""
+    for response in data.get("responses", []):
+        if "fullTextAnnotation" in response:
+            return response["fullTextAnnotation"].get("text", "")
+        if response.get("textAnnotations"):
+            return response["textAnnotations"][0].get("description", "")
+    return ""
+
+
+def save_proof_ocr_result(proof_id: int, data: dict[str, Any]) -> ProofOcrResult:
+    """Save the OCR result of a proof in DB (ProofOcrResult): status, text &
+    error. The raw OCR data is only stored in the `.json.gz` file next to the
+    image (see save_ocr_data).
+
+    :param proof_id: the ID of the proof
+    :param data: the OCR data
+    :return: the ProofOcrResult instance
+    """
+    error = get_ocr_data_error(data)
+    ocr_result, _ = ProofOcrResult.objects.update_or_create(
+        proof_id=proof_id,
+        defaults={
+            "status": (
+                proof_constants.OCR_STATUS_ERROR
+                if error
+                else proof_constants.OCR_STATUS_SUCCESS
+            ),
+            "text": get_ocr_data_text(data),
+            "error": error,
+            "size": len(json.dumps(data).encode("utf-8")),
+            "created": (
+                datetime.datetime.fromtimestamp(
+                    data["created_at"], tz=datetime.timezone.utc
+                )
+                if "created_at" in data
+                else timezone.now()
+            ),
+        },
+    )
+    return ocr_result
+
+
+def save_ocr_data(
+    image_path: Path, data: dict[str, Any], proof_id: int | None = None
+) -> None:
+    """Save the OCR data next to the image, in a `.json.gz` file (served with
+    the images), and the OCR result in DB (if the proof ID is provided).
+    Errors are only saved in DB.
+
+    :param image_path: the path to the image
+    :param data: the OCR data
+    :param proof_id: the ID of the proof, if known
+    """
+    data["created_at"] = int(time.time())
+
+    if proof_id is not None:
+        ocr_result = save_proof_ocr_result(proof_id, data)
+        if ocr_result.status == proof_constants.OCR_STATUS_ERROR:
+            return
+
+    ocr_json_path = image_path.with_suffix(".json.gz")
+    with gzip.open(ocr_json_path, "wt") as f:
+        f.write(json.dumps(data))
+
+    logger.debug("OCR data saved to %s", ocr_json_path)
+
+
+def copy_proof_ocr_result_from_duplicate(
+    proof_id: int, image_path: Path
+) -> ProofOcrResult | None:
+    """Copy the successful OCR result (and OCR file) of a proof with the same
+    file content (SHA-256), instead of running OCR again.
+
+    :param proof_id: the ID of the proof
+    :param image_path: the path to the image of the proof
+    :return: the copied ProofOcrResult, or None if no duplicate has one
+    """
+    image_sha256 = (
+        Proof.objects.filter(id=proof_id).values_list("image_sha256", flat=True).first()
+    )
+    if not image_sha256:
+        return None
+    source_ocr_result = (
+        ProofOcrResult.objects.filter(
+            proof__image_sha256=image_sha256,
+            status=proof_constants.OCR_STATUS_SUCCESS,
+        )
+        .exclude(proof_id=proof_id)
+        .select_related("proof")
+        .order_by("proof_id")
+        .first()
+    )
+    if source_ocr_result is None or not source_ocr_result.proof.file_path_full:
+        return None
+    source_ocr_json_path = Path(source_ocr_result.proof.file_path_full).with_suffix(
+        ".json.gz"
+    )
+    if not source_ocr_json_path.exists():
+        return None
+    logger.info(
+        "Copying OCR result of proof %s to duplicate proof %s",
+        source_ocr_result.proof_id,
+        proof_id,
+    )
+    ocr_json_path = image_path.with_suffix(".json.gz")
+    if ocr_json_path != source_ocr_json_path:
+        shutil.copyfile(source_ocr_json_path, ocr_json_path)
+    ocr_result, _ = ProofOcrResult.objects.update_or_create(
+        proof_id=proof_id,
+        defaults={
+            "status": source_ocr_result.status,
+            "text": source_ocr_result.text,
+            "error": None,
+            "size": source_ocr_result.size,
+            "created": source_ocr_result.created,
+        },
+    )
+    return ocr_result
+
+
+def fetch_and_save_ocr_data(
+    image_path: Path | str, override: bool = False, proof_id: int | None = None
+) -> bool:
     """Run OCR on the image stored at the given path and save the result to a
-    JSON file.
+    JSON file (and in DB, if the proof ID is provided).
 
     The JSON file will be saved in the same directory as the image, with the
     same name but a `.json` extension.
 
     :param image_path: the path to the image
     :param override: whether to override existing OCR data, default to False
+    :param proof_id: the ID of the proof of the image, defaults to None
     :return: True if the OCR data was saved, False otherwise
     """
     image_path = Path(image_path)
@@ -392,24 +953,83 @@ def fetch_and_save_ocr_data(image_path: Path | str, override: bool = False) -> b
         logger.error("No Google Cloud Vision API key found")
         return False
 
-    ocr_json_path = image_path.with_suffix(".json.gz")
+    if proof_id is not None:
+        ocr_exists = ProofOcrResult.objects.filter(proof_id=proof_id).exists()
+    else:
+        ocr_exists = image_path.with_suffix(".json.gz").exists()
 
-    if ocr_json_path.exists() and not override:
+    if ocr_exists and not override:
         logger.info("OCR data already exists for %s", image_path)
         return False
 
+    if proof_id is not None and not override:
+        if copy_proof_ocr_result_from_duplicate(proof_id, image_path):
+            return True
+
     data = run_ocr_on_image(image_path, settings.GOOGLE_CLOUD_VISION_API_KEY)
 
     if data is None:
         return False
 
-    data["created_at"] = int(time.time())
+    save_ocr_data(image_path, data, proof_id=proof_id)
+    return True
 
-    with gzip.open(ocr_json_path, "wt") as f:
-        f.write(json.dumps(data))
 
-    logger.debug("OCR data saved to %s", ocr_json_path)
-    return True
+def fetch_and_save_proof_ocr_batch(
+    proofs: list[Proof],
+    features: list[str] | None = None,
+    max_size: int | None = common_google.GOOGLE_CLOUD_VISION_OCR_MAX_IMAGE_SIZE,
+) -> int:
+    """Run OCR on the images of several proofs (packed in images:annotate
+    requests of GOOGLE_CLOUD_VISION_OCR_MAX_BATCH_SIZE images), and save the
+    results (see save_ocr_data).
+
+    :param proofs: the proofs to run the OCR on
+    :param features: the Cloud Vision features to request, defaults to
+        GOOGLE_CLOUD_VISION_OCR_FEATURES
+    :param max_size: downscale the images to this max edge before upload
+    :return: the number of OCR results saved
+    """
+    if not settings.GOOGLE_CLOUD_VISION_API_KEY:
+        logger.error("No Google Cloud Vision API key found")
+        return 0
+
+    proofs = [
+        proof
+        for proof in proofs
+        if proof.file_path_full
+        and Path(proof.file_path_full).suffix in (".jpg", ".jpeg", ".png", ".webp")
+        and Path(proof.file_path_full).exists()
+    ]
+    saved = 0
+    batch_size = common_google.GOOGLE_CLOUD_VISION_OCR_MAX_BATCH_SIZE
+    for i in range(0, len(proofs), batch_size):
+        batch = proofs[i : i + batch_size]
+        image_paths = [Path(proof.file_path_full) for proof in batch]
+        results = run_ocr_on_images(
+            image_paths,
+            settings.GOOGLE_CLOUD_VISION_API_KEY,
+            features=features,
+            max_size=max_size,
+        )
+        for proof, image_path, data in zip(batch, image_paths, results):
+            if data is not None:
+                save_ocr_data(image_path, data, proof_id=proof.id)
+                saved += 1
+    return saved
+
+
+def load_ocr_texts(proof_ids: list[int]) -> dict[int, str]:
+    """Load the OCR text of several proofs, in a single query.
+
+    :param proof_ids: the IDs of the proofs
+    :return: a dict proof ID -> OCR text (proofs without OCR are missing)
+    """
+    return dict(
+        ProofOcrResult.objects.filter(
+            proof_id__in=proof_ids, status=proof_constants.OCR_STATUS_SUCCESS
+        ).values_list("proof_id", "text")
+    )
 
 
 def run_and_save_price_tag_extraction_from_id(price_tag_id: int) -> None:
@@ -430,42 +1050,116 @@ def run_and_save_price_tag_extraction_from_id(price_tag_id: int) -> None:
     run_and_save_price_tag_extraction([price_tag], price_tag.proof)
 
 
+def crop_price_tag_image(image: Image.Image, price_tag: PriceTag) -> Image.Image:
+    """Crop the price tag bounding box (relative coordinates) from the proof
+    image."""
+    y_min, x_min, y_max, x_max = price_tag.bounding_box
+    (left, right, top, bottom) = (
+        x_min * image.width,
+        x_max * image.width,
+        y_min * image.height,
+        y_max * image.height,
+    )
+    return image.crop((left, top, right, bottom))
+
+
+def extract_from_price_tag_with_retries(
+    image: Image.Image,
+    max_retries: int = GEMINI_MAX_RETRIES,
+    backoff: float = GEMINI_RETRY_BACKOFF_SECONDS,
+) -> Label | None:
+    """Call extract_from_price_tag, retrying with an exponential backoff
+    when Gemini is rate-limited or temporarily unavailable.
+
+    :return: the extracted information, or None if all the attempts failed
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return extract_from_price_tag(image)
+        except GEMINI_RETRYABLE_EXCEPTIONS as e:
+            if attempt == max_retries:
+                logger.error("Price tag extraction failed: %s", e)
+                return None
+            delay = backoff * 2**attempt
+            logger.warning("Price tag extraction error (%s), retry in %ss", e, delay)
+            time.sleep(delay)
+        except Exception as e:
+            logger.exception("Price tag extraction failed: %s", e)
+            return None
+
+
 def run_and_save_price_tag_extraction(
-    price_tags: list[PriceTag], proof: Proof
+    price_tags: list[PriceTag],
+    proof: Proof,
+    max_workers: int | None = None,
 ) -> list[PriceTagPrediction]:
     """Extract information from price tags using the Gemini model and save the
     predictions in the database.
 
+    The proof image is decoded only once, all the price tags are cropped up
+    front, and the Gemini calls are run concurrently (at most `max_workers`
+    at a time), for the crops missing from the prediction cache. Price tags
+    whose extraction failed are skipped.
+
     :param price_tags: the list of PriceTag instances to extract information
         from
     :param proof: the Proof instance associated with the price tags
+    :param max_workers: the max number of concurrent Gemini calls, defaults
+        to settings.GOOGLE_GEMINI_MAX_WORKERS
     :return: the list of PriceTagPrediction instances created
     """
     if proof.file_path_full is None or not Path(proof.file_path_full).exists():
         logger.error("Proof file not found: %s", proof.file_path_full)
         return []
 
-    predictions = []
-    for price_tag in price_tags:
-        y_min, x_min, y_max, x_max = price_tag.bounding_box
-        image = Image.open(proof.file_path_full)
-        (left, right, top, bottom) = (
-            x_min * image.width,
-            x_max * image.width,
-            y_min * image.height,
-            y_max * image.height,
-        )
-        cropped_image = image.crop((left, top, right, bottom))
-        label = extract_from_price_tag(cropped_image)
-        prediction = PriceTagPrediction.objects.create(
-            price_tag=price_tag,
-            type=proof_constants.PRICE_TAG_EXTRACTION_TYPE,
-            model_name=common_google.GEMINI_MODEL_NAME,
-            model_version=common_google.GEMINI_MODEL_VERSION,
-            data=label,
-        )
-        predictions.append(prediction)
+    if not price_tags:
+        return []
+
+    with Image.open(proof.file_path_full) as image:
+        image.load()
+        image_digest = get_image_digest(image, proof)
+        cropped_images = [
+            crop_price_tag_image(image, price_tag) for price_tag in price_tags
+        ]
+
+    max_workers = max_workers or settings.GOOGLE_GEMINI_MAX_WORKERS
+
+    def extract(indexes: list[int]) -> list[Label | None]:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(indexes))) as executor:
+            return list(
+                executor.map(
+                    extract_from_price_tag_with_retries,
+                    [cropped_images[i] for i in indexes],
+                )
+            )
+
+    labels = get_or_compute_predictions(
+        [
+            (image_digest, get_crop_box_key(price_tag.bounding_box))
+            for price_tag in price_tags
+        ],
+        common_google.GEMINI_MODEL_NAME,
+        common_google.GEMINI_MODEL_VERSION,
+        extract,
+    )
 
+    predictions = PriceTagPrediction.objects.bulk_create(
+        [
+            PriceTagPrediction(
+                price_tag=price_tag,
+                type=proof_constants.PRICE_TAG_EXTRACTION_TYPE,
+                model_name=common_google.GEMINI_MODEL_NAME,
+                model_version=common_google.GEMINI_MODEL_VERSION,
+                data=label,
+            )
+            for price_tag, label in zip(price_tags, labels)
+            if label is not None
+        ]
+    )
+    # bulk_create does not send post_save signals: update the counts here
+    PriceTag.objects.filter(
+        id__in=[prediction.price_tag_id for prediction in predictions]
+    ).update(prediction_count=F("prediction_count") + 1)
     return predictions
 
 
@@ -497,16 +1191,19 @@ def update_price_tag_extraction(price_tag_id: int) -> PriceTagPrediction:
         )
         return None
 
-    y_min, x_min, y_max, x_max = price_tag.bounding_box
-    image = Image.open(proof.file_path_full)
-    (left, right, top, bottom) = (
-        x_min * image.width,
-        x_max * image.width,
-        y_min * image.height,
-        y_max * image.height,
+    with Image.open(proof.file_path_full) as image:
+        image_digest = get_image_digest(image, proof)
+        cropped_image = crop_price_tag_image(image, price_tag)
+    gemini_output = extract_from_price_tag_with_retries(cropped_image)
+    if gemini_output is None:
+        return None
+    # the extraction is run again on purpose: replace the cached output
+    set_cached_predictions(
+        [(image_digest, get_crop_box_key(price_tag.bounding_box))],
+        [gemini_output],
+        common_google.GEMINI_MODEL_NAME,
+        common_google.GEMINI_MODEL_VERSION,
     )
-    cropped_image = image.crop((left, top, right, bottom))
-    gemini_output = extract_from_price_tag(cropped_image)
     price_tag_prediction.data = gemini_output
     price_tag_prediction.model_name = common_google.GEMINI_MODEL_NAME
     price_tag_prediction.model_version = common_google.GEMINI_MODEL_VERSION
@@ -586,7 +1283,11 @@ def create_receipt_items_from_proof_prediction(
 
 
 def run_and_save_price_tag_detection(
-    image: Image, proof: Proof, overwrite: bool = False, run_extraction: bool = True
+    image: Image,
+    proof: Proof,
+    overwrite: bool = False,
+    run_extraction: bool = True,
+    detections: list[dict[str, Any]] | None = None,
 ) -> ProofPrediction | None:
     """Run the price tag object detection model and save the prediction
     in ProofPrediction table.
@@ -597,6 +1298,8 @@ def run_and_save_price_tag_detection(
         False
     :param run_extraction: whether to run the price tag extraction model on the
         detected price tags, defaults to True
+    :param detections: the detected objects, if already computed (batch
+        inference), defaults to None
     :return: the ProofPrediction instance created, or None if the prediction
         already exists and overwrite is False
     """
@@ -630,8 +1333,13 @@ def run_and_save_price_tag_detection(
                 )
             return None
 
-    result = detect_price_tags(image)
-    detections = result.to_list()
+    if detections is None:
+        (detections,) = get_or_compute_predictions(
+            [(get_image_digest(image, proof), "")],
+            PRICE_TAG_DETECTOR_MODEL_NAME,
+            PRICE_TAG_DETECTOR_MODEL_VERSION,
+            lambda _: [detect_price_tags(image).to_list()],
+        )
     if detections:
         max_confidence = max(detections, key=lambda x: x["score"])["score"]
     else:
@@ -653,7 +1361,10 @@ def run_and_save_price_tag_detection(
 
 
 def run_and_save_proof_type_prediction(
-    image: Image, proof: Proof, overwrite: bool = False
+    image: Image,
+    proof: Proof,
+    overwrite: bool = False,
+    prediction: list[tuple[str, float]] | None = None,
 ) -> ProofPrediction | None:
     """Run the proof type classifier model and save the prediction in
     ProofPrediction table.
@@ -662,6 +1373,8 @@ def run_and_save_proof_type_prediction(
     :param proof: the Proof instance to associate the ProofPrediction with
     :param overwrite: whether to overwrite existing prediction, defaults to
         False
+    :param prediction: the prediction results, if already computed (batch
+        inference), defaults to None
     :return: the ProofPrediction instance created, or None if the prediction
         already exists and overwrite is False
     """
@@ -681,7 +1394,13 @@ def run_and_save_proof_type_prediction(
             )
             return None
 
-    prediction = predict_proof_type(image)
+    if prediction is None:
+        (prediction,) = get_or_compute_predictions(
+            [(get_image_digest(image, proof), "")],
+            PROOF_CLASSIFICATION_MODEL_NAME,
+            PROOF_CLASSIFICATION_MODEL_VERSION,
+            lambda _: [predict_proof_type(image)],
+        )
 
     max_confidence = max(prediction, key=lambda x: x[1])[1]
     proof_type = max(prediction, key=lambda x: x[1])[0]
@@ -734,7 +1453,12 @@ def run_and_save_receipt_extraction_prediction(
             )
             return None
 
-    prediction = extract_from_receipt(image)
+    (prediction,) = get_or_compute_predictions(
+        [(get_image_digest(image, proof), "")],
+        common_google.GEMINI_MODEL_NAME,
+        common_google.GEMINI_MODEL_VERSION,
+        lambda _: [extract_from_receipt(image)],
+    )
 
     proof_prediction = ProofPrediction.objects.create(
         proof=proof,
@@ -747,6 +1471,139 @@ def run_and_save_receipt_extraction_prediction(
     return proof_prediction
 
 
+def get_proof_model_names(proof_type: str) -> list[str]:
+    """Get the names of the models run on the proofs of the given type (see
+    run_and_save_proof_prediction).
+
+    :param proof_type: the type of the proof
+    :return: the list of model names
+    """
+    model_names = [PROOF_CLASSIFICATION_MODEL_NAME]
+    if proof_type == proof_constants.TYPE_PRICE_TAG:
+        model_names.append(PRICE_TAG_DETECTOR_MODEL_NAME)
+    elif proof_type == proof_constants.TYPE_RECEIPT:
+        model_names.append(common_google.GEMINI_MODEL_NAME)
+    return model_names
+
+
+def get_duplicate_proof_with_predictions(proof: Proof) -> Proof | None:
+    """Get the oldest proof with the same file content (SHA-256) that already
+    has predictions of the models that apply to the proof type.
+
+    :param proof: the Proof instance
+    :return: the duplicate proof, or None
+    """
+    if not proof.image_sha256:
+        return None
+    return (
+        Proof.objects.filter(
+            image_sha256=proof.image_sha256,
+            predictions__model_name__in=get_proof_model_names(proof.type),
+        )
+        .exclude(id=proof.id)
+        .order_by("id")
+        .first()
+    )
+
+
+def copy_proof_ml_results(
+    source_proof: Proof, proof: Proof, run_price_tag_extraction: bool = True
+) -> list[ProofPrediction]:
+    """Copy the ML results of a proof to a duplicate proof (same file
+    content), instead of running the models again.
+
+    Only the predictions of the models that apply to the duplicate proof type
+    are copied (the other models are run as usual, see
+    run_and_save_proof_prediction), along with the price tags and receipt
+    items created from them (with their predictions). User validations
+    (status, linked price) are not copied.
+
+    :param source_proof: the proof with the ML results
+    :param proof: the duplicate proof
+    :param run_price_tag_extraction: whether to run the price tag extraction
+        model on the copied price tags not extracted yet, defaults to True
+    :return: the list of ProofPrediction instances created
+    """
+    logger.info(
+        "Copying ML results of proof %s to duplicate proof %s",
+        source_proof.id,
+        proof.id,
+    )
+    proof_predictions = {}
+    for source_prediction in (
+        source_proof.predictions.filter(
+            model_name__in=get_proof_model_names(proof.type)
+        )
+        .exclude(model_name__in=proof.predictions.values("model_name"))
+        .order_by("id")
+    ):
+        proof_predictions[source_prediction.id] = ProofPrediction.objects.create(
+            proof=proof,
+            type=source_prediction.type,
+            model_name=source_prediction.model_name,
+            model_version=source_prediction.model_version,
+            data=source_prediction.data,
+            value=source_prediction.value,
+            max_confidence=source_prediction.max_confidence,
+        )
+
+    source_price_tags = (
+        PriceTag.objects.filter(
+            proof=source_proof, proof_prediction_id__in=proof_predictions.keys()
+        )
+        .prefetch_related("predictions")
+        .order_by("id")
+    )
+    price_tag_predictions, price_tags_to_extract = [], []
+    for source_price_tag in source_price_tags:
+        source_price_tag_predictions = list(source_price_tag.predictions.all())
+        price_tag = PriceTag.objects.create(
+            proof=proof,
+            proof_prediction=proof_predictions[source_price_tag.proof_prediction_id],
+            bounding_box=source_price_tag.bounding_box,
+            status=None,
+            prediction_count=len(source_price_tag_predictions),
+            created_by=None,
+            updated_by=None,
+        )
+        price_tag_predictions.extend(
+            PriceTagPrediction(
+                price_tag=price_tag,
+                type=source_price_tag_prediction.type,
+                model_name=source_price_tag_prediction.model_name,
+                model_version=source_price_tag_prediction.model_version,
+                data=source_price_tag_prediction.data,
+            )
+            for source_price_tag_prediction in source_price_tag_predictions
+        )
+        if not any(
+            source_price_tag_prediction.type
+            == proof_constants.PRICE_TAG_EXTRACTION_TYPE
+            for source_price_tag_prediction in source_price_tag_predictions
+        ):
+            price_tags_to_extract.append(price_tag)
+    # bulk_create skips the signals: prediction_count is set above
+    PriceTagPrediction.objects.bulk_create(price_tag_predictions)
+    if price_tags_to_extract and run_price_tag_extraction:
+        # the source extraction was not run (or not done yet)
+        run_and_save_price_tag_extraction(price_tags_to_extract, proof)
+
+    ReceiptItem.objects.bulk_create(
+        ReceiptItem(
+            proof=proof,
+            proof_prediction=proof_predictions[source_receipt_item.proof_prediction_id],
+            price=None,
+            order=source_receipt_item.order,
+            predicted_data=source_receipt_item.predicted_data,
+            status=None,
+        )
+        for source_receipt_item in ReceiptItem.objects.filter(
+            proof=source_proof, proof_prediction_id__in=proof_predictions.keys()
+        ).order_by("order")
+    )
+    return list(proof_predictions.values())
+
+
 def run_and_save_proof_prediction(
     proof: Proof,
     run_price_tag_extraction: bool = True,
@@ -775,6 +1632,13 @@ def run_and_save_proof_prediction(
         logger.debug("Skipping %s, not a supported image type", file_path_full)
         return None
 
+    duplicate_proof = get_duplicate_proof_with_predictions(proof)
+    if duplicate_proof is not None:
+        # the models with copied results are skipped below
+        copy_proof_ml_results(
+            duplicate_proof, proof, run_price_tag_extraction=run_price_tag_extraction
+        )
+
     image = Image.open(file_path_full)
     run_and_save_proof_type_prediction(image, proof)
     run_and_save_price_tag_detection(
@@ -782,3 +1646,132 @@ def run_and_save_proof_prediction(
     )
     if run_receipt_extraction:
         run_and_save_receipt_extraction_prediction(image, proof)
+
+
+def run_and_save_proof_predictions_batch(
+    proofs: list[Proof],
+    run_proof_classification: bool = True,
+    run_price_tag_detection: bool = True,
+    run_price_tag_extraction: bool = True,
+    run_receipt_extraction: bool = True,
+    triton_uri: str = settings.TRITON_URI,
+) -> int:
+    """Run the ML models on several proofs, and save the predictions in DB.
+
+    Same as run_and_save_proof_prediction, but the proof type classification
+    and the price tag detection are run with a single (batched) Triton
+    request for all the proofs (the ones missing from the prediction cache).
+
+    The proofs without predictions that are duplicates of an already
+    processed proof (same file content) get a copy of its ML results, and
+    only the missing models are run.
+
+    :param proofs: the Proof instances to process
+    :return: the number of proof images processed
+    """
+    proof_ids_with_predictions = set(
+        ProofPrediction.objects.filter(proof__in=proofs).values_list(
+            "proof_id", flat=True
+        )
+    )
+    images, image_proofs = [], []
+    for proof in proofs:
+        if proof.id not in proof_ids_with_predictions:
+            duplicate_proof = get_duplicate_proof_with_predictions(proof)
+            if duplicate_proof is not None:
+                # the models with copied results are skipped below
+                copy_proof_ml_results(
+                    duplicate_proof,
+                    proof,
+                    run_price_tag_extraction=run_price_tag_extraction,
+                )
+        file_path_full = proof.file_path_full
+        if file_path_full is None or not Path(file_path_full).exists():
+            logger.error("Proof file not found: %s", file_path_full)
+            continue
+        if Path(file_path_full).suffix not in (".jpg", ".jpeg", ".png", ".webp"):
+            logger.debug("Skipping %s, not a supported image type", file_path_full)
+            continue
+        image = Image.open(file_path_full)
+        image.load()
+        images.append(image)
+        image_proofs.append(proof)
+
+    if not images:
+        return 0
+
+    # prediction cache keys
+    image_digests = [
+        (get_image_digest(image, proof), "")
+        for image, proof in zip(images, image_proofs)
+    ]
+
+    if run_proof_classification:
+        proof_ids_with_prediction = set(
+            ProofPrediction.objects.filter(
+                proof__in=image_proofs, model_name=PROOF_CLASSIFICATION_MODEL_NAME
+            ).values_list("proof_id", flat=True)
+        )
+        indexes = [
+            i
+            for i, proof in enumerate(image_proofs)
+            if proof.id not in proof_ids_with_prediction
+        ]
+        if indexes:
+            predictions = get_or_compute_predictions(
+                [image_digests[i] for i in indexes],
+                PROOF_CLASSIFICATION_MODEL_NAME,
+                PROOF_CLASSIFICATION_MODEL_VERSION,
+                lambda misses: predict_proof_types(
+                    [images[indexes[j]] for j in misses], triton_uri=triton_uri
+                ),
+            )
+            for i, prediction in zip(indexes, predictions):
+                run_and_save_proof_type_prediction(
+                    images[i], image_proofs[i], prediction=prediction
+                )
+
+    if run_price_tag_detection:
+        proof_ids_with_prediction = set(
+            ProofPrediction.objects.filter(
+                proof__in=image_proofs, model_name=PRICE_TAG_DETECTOR_MODEL_NAME
+            ).values_list("proof_id", flat=True)
+        )
+        indexes = [
+            i
+            for i, proof in enumerate(image_proofs)
+            if proof.type == proof_constants.TYPE_PRICE_TAG
+        ]
+        indexes_to_detect = [
+            i for i in indexes if image_proofs[i].id not in proof_ids_with_prediction
+        ]
+        detections = dict(
+            zip(
+                indexes_to_detect,
+                get_or_compute_predictions(
+                    [image_digests[i] for i in indexes_to_detect],
+                    PRICE_TAG_DETECTOR_MODEL_NAME,
+                    PRICE_TAG_DETECTOR_MODEL_VERSION,
+                    lambda misses: [
+                        result.to_list()
+                        for result in detect_price_tags_batch(
+                            [images[indexes_to_detect[j]] for j in misses],
+                            triton_uri=triton_uri,
+                        )
+                    ],
+                ),
+            )
+        )
+        for i in indexes:
+            run_and_save_price_tag_detection(
+                images[i],
+                image_proofs[i],
+                run_extraction=run_price_tag_extraction,
+                detections=detections.get(i),
+            )
+
+    if run_receipt_extraction:
+        for image, proof in zip(images, image_proofs):
+            run_and_save_receipt_extraction_prediction(image, proof)
+
+    return len(images)
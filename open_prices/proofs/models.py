@@ -5,12 +5,13 @@ from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import Case, CharField, Count, F, Value, When, signals
+from django.db.models import Case, Count, F, Q, Value, When, signals
 from django.dispatch import receiver
 from django.utils import timezone
 from django_q.tasks import async_task
 
 from open_prices.common import constants, utils
+from open_prices.common.models import DeletedObject
 from open_prices.locations import constants as location_constants
 from open_prices.proofs import constants as proof_constants
 
@@ -32,40 +33,18 @@ class ProofQuerySet(models.QuerySet):
         return self.filter(type__in=proof_constants.TYPE_GROUP_SINGLE_SHOP_LIST)
 
     def has_kind_community(self):
-        return self.exclude(owner_consumption=True)
+        return self.filter(kind=constants.KIND_COMMUNITY)
 
     def has_kind_consumption(self):
-        return self.filter(
-            type__in=proof_constants.TYPE_GROUP_CONSUMPTION_LIST, owner_consumption=True
-        )
+        return self.filter(kind=constants.KIND_CONSUMPTION)
 
     def has_prices(self):
         return self.filter(price_count__gt=0)
 
     def with_extra_fields(self):
+        # stored columns (see Proof.set_kind & Proof.set_source_category)
         return self.annotate(
-            kind_annotated=Case(
-                When(
-                    type__in=proof_constants.TYPE_GROUP_CONSUMPTION_LIST,
-                    owner_consumption=True,
-                    then=Value(constants.KIND_CONSUMPTION),
-                ),
-                default=Value(constants.KIND_COMMUNITY),
-                output_field=CharField(),
-            ),
-            source_annotated=Case(
-                When(
-                    source__contains="Open Prices Web App",
-                    then=Value(constants.SOURCE_WEB),
-                ),
-                When(
-                    source__contains="Smoothie",
-                    then=Value(constants.SOURCE_MOBILE),
-                ),
-                When(source__contains="API", then=Value(constants.SOURCE_API)),
-                default=Value(constants.SOURCE_OTHER),
-                output_field=CharField(),
-            ),
+            kind_annotated=F("kind"), source_annotated=F("source_category")
         )
 
     def with_stats(self):
@@ -73,7 +52,15 @@ class ProofQuerySet(models.QuerySet):
 
 
 class Proof(models.Model):
-    FILE_FIELDS = ["file_path", "mimetype", "image_thumb_path"]
+    FILE_FIELDS = [
+        "file_path",
+        "mimetype",
+        "image_thumb_path",
+        "image_sha256",
+        "image_phash",
+    ]
+    # internal (duplicate detection), not exposed in the API
+    PRIVATE_FIELDS = ["image_sha256", "image_phash"]
     UPDATE_FIELDS = [
         "location_osm_id",
         "location_osm_type",
@@ -102,6 +89,20 @@ class Proof(models.Model):
     type = models.CharField(max_length=20, choices=proof_constants.TYPE_CHOICES)
 
     image_thumb_path = models.CharField(blank=True, null=True)
+    image_sha256 = models.CharField(
+        verbose_name="SHA-256 of the uploaded file",
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+    image_phash = models.CharField(
+        verbose_name="Perceptual hash (dHash) of the uploaded image",
+        max_length=16,
+        blank=True,
+        null=True,
+        db_index=True,
+    )
 
     location_osm_id = models.PositiveBigIntegerField(blank=True, null=True)
     location_osm_type = models.CharField(
@@ -153,6 +154,20 @@ class Proof(models.Model):
     owner = models.CharField(blank=True, null=True)
     source = models.CharField(blank=True, null=True)
 
+    # denormalized (from owner_consumption & source), set in save
+    kind = models.CharField(
+        max_length=20,
+        choices=constants.KIND_CHOICES,
+        default=constants.KIND_COMMUNITY,
+        db_index=True,
+    )
+    source_category = models.CharField(
+        max_length=10,
+        choices=constants.SOURCE_CHOICES,
+        default=constants.SOURCE_OTHER,
+        db_index=True,
+    )
+
     created = models.DateTimeField(default=timezone.now)
     updated = models.DateTimeField(auto_now=True)
 
@@ -161,6 +176,7 @@ class Proof(models.Model):
     class Meta:
         # managed = False
         db_table = "proofs"
+        indexes = [models.Index(fields=["updated", "id"])]
         verbose_name = "Proof"
         verbose_name_plural = "Proofs"
 
@@ -302,7 +318,22 @@ class Proof(models.Model):
             )
             self.location = location
 
+    def set_kind(self):
+        # owner_consumption can only be set on consumption proofs (see clean)
+        if (
+            self.type in proof_constants.TYPE_GROUP_CONSUMPTION_LIST
+            and self.owner_consumption
+        ):
+            self.kind = constants.KIND_CONSUMPTION
+        else:
+            self.kind = constants.KIND_COMMUNITY
+
+    def set_source_category(self):
+        self.source_category = utils.get_source_category(self.source)
+
     def save(self, *args, **kwargs):
+        self.set_kind()
+        self.set_source_category()
         self.full_clean()
         self.set_location()
         super().save(*args, **kwargs)
@@ -323,12 +354,6 @@ class Proof(models.Model):
     def is_type_single_shop(self):
         return self.type in proof_constants.TYPE_GROUP_SINGLE_SHOP_LIST
 
-    @property
-    def kind(self):
-        if self.owner_consumption:
-            return constants.KIND_CONSUMPTION
-        return constants.KIND_COMMUNITY
-
     def update_price_count(self):
         self.price_count = self.prices.count()
         self.save(update_fields=["price_count"])
@@ -350,6 +375,78 @@ class Proof(models.Model):
         if new_location:
             new_location.update_price_count()
 
+    def update_prices_duplicate_fields(self) -> int:
+        """
+        Copy the proof fields duplicated in its prices (location, date,
+        currency) with a single UPDATE, on the prices that differ.
+        Then update the counts of the affected locations & products, and
+        the EUR prices, in bulk.
+        """
+        from open_prices.locations.models import Location
+        from open_prices.prices import utils as price_utils
+        from open_prices.prices.models import LatestPrice, Price
+        from open_prices.products.models import Product
+
+        fields = {field: getattr(self, field) for field in Price.DUPLICATE_PROOF_FIELDS}
+        # same as Price.get_or_create_location (proof location set in save)
+        if self.location_osm_id and self.location_osm_type:
+            fields["location_id"] = self.location_id
+        prices_to_update = self.prices.exclude(**fields)
+        latest_price_keys_before = list(
+            prices_to_update.order_by()
+            .values_list("product_id", "category_tag", "location_id")
+            .distinct()
+        )
+        location_ids_before = {key[2] for key in latest_price_keys_before}
+        price_ids = list(prices_to_update.values_list("id", flat=True))
+        if not price_ids:
+            return 0
+        updated_count = Price.objects.filter(id__in=price_ids).update(
+            **fields,
+            # a new currency moves the price to another group of comparable
+            # prices: flag it as pending for the next outlier detection run
+            price_is_outlier=Case(
+                When(~Q(currency=self.currency), then=Value(None)),
+                default=F("price_is_outlier"),
+            ),
+            updated=timezone.now(),
+        )
+        if updated_count and "location_id" in fields:
+            Location.objects.filter(
+                id__in=(location_ids_before - {None}) | {self.location_id}
+            ).update_price_counts()
+        if updated_count:
+            products = Product.objects.filter(
+                id__in=self.prices.filter(product_id__isnull=False).values("product_id")
+            )
+            products.update_price_counts()
+            products.update_price_summaries()
+            # the EUR prices depend on the currency & date
+            Price.objects.filter(id__in=price_ids).update_eur_prices()
+            LatestPrice.objects.refresh(
+                latest_price_keys_before
+                + [
+                    (key[0], key[1], fields.get("location_id", key[2]))
+                    for key in latest_price_keys_before
+                ]
+            )
+            price_utils.invalidate_price_stats_cache()
+        return updated_count
+
+    def update_prices_kind(self) -> int:
+        """
+        Copy the proof kind in its prices (after an owner_consumption change),
+        with a single UPDATE on the prices that differ
+        """
+        from open_prices.prices import utils as price_utils
+
+        updated_count = self.prices.exclude(kind=self.kind).update(
+            kind=self.kind, updated=timezone.now()
+        )
+        if updated_count:
+            price_utils.invalidate_price_stats_cache()
+        return updated_count
+
     def set_missing_fields_from_prices(self):
         fields_to_update = list()
         if self.is_type_single_shop and self.prices.exists():
@@ -387,6 +484,7 @@ def proof_post_save_run_ocr(sender, instance, created, **kwargs):
             async_task(
                 "open_prices.proofs.ml.fetch_and_save_ocr_data",
                 f"{settings.IMAGES_DIR}/{instance.file_path}",
+                proof_id=instance.id,
             )
 
 
@@ -408,19 +506,21 @@ def proof_post_save_run_ml_models(sender, instance, created, **kwargs):
 @receiver(signals.post_save, sender=Proof)
 def proof_post_save_update_prices(sender, instance, created, **kwargs):
     if not created:
-        if instance.is_type_single_shop and instance.prices.exists():
-            from open_prices.prices.models import Price
-
-            for price in instance.prices.all():
-                for field in Price.DUPLICATE_PROOF_FIELDS:
-                    setattr(price, field, getattr(instance, field))
-                    price.save()
+        if instance.is_type_single_shop:
+            instance.update_prices_duplicate_fields()
+        instance.update_prices_kind()
 
 
 @receiver(signals.post_delete, sender=Proof)
 def proof_post_delete_remove_images(sender, instance, **kwargs):
     import os
 
+    # the image file is shared between duplicate uploads (same content hash)
+    if (
+        instance.file_path
+        and Proof.objects.filter(file_path=instance.file_path).exists()
+    ):
+        return
     if instance.file_path_full:
         if os.path.exists(instance.file_path_full):
             os.remove(instance.file_path_full)
@@ -429,6 +529,11 @@ def proof_post_delete_remove_images(sender, instance, **kwargs):
             os.remove(instance.image_thumb_path_full)
 
 
+@receiver(signals.post_delete, sender=Proof)
+def proof_post_delete_log_deletion(sender, instance, **kwargs):
+    DeletedObject.objects.create(table_name=Proof._meta.db_table, object_id=instance.id)
+
+
 class ProofPrediction(models.Model):
     """A machine learning prediction for a proof."""
 
@@ -492,6 +597,107 @@ def proof_prediction_post_create_increment_counts(sender, instance, created, **k
             )
 
 
+class ProofOcrResult(models.Model):
+    """The OCR (Google Cloud Vision) result of a proof image.
+
+    Stored in DB (next to the raw response, in a `.json.gz` file next to
+    the image), so that the proofs without OCR can be queried directly, and
+    the OCR text of many proofs can be loaded in a single query.
+    """
+
+    proof = models.OneToOneField(
+        Proof,
+        on_delete=models.CASCADE,
+        related_name="ocr_result",
+        verbose_name="The proof this OCR result belongs to",
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=proof_constants.OCR_STATUS_CHOICES,
+        verbose_name="The status of the OCR request",
+    )
+    text = models.TextField(
+        blank=True,
+        default="",
+        verbose_name="The full text detected in the image",
+    )
+    error = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="The Cloud Vision error, if any",
+    )
+    size = models.PositiveIntegerField(
+        default=0, verbose_name="The size of the raw response (in bytes)"
+    )
+
+    created = models.DateTimeField(
+        default=timezone.now, verbose_name="When the OCR was run"
+    )
+
+    class Meta:
+        db_table = "proof_ocr_results"
+        verbose_name = "Proof OCR result"
+        verbose_name_plural = "Proof OCR results"
+
+    def __str__(self):
+        return f"{self.proof} - {self.status}"
+
+
+class PredictionCache(models.Model):
+    """A cached model output, to avoid calling the models (Triton, Gemini)
+    again on the same image with the same model version."""
+
+    image_digest = models.CharField(
+        max_length=64,
+        help_text="The SHA-256 digest of the input image",
+    )
+    crop_box = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="The crop box of the input image (y_min,x_min,y_max,x_max). "
+        "Empty for the whole image.",
+    )
+    model_name = models.CharField(
+        max_length=100,
+        help_text="The name of the model",
+    )
+    model_version = models.CharField(
+        max_length=100,
+        help_text="The version of the model",
+    )
+    data = models.JSONField(
+        help_text="The model output",
+    )
+    hit_count = models.PositiveIntegerField(
+        default=0,
+        help_text="The number of times the cached output was reused",
+    )
+    created = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the output was cached",
+    )
+    last_hit = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the cached output was last reused",
+    )
+
+    class Meta:
+        db_table = "prediction_cache"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["image_digest", "crop_box", "model_name", "model_version"],
+                name="prediction_cache_unique_key",
+            )
+        ]
+        verbose_name = "Prediction Cache"
+        verbose_name_plural = "Prediction Cache"
+
+    def __str__(self):
+        return f"{self.image_digest} - {self.model_name} - {self.model_version}"
+
+
 class PriceTagQuerySet(models.QuerySet):
     def status_unknown(self):
         return self.filter(status=None)
@@ -1,4 +1,6 @@
+import base64
 import gzip
+import io
 import json
 import tempfile
 import unittest
@@ -7,15 +9,23 @@ from pathlib import Path
 
 import numpy as np
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from google.api_core import exceptions as google_exceptions
 from PIL import Image
 
 from open_prices.common import constants
+from open_prices.common import google as common_google
 from open_prices.locations import constants as location_constants
 from open_prices.locations.factories import LocationFactory
 from open_prices.prices import constants as price_constants
 from open_prices.prices.factories import PriceFactory
+from open_prices.prices.models import ExchangeRate, LatestPrice
+from open_prices.products.factories import ProductFactory
+from open_prices.products.models import Product
 from open_prices.proofs import constants as proof_constants
 from open_prices.proofs.factories import (
     PriceTagFactory,
@@ -23,6 +33,7 @@ from open_prices.proofs.factories import (
     ProofPredictionFactory,
     ReceiptItemFactory,
 )
+from open_prices.proofs.fake_triton import start_fake_triton_server
 from open_prices.proofs.ml import (
     PRICE_TAG_DETECTOR_MODEL_NAME,
     PRICE_TAG_DETECTOR_MODEL_VERSION,
@@ -31,16 +42,33 @@ from open_prices.proofs.ml import (
     ObjectDetectionRawResult,
     create_price_tags_from_proof_prediction,
     fetch_and_save_ocr_data,
+    fetch_and_save_proof_ocr_batch,
+    get_prediction_cache_stats,
+    load_ocr_texts,
+    reset_prediction_cache_stats,
     run_and_save_price_tag_detection,
+    run_and_save_price_tag_extraction,
     run_and_save_proof_prediction,
+    run_and_save_proof_predictions_batch,
     run_and_save_proof_type_prediction,
+    save_ocr_data,
+)
+from open_prices.proofs.models import (
+    PredictionCache,
+    PriceTag,
+    PriceTagPrediction,
+    Proof,
+    ProofPrediction,
+    ReceiptItem,
 )
-from open_prices.proofs.models import PriceTag, PriceTagPrediction, Proof
 from open_prices.proofs.utils import (
-    match_category_price_tag_with_category_price,
-    match_price_tag_with_price,
-    match_product_price_tag_with_product_price,
-    match_receipt_item_with_price,
+    PRICE_TAG_MATCH_SCORE_PRICE,
+    PRICE_TAG_MATCH_SCORE_PRODUCT,
+    compute_image_phash,
+    compute_price_tag_match_scores,
+    get_name_trigrams,
+    match_price_tags_with_prices,
+    match_receipt_items_with_prices,
     select_proof_image_dir,
 )
 
@@ -338,6 +366,17 @@ class ProofPropertyTest(TestCase):
         self.assertEqual(self.proof_price_tag.kind, constants.KIND_COMMUNITY)
         self.assertEqual(self.proof_receipt.kind, constants.KIND_CONSUMPTION)
 
+    def test_update_prices_kind(self):
+        self.assertEqual(
+            self.proof_receipt.prices.first().kind, constants.KIND_CONSUMPTION
+        )
+        self.proof_receipt.owner_consumption = False
+        self.proof_receipt.save()
+        self.assertEqual(self.proof_receipt.kind, constants.KIND_COMMUNITY)
+        self.assertEqual(
+            self.proof_receipt.prices.first().kind, constants.KIND_COMMUNITY
+        )
+
     def test_update_price_count(self):
         self.proof_price_tag.refresh_from_db()
         self.assertEqual(self.proof_price_tag.price_count, 2)  # price post_save
@@ -430,6 +469,16 @@ class ProofModelUpdateTest(TestCase):
         self.proof_price_tag.date = "2024-07-01"
         self.proof_price_tag.save()
         self.assertEqual(str(self.proof_price_tag.prices.first().date), "2024-07-01")
+
+    def test_proof_update_price_eur(self):
+        ExchangeRate.objects.create(currency="USD", date="2024-06-28", rate="1.25")
+        self.assertEqual(self.proof_price_tag.prices.first().price_eur, 1)
+        self.proof_price_tag.currency = "USD"
+        self.proof_price_tag.save()
+        self.assertEqual(self.proof_price_tag.prices.first().price_eur, Decimal("0.80"))
+        self.proof_price_tag.currency = "GBP"  # no rate
+        self.proof_price_tag.save()
+        self.assertIsNone(self.proof_price_tag.prices.first().price_eur)
         # location
         self.proof_price_tag.location_osm_id = self.location_osm_2.osm_id
         self.proof_price_tag.location_osm_type = self.location_osm_2.osm_type
@@ -440,6 +489,64 @@ class ProofModelUpdateTest(TestCase):
             self.proof_price_tag.prices.first().location, self.location_osm_2
         )
 
+    def test_proof_update_price_is_outlier(self):
+        self.proof_price_tag.prices.update(price_is_outlier=False)
+        # the date does not change the outlier groups
+        self.proof_price_tag.date = "2024-07-01"
+        self.proof_price_tag.save()
+        self.assertFalse(self.proof_price_tag.prices.first().price_is_outlier)
+        # the currency does: pending again
+        self.proof_price_tag.currency = "USD"
+        self.proof_price_tag.save()
+        self.assertIsNone(self.proof_price_tag.prices.first().price_is_outlier)
+
+    def test_proof_update_prices_in_bulk(self):
+        for index in range(20):
+            PriceFactory(
+                proof_id=self.proof_price_tag.id,
+                product_code=f"376000000{index:04d}",
+                location_osm_id=self.location_osm_1.osm_id,
+                location_osm_type=self.location_osm_1.osm_type,
+                price=1.0,
+                currency="EUR",
+                date="2024-06-30",
+            )
+        product = Product.objects.get(code="3760000000000")
+        self.location_osm_1.refresh_from_db()
+        self.assertEqual(self.location_osm_1.price_count, 21)
+        # the number of queries does not depend on the number of prices
+        self.proof_price_tag.location_osm_id = self.location_osm_2.osm_id
+        self.proof_price_tag.location_osm_type = self.location_osm_2.osm_type
+        self.proof_price_tag.currency = "USD"
+        with CaptureQueriesContext(connection) as context:
+            self.proof_price_tag.save()
+        self.assertLess(len(context.captured_queries), 30)
+        self.assertFalse(
+            self.proof_price_tag.prices.exclude(
+                location=self.location_osm_2, currency="USD"
+            ).exists()
+        )
+        # the latest prices follow the prices to their new location
+        self.assertFalse(
+            LatestPrice.objects.filter(location=self.location_osm_1).exists()
+        )
+        self.assertTrue(
+            LatestPrice.objects.filter(location=self.location_osm_2).exists()
+        )
+        # counts
+        self.location_osm_1.refresh_from_db()
+        self.location_osm_2.refresh_from_db()
+        self.assertEqual(self.location_osm_1.price_count, 0)
+        self.assertEqual(self.location_osm_1.product_count, 0)
+        self.assertEqual(self.location_osm_2.price_count, 21)
+        self.assertEqual(self.location_osm_2.product_count, 21)
+        product.refresh_from_db()
+        self.assertEqual(product.price_count, 1)
+        self.assertEqual(product.location_count, 1)
+        # nothing changed: no count update
+        with self.assertNumQueries(2):
+            self.assertEqual(self.proof_price_tag.update_prices_duplicate_fields(), 0)
+
 
 class RunOCRTaskTest(TestCase):
     def test_fetch_and_save_ocr_data_success(self):
@@ -472,6 +579,97 @@ class RunOCRTaskTest(TestCase):
                             actual_data["responses"], response_data["responses"]
                         )
 
+    def test_fetch_and_save_proof_ocr_batch(self):
+        response = unittest.mock.Mock(ok=True)
+        response.json.return_value = {
+            "responses": [
+                {
+                    "textAnnotations": [
+                        {
+                            "description": "test",
+                            "boundingPoly": {
+                                "vertices": [{"x": 10, "y": 5}, {"x": 20}]
+                            },
+                        }
+                    ]
+                },
+                {"error": {"code": 3, "message": "Bad image data."}},
+            ]
+        }
+        with self.settings(GOOGLE_CLOUD_VISION_API_KEY="test_api_key"):
+            with unittest.mock.patch(
+                "open_prices.proofs.ml.http_session.post", return_value=response
+            ) as mock_post:
+                with tempfile.TemporaryDirectory() as tmpdirname:
+                    image_paths = [Path(f"{tmpdirname}/{i}.jpg") for i in range(2)]
+                    for image_path in image_paths:
+                        Image.new("RGB", (400, 200), "white").save(image_path)
+                    proofs = [
+                        ProofFactory(file_path=image_path) for image_path in image_paths
+                    ]
+                    with self.assertLogs("open_prices.proofs.ml", level="ERROR"):
+                        output = fetch_and_save_proof_ocr_batch(
+                            proofs, features=["TEXT_DETECTION"], max_size=100
+                        )
+                    self.assertEqual(output, 2)
+                    self.assertFalse(image_paths[1].with_suffix(".json.gz").exists())
+                    with gzip.open(image_paths[0].with_suffix(".json.gz"), "rt") as f:
+                        ocr_data = json.load(f)
+        # the OCR results are stored in DB, errors included
+        self.assertEqual(
+            proofs[0].ocr_result.status, proof_constants.OCR_STATUS_SUCCESS
+        )
+        self.assertEqual(proofs[0].ocr_result.text, "test")
+        self.assertGreater(proofs[0].ocr_result.size, 0)
+        self.assertEqual(proofs[1].ocr_result.status, proof_constants.OCR_STATUS_ERROR)
+        self.assertEqual(proofs[1].ocr_result.error["message"], "Bad image data.")
+        self.assertEqual(
+            load_ocr_texts([proof.id for proof in proofs]), {proofs[0].id: "test"}
+        )
+        self.assertFalse(
+            Proof.objects.filter(id__in=[p.id for p in proofs])
+            .filter(ocr_result__isnull=True)
+            .exists()
+        )
+        # a single request, with downscaled images
+        mock_post.assert_called_once()
+        requests = mock_post.call_args.kwargs["json"]["requests"]
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(requests[0]["features"], [{"type": "TEXT_DETECTION"}])
+        image = Image.open(
+            io.BytesIO(base64.b64decode(requests[0]["image"]["content"]))
+        )
+        self.assertEqual(image.size, (100, 50))
+        # the coordinates are mapped back onto the original (400x200) image
+        self.assertEqual(
+            ocr_data["responses"][0]["textAnnotations"][0]["boundingPoly"]["vertices"],
+            [{"x": 40, "y": 20}, {"x": 80}],
+        )
+
+    def test_fetch_and_save_ocr_data_duplicate_proof(self):
+        data = {"responses": [{"textAnnotations": [{"description": "test"}]}]}
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            source_image_path = Path(f"{tmpdirname}/source.jpg")
+            image_path = Path(f"{tmpdirname}/duplicate.jpg")
+            source_proof = ProofFactory(
+                file_path=source_image_path, image_sha256="a" * 64
+            )
+            save_ocr_data(source_image_path, data, proof_id=source_proof.id)
+            proof = ProofFactory(file_path=image_path, image_sha256="a" * 64)
+            with self.settings(GOOGLE_CLOUD_VISION_API_KEY="test_api_key"):
+                with unittest.mock.patch(
+                    "open_prices.proofs.ml.run_ocr_on_image"
+                ) as mock_run_ocr_on_image:
+                    output = fetch_and_save_ocr_data(image_path, proof_id=proof.id)
+            # the OCR file is copied next to the duplicate image
+            with gzip.open(image_path.with_suffix(".json.gz"), "rt") as f:
+                self.assertEqual(json.load(f), data)
+        self.assertTrue(output)
+        mock_run_ocr_on_image.assert_not_called()
+        self.assertEqual(proof.ocr_result.size, len(json.dumps(data).encode("utf-8")))
+        self.assertEqual(proof.ocr_result.text, "test")
+        self.assertEqual(proof.ocr_result.status, proof_constants.OCR_STATUS_SUCCESS)
+
     def test_fetch_and_save_ocr_data_invalid_extension(self):
         with self.settings(GOOGLE_CLOUD_VISION_API_KEY="test_api_key"):
             with tempfile.TemporaryDirectory() as tmpdirname:
@@ -726,6 +924,269 @@ class MLModelTest(TestCase):
         self.assertEqual(price_tags[0].bounding_box, [0.5, 0.5, 1.0, 1.0])
         self.assertEqual(price_tags[1].bounding_box, [0.1, 0.1, 0.2, 0.2])
 
+    def test_run_and_save_proof_predictions_batch(self):
+        server, servicer, triton_uri = start_fake_triton_server()
+        self.addCleanup(server.stop, None)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            NEW_IMAGE_DIR = Path(tmpdirname)
+            with self.settings(IMAGE_DIR=NEW_IMAGE_DIR):
+                proofs = []
+                for i, proof_type in enumerate(
+                    [
+                        proof_constants.TYPE_PRICE_TAG,
+                        proof_constants.TYPE_RECEIPT,
+                        proof_constants.TYPE_PRICE_TAG,
+                    ]
+                ):
+                    file_path = NEW_IMAGE_DIR / f"{i}.jpg"
+                    # distinct images, not served from the prediction cache
+                    Image.new("RGB", (100, 100), (i * 100,) * 3).save(file_path)
+                    proofs.append(ProofFactory(file_path=file_path, type=proof_type))
+                processed = run_and_save_proof_predictions_batch(
+                    proofs,
+                    run_price_tag_extraction=False,
+                    run_receipt_extraction=False,
+                    triton_uri=triton_uri,
+                )
+        self.assertEqual(processed, 3)
+        # 1 request per model, for the whole batch
+        self.assertEqual(servicer.request_count, 2)
+        self.assertEqual(servicer.image_count, 3 + 2)
+        for proof in proofs:
+            proof_type_prediction = proof.predictions.get(
+                model_name=PROOF_CLASSIFICATION_MODEL_NAME
+            )
+            self.assertEqual(proof_type_prediction.value, "OTHER")
+            self.assertAlmostEqual(proof_type_prediction.max_confidence, 0.9, 5)
+        for proof in [proofs[0], proofs[2]]:
+            price_tags = PriceTag.objects.filter(proof=proof)
+            self.assertEqual(price_tags.count(), 1)
+            np.testing.assert_allclose(
+                price_tags.first().bounding_box, [0.0, 0.0, 0.5, 0.5], atol=1e-6
+            )
+        self.assertFalse(PriceTag.objects.filter(proof=proofs[1]).exists())
+        # existing predictions are not computed again
+        run_and_save_proof_predictions_batch(proofs, triton_uri=triton_uri)
+        self.assertEqual(servicer.request_count, 2)
+
+    def test_run_and_save_proof_predictions_batch_prediction_cache(self):
+        server, servicer, triton_uri = start_fake_triton_server()
+        self.addCleanup(server.stop, None)
+        reset_prediction_cache_stats()
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            file_path = Path(tmpdirname) / "1.jpg"
+            self.image.save(file_path)
+            # same image (and digest): computed once
+            proofs = [
+                ProofFactory(
+                    file_path=file_path,
+                    type=proof_constants.TYPE_PRICE_TAG,
+                    image_sha256=image_sha256,
+                )
+                for image_sha256 in ["a" * 64, "a" * 64, "b" * 64]
+            ]
+            kwargs = {
+                "run_price_tag_extraction": False,
+                "run_receipt_extraction": False,
+                "triton_uri": triton_uri,
+            }
+            run_and_save_proof_predictions_batch(proofs, **kwargs)
+            self.assertEqual(servicer.request_count, 2)
+            self.assertEqual(servicer.image_count, 2 + 2)
+            # predictions re-computed (same model version): cache hits
+            ProofPrediction.objects.all().delete()
+            PriceTag.objects.all().delete()
+            run_and_save_proof_predictions_batch(proofs, **kwargs)
+            self.assertEqual(servicer.request_count, 2)
+        for proof in proofs:
+            self.assertEqual(proof.predictions.count(), 2)
+            self.assertEqual(PriceTag.objects.filter(proof=proof).count(), 1)
+        self.assertEqual(
+            PredictionCache.objects.get(
+                image_digest="a" * 64, model_name=PROOF_CLASSIFICATION_MODEL_NAME
+            ).hit_count,
+            1,
+        )
+        stats = get_prediction_cache_stats()
+        self.assertEqual(
+            stats[PROOF_CLASSIFICATION_MODEL_NAME],
+            {"hits": 3, "misses": 3, "hit_rate": 0.5},
+        )
+        self.assertEqual(stats[PRICE_TAG_DETECTOR_MODEL_NAME]["hits"], 3)
+
+    def test_run_and_save_proof_prediction_duplicate_proof(self):
+        source_proof = ProofFactory(
+            type=proof_constants.TYPE_PRICE_TAG, image_sha256="a" * 64
+        )
+        ProofPredictionFactory(proof=source_proof)
+        source_detection = ProofPredictionFactory(
+            proof=source_proof,
+            type=proof_constants.PROOF_PREDICTION_OBJECT_DETECTION_TYPE,
+            model_name=PRICE_TAG_DETECTOR_MODEL_NAME,
+            model_version=PRICE_TAG_DETECTOR_MODEL_VERSION,
+            data={"objects": []},
+        )
+        price_tag = PriceTagFactory(
+            proof=source_proof,
+            proof_prediction=source_detection,
+            bounding_box=[0.1, 0.1, 0.2, 0.2],
+            status=proof_constants.PriceTagStatus.deleted.value,
+        )
+        PriceTagPrediction.objects.create(
+            price_tag=price_tag,
+            type=proof_constants.PRICE_TAG_EXTRACTION_TYPE,
+            model_name="gemini",
+            model_version="gemini-1.0",
+            data={"price": 1.5},
+        )
+        # extraction still running on the source: run on the copy
+        PriceTagFactory(
+            proof=source_proof,
+            proof_prediction=source_detection,
+            bounding_box=[0.5, 0.5, 1.0, 1.0],
+        )
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            file_path = Path(tmpdirname) / "duplicate.jpg"
+            self.image.save(file_path)
+            proof = ProofFactory(
+                file_path=file_path,
+                type=proof_constants.TYPE_PRICE_TAG,
+                image_sha256="a" * 64,
+            )
+            with (
+                unittest.mock.patch(
+                    "open_prices.proofs.ml.predict_proof_type"
+                ) as mock_predict_proof_type,
+                unittest.mock.patch(
+                    "open_prices.proofs.ml.detect_price_tags"
+                ) as mock_detect_price_tags,
+                unittest.mock.patch(
+                    "open_prices.proofs.ml.extract_from_price_tag",
+                    return_value={"price": 2},
+                ) as mock_extract_from_price_tag,
+            ):
+                run_and_save_proof_prediction(proof)
+            mock_predict_proof_type.assert_not_called()
+            mock_detect_price_tags.assert_not_called()
+            mock_extract_from_price_tag.assert_called_once()
+        # the ML results are copied, without the user validation
+        proof.refresh_from_db()
+        self.assertEqual(proof.prediction_count, 2)
+        copied_price_tags = PriceTag.objects.filter(proof=proof).order_by("id")
+        self.assertEqual(copied_price_tags[0].bounding_box, [0.1, 0.1, 0.2, 0.2])
+        self.assertIsNone(copied_price_tags[0].status)
+        self.assertEqual(
+            copied_price_tags[0].proof_prediction_id,
+            proof.predictions.get(model_name=PRICE_TAG_DETECTOR_MODEL_NAME).id,
+        )
+        self.assertEqual(copied_price_tags[0].prediction_count, 1)
+        self.assertEqual(copied_price_tags[0].predictions.get().data, {"price": 1.5})
+        self.assertEqual(copied_price_tags[1].predictions.get().data, {"price": 2})
+
+    def test_run_and_save_proof_prediction_duplicate_proof_other_type(self):
+        source_proof = ProofFactory(
+            type=proof_constants.TYPE_PRICE_TAG, image_sha256="a" * 64
+        )
+        ProofPredictionFactory(proof=source_proof)
+        PriceTagFactory(
+            proof=source_proof,
+            proof_prediction=ProofPredictionFactory(
+                proof=source_proof,
+                type=proof_constants.PROOF_PREDICTION_OBJECT_DETECTION_TYPE,
+                model_name=PRICE_TAG_DETECTOR_MODEL_NAME,
+            ),
+        )
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            file_path = Path(tmpdirname) / "duplicate.jpg"
+            self.image.save(file_path)
+            # a receipt: only the classification applies, the receipt
+            # extraction is run
+            proof = ProofFactory(
+                file_path=file_path,
+                type=proof_constants.TYPE_RECEIPT,
+                image_sha256="a" * 64,
+            )
+            with (
+                unittest.mock.patch(
+                    "open_prices.proofs.ml.predict_proof_type"
+                ) as mock_predict_proof_type,
+                unittest.mock.patch(
+                    "open_prices.proofs.ml.extract_from_receipt",
+                    return_value={"items": [{"product_name": "MILK", "price": 1}]},
+                ) as mock_extract_from_receipt,
+            ):
+                run_and_save_proof_prediction(proof)
+            mock_predict_proof_type.assert_not_called()
+            mock_extract_from_receipt.assert_called_once()
+        self.assertEqual(
+            sorted(proof.predictions.values_list("model_name", flat=True)),
+            [common_google.GEMINI_MODEL_NAME, PROOF_CLASSIFICATION_MODEL_NAME],
+        )
+        self.assertFalse(PriceTag.objects.filter(proof=proof).exists())
+        self.assertEqual(ReceiptItem.objects.filter(proof=proof).count(), 1)
+
+    def test_run_and_save_price_tag_extraction(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            NEW_IMAGE_DIR = Path(tmpdirname)
+            file_path = NEW_IMAGE_DIR / "1.jpg"
+            self.image.save(file_path)
+            with self.settings(IMAGE_DIR=NEW_IMAGE_DIR):
+                proof = ProofFactory(
+                    file_path=file_path, type=proof_constants.TYPE_PRICE_TAG
+                )
+                price_tags = [
+                    PriceTagFactory(proof=proof, bounding_box=[0.1, 0.1, 0.2, 0.2]),
+                    PriceTagFactory(proof=proof, bounding_box=[0.5, 0.5, 1.0, 1.0]),
+                    PriceTagFactory(proof=proof, bounding_box=[0.3, 0.3, 0.5, 0.5]),
+                ]
+                # 1st tag (10x10): rate-limited once, 3rd tag (20x20): fails
+                rate_limit_errors = [google_exceptions.ResourceExhausted("429")]
+
+                def extract(image):
+                    if image.size == (10, 10):
+                        if rate_limit_errors:
+                            raise rate_limit_errors.pop()
+                        return {"p": 1}
+                    if image.size == (50, 50):
+                        return {"p": 2}
+                    raise ValueError("Invalid JSON")
+
+                with (
+                    unittest.mock.patch(
+                        "open_prices.proofs.ml.extract_from_price_tag",
+                        side_effect=extract,
+                    ) as mock_extract_from_price_tag,
+                    unittest.mock.patch("open_prices.proofs.ml.time.sleep"),
+                    unittest.mock.patch(
+                        "PIL.Image.open", wraps=Image.open
+                    ) as mock_open,
+                ):
+                    predictions = run_and_save_price_tag_extraction(
+                        price_tags, proof, max_workers=2
+                    )
+                    self.assertEqual(mock_open.call_count, 1)
+                    self.assertEqual(mock_extract_from_price_tag.call_count, 4)
+
+        self.assertEqual(
+            [prediction.price_tag for prediction in predictions], price_tags[:2]
+        )
+        self.assertEqual(
+            [prediction.data for prediction in predictions], [{"p": 1}, {"p": 2}]
+        )
+        self.assertEqual(PriceTagPrediction.objects.count(), 2)
+        for price_tag, prediction_count in zip(price_tags, [1, 1, 0]):
+            price_tag.refresh_from_db()
+            self.assertEqual(price_tag.prediction_count, prediction_count)
+        # the successful extractions are cached (by crop box)
+        self.assertEqual(
+            sorted(
+                PredictionCache.objects.filter(
+                    model_name=common_google.GEMINI_MODEL_NAME
+                ).values_list("crop_box", flat=True)
+            ),
+            ["0.1000,0.1000,0.2000,0.2000", "0.5000,0.5000,1.0000,1.0000"],
+        )
+
     def create_price_tags_from_proof_prediction(self):
         proof = ProofFactory(type=proof_constants.TYPE_PRICE_TAG)
         proof_prediction = ProofPredictionFactory(
@@ -774,6 +1235,107 @@ class MLModelTest(TestCase):
         self.assertEqual(price_tag_1.model_version, PRICE_TAG_DETECTOR_MODEL_VERSION)
 
 
+class RunMLModelsCommandTest(TestCase):
+    def test_price_tag_extraction_job(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            NEW_IMAGE_DIR = Path(tmpdirname)
+            file_path = NEW_IMAGE_DIR / "1.jpg"
+            Image.new("RGB", (100, 100), "white").save(file_path)
+            checkpoint_path = NEW_IMAGE_DIR / "checkpoint.json"
+            with self.settings(IMAGE_DIR=NEW_IMAGE_DIR):
+                proof = ProofFactory(
+                    file_path=file_path, type=proof_constants.TYPE_PRICE_TAG
+                )
+                price_tag_done = PriceTagFactory(proof=proof)
+                PriceTagPrediction.objects.create(
+                    price_tag=price_tag_done,
+                    type=proof_constants.PRICE_TAG_EXTRACTION_TYPE,
+                    model_name="gemini",
+                    model_version="gemini-1.5-flash",
+                )
+                price_tag_pending = PriceTagFactory(proof=proof)
+                # proof without image file: its price tag will fail (retried,
+                # then skipped)
+                price_tag_missing_file = PriceTagFactory(
+                    proof=ProofFactory(
+                        file_path="missing.jpg", type=proof_constants.TYPE_PRICE_TAG
+                    )
+                )
+                with unittest.mock.patch(
+                    "open_prices.proofs.ml.extract_from_price_tag",
+                    return_value={"price": 1},
+                ) as mock_extract_from_price_tag:
+                    for _ in range(3):
+                        call_command(
+                            "run_ml_models",
+                            types="price_tag_extraction",
+                            checkpoint=checkpoint_path,
+                            max_attempts=2,
+                            stdout=io.StringIO(),
+                        )
+                    # the next runs only retry the failed price tag
+                    mock_extract_from_price_tag.assert_called_once()
+                checkpoint = json.loads(checkpoint_path.read_text())
+        self.assertEqual(price_tag_pending.predictions.count(), 1)
+        # retried once, then skipped by the 3rd run
+        self.assertEqual(
+            checkpoint["price_tag_extraction"]["failed_attempts"],
+            {str(price_tag_missing_file.id): 2},
+        )
+
+    def test_price_tag_extraction_job_transient_error(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            NEW_IMAGE_DIR = Path(tmpdirname)
+            file_path = NEW_IMAGE_DIR / "1.jpg"
+            Image.new("RGB", (100, 100), "white").save(file_path)
+            checkpoint_path = NEW_IMAGE_DIR / "checkpoint.json"
+            with self.settings(IMAGE_DIR=NEW_IMAGE_DIR):
+                price_tag = PriceTagFactory(
+                    proof=ProofFactory(
+                        file_path=file_path, type=proof_constants.TYPE_PRICE_TAG
+                    )
+                )
+                with unittest.mock.patch(
+                    "open_prices.proofs.ml.extract_from_price_tag",
+                    side_effect=[ConnectionError("timeout"), {"price": 1}],
+                ):
+                    for _ in range(2):
+                        call_command(
+                            "run_ml_models",
+                            types="price_tag_extraction",
+                            checkpoint=checkpoint_path,
+                            stdout=io.StringIO(),
+                        )
+                checkpoint = json.loads(checkpoint_path.read_text())
+        # the failed price tag was retried, and removed from the checkpoint
+        self.assertEqual(price_tag.predictions.count(), 1)
+        self.assertEqual(checkpoint["price_tag_extraction"]["failed_attempts"], {})
+
+
+class ComputeImagePhashTest(TestCase):
+    def test_compute_image_phash(self):
+        def image_content(image, format="PNG"):
+            fp = io.BytesIO()
+            image.save(fp, format=format)
+            return fp.getvalue()
+
+        gradient = np.tile(np.arange(0, 256, 2, dtype=np.uint8), (128, 1))
+        image = Image.fromarray(gradient).convert("RGB")
+        phash = compute_image_phash(image_content(image))
+        self.assertEqual(len(phash), 16)
+        # resized & re-encoded: same perceptual hash
+        self.assertEqual(
+            compute_image_phash(image_content(image.resize((64, 64)), "JPEG")),
+            phash,
+        )
+        # mirrored: different perceptual hash
+        self.assertNotEqual(
+            compute_image_phash(image_content(image.transpose(Image.FLIP_LEFT_RIGHT))),
+            phash,
+        )
+        self.assertIsNone(compute_image_phash(b"not an image"))
+
+
 class TestSelectProofImageDir(TestCase):
     def test_select_proof_image_dir_no_dir(self):
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -923,85 +1485,131 @@ class PriceTagMatchingUtilsTest(TestCase):
             location=cls.proof.location,
         )
 
-    def test_match_product_price_tag_with_product_price(self):
-        self.assertTrue(
-            match_product_price_tag_with_product_price(
-                self.price_tag_product, self.price_product
-            )
-        )
-        self.assertFalse(
-            match_product_price_tag_with_product_price(
-                self.price_tag_product, self.price_category
-            )
-        )
-        self.assertFalse(
-            match_product_price_tag_with_product_price(
-                self.price_tag_category, self.price_category
-            )
-        )
-        self.assertFalse(
-            match_product_price_tag_with_product_price(
-                self.price_tag_category, self.price_product
-            )
-        )
-
-    def test_match_category_price_tag_with_category_price(self):
-        self.assertFalse(
-            match_category_price_tag_with_category_price(
-                self.price_tag_product, self.price_product
-            )
-        )
-        self.assertFalse(
-            match_category_price_tag_with_category_price(
-                self.price_tag_product, self.price_category
-            )
-        )
-        self.assertTrue(
-            match_category_price_tag_with_category_price(
-                self.price_tag_category, self.price_category
-            )
-        )
-        self.assertFalse(
-            match_category_price_tag_with_category_price(
-                self.price_tag_category, self.price_product
-            )
-        )
-
-    def test_match_price_tag_with_price(self):
-        self.assertTrue(
-            match_price_tag_with_price(self.price_tag_product, self.price_product)
-        )
-        self.assertFalse(
-            match_price_tag_with_price(self.price_tag_product, self.price_category)
-        )
-        self.assertTrue(
-            match_price_tag_with_price(self.price_tag_category, self.price_category)
+    def test_compute_price_tag_match_scores(self):
+        prices = [
+            {
+                "type": price_constants.TYPE_PRODUCT,
+                "price": Decimal("1.5"),
+                "product_code": "0123456789100",
+                "category_tag": None,
+            },
+            {
+                "type": price_constants.TYPE_CATEGORY,
+                "price": Decimal("2.5"),
+                "product_code": None,
+                "category_tag": "en:tomatoes",
+            },
+            {
+                "type": price_constants.TYPE_PRODUCT,
+                "price": Decimal("3"),
+                "product_code": "0123456789101",
+                "category_tag": None,
+            },
+        ]
+        price_tags_data = [
+            # product: match on barcode & price
+            {"price": 1.5, "barcode": "214626/0123456789100/051", "product": "other"},
+            # category: match on category & price
+            {"price": 2.5, "barcode": "", "product": "en:tomatoes"},
+            # no barcode: match only on price (unique in the proof)
+            {"price": 3, "barcode": "", "product": "other"},
+            # no extraction
+            None,
+        ]
+        scores = compute_price_tag_match_scores(price_tags_data, prices)
+        self.assertEqual(
+            scores.tolist(),
+            [
+                [PRICE_TAG_MATCH_SCORE_PRODUCT, 0, 0],
+                [0, PRICE_TAG_MATCH_SCORE_PRODUCT, 0],
+                [0, 0, PRICE_TAG_MATCH_SCORE_PRICE],
+                [0, 0, 0],
+            ],
+        )
+        # the same price twice in the proof: no match only on price
+        scores = compute_price_tag_match_scores(
+            price_tags_data + [{"price": 3, "barcode": "", "product": "other"}],
+            prices,
+        )
+        self.assertEqual(scores[2].tolist(), [0, 0, 0])
+
+    def test_match_price_tags_with_prices(self):
+        # same price as price_tag_product: only the barcode tells them apart
+        price_tag_product_2 = PriceTagFactory(
+            bounding_box=[0.3, 0.3, 0.4, 0.4], proof=self.proof
         )
-        self.assertFalse(
-            match_price_tag_with_price(self.price_tag_category, self.price_product)
+        PriceTagPrediction.objects.create(
+            price_tag=price_tag_product_2,
+            type=proof_constants.PRICE_TAG_EXTRACTION_TYPE,
+            data={"price": 1.5, "barcode": "0123456789101", "product": "other"},
         )
-        # add extra prices with the same price
-        PriceFactory(
+        price_product_2 = PriceFactory(
             type=price_constants.TYPE_PRODUCT,
             product_code="0123456789101",
             price=1.5,
             proof=self.proof,
             location=self.proof.location,
         )
-        self.assertFalse(
-            match_price_tag_with_price(self.price_tag_product, self.price_product)
+        # already reviewed: not matched
+        price_tag_deleted = PriceTagFactory(
+            bounding_box=[0.4, 0.4, 0.5, 0.5],
+            proof=self.proof,
+            status=proof_constants.PriceTagStatus.deleted.value,
+        )
+        PriceTagPrediction.objects.create(
+            price_tag=price_tag_deleted,
+            type=proof_constants.PRICE_TAG_EXTRACTION_TYPE,
+            data={"price": 9, "barcode": "", "product": "other"},
         )
         PriceFactory(
-            type=price_constants.TYPE_CATEGORY,
-            category_tag="en:apples",
-            price=2.5,
-            price_per=price_constants.PRICE_PER_KILOGRAM,
+            type=price_constants.TYPE_PRODUCT,
+            product_code="0123456789102",
+            price=9,
             proof=self.proof,
             location=self.proof.location,
         )
-        self.assertFalse(
-            match_price_tag_with_price(self.price_tag_category, self.price_category)
-        )
+        with self.assertNumQueries(4):  # 3 loads + 1 bulk_update
+            matched_price_tags = match_price_tags_with_prices([self.proof.id])
+        self.assertEqual(len(matched_price_tags), 3)
+        for price_tag, price in [
+            (self.price_tag_product, self.price_product),
+            (self.price_tag_category, self.price_category),
+            (price_tag_product_2, price_product_2),
+        ]:
+            price_tag.refresh_from_db()
+            self.assertEqual(price_tag.price_id, price.id)
+            self.assertEqual(
+                price_tag.status, proof_constants.PriceTagStatus.linked_to_price
+            )
+        price_tag_deleted.refresh_from_db()
+        self.assertIsNone(price_tag_deleted.price_id)
+        # already matched: nothing to do
+        self.assertEqual(match_price_tags_with_prices([self.proof.id]), [])
+        # linked to a price (without status): not matched again
+        PriceTag.objects.filter(id=self.price_tag_product.id).update(status=None)
+        self.assertEqual(match_price_tags_with_prices([self.proof.id]), [])
+
+    def test_match_price_tags_with_existing_prices_command(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            checkpoint_path = Path(tmpdirname) / "checkpoint.json"
+            with unittest.mock.patch("builtins.print"):
+                call_command(
+                    "match_price_tags_with_existing_prices",
+                    checkpoint=checkpoint_path,
+                    stdout=io.StringIO(),
+                )
+                self.assertEqual(
+                    PriceTag.objects.filter(price__isnull=False).count(), 2
+                )
+                self.assertTrue(checkpoint_path.exists())
+                # the next run only processes the proofs changed since then
+                stdout = io.StringIO()
+                call_command(
+                    "match_price_tags_with_existing_prices",
+                    checkpoint=checkpoint_path,
+                    stdout=stdout,
+                )
+        self.assertIn("0 price tags matched", stdout.getvalue())
 
 
 class ReceiptItemMatchingUtilsTest(TestCase):
@@ -1020,14 +1628,101 @@ class ReceiptItemMatchingUtilsTest(TestCase):
             location=cls.proof.location,
         )
 
-    def test_match_receipt_item_with_price(self):
-        self.assertTrue(match_receipt_item_with_price(self.receipt_item, self.price))
-        # add an extra price with the same price
-        PriceFactory(
+    def test_get_name_trigrams(self):
+        self.assertEqual(get_name_trigrams("Pain"), {"  p", " pa", "pai", "ain", "in "})
+        self.assertEqual(get_name_trigrams("a-B"), {"  a", " a ", "  b", " b "})
+        self.assertEqual(get_name_trigrams(""), set())
+
+    def test_match_receipt_items_with_prices(self):
+        # 2 items with the same price: matched on the product name (the
+        # prices were not added in the receipt order)
+        receipt_item_milk = ReceiptItemFactory(
+            predicted_data={"product_name": "LAIT DEMI ECREME 1L", "price": 1.0},
+            order=2,
+            proof=self.proof,
+        )
+        receipt_item_butter = ReceiptItemFactory(
+            predicted_data={"product_name": "BEURRE DOUX 250G", "price": 1.0},
+            order=3,
+            proof=self.proof,
+        )
+        ProductFactory(code="3760000000001", product_name="Beurre doux")
+        ProductFactory(code="3760000000002", product_name="Lait demi-ecreme")
+        price_butter = PriceFactory(
             type=price_constants.TYPE_PRODUCT,
-            product_code="0123456789101",
-            price=3.5,
+            product_code="3760000000001",
+            price=1.0,
             proof=self.proof,
             location=self.proof.location,
         )
-        self.assertFalse(match_receipt_item_with_price(self.receipt_item, self.price))
+        price_milk = PriceFactory(
+            type=price_constants.TYPE_PRODUCT,
+            product_code="3760000000002",
+            price=1.0,
+            proof=self.proof,
+            location=self.proof.location,
+        )
+        # same price, unrelated name: not matched
+        receipt_item_other = ReceiptItemFactory(
+            predicted_data={"product_name": "SACHET", "price": 1.0},
+            order=4,
+            proof=self.proof,
+        )
+        with self.assertNumQueries(3):  # 2 loads + 1 bulk_update
+            matched_receipt_items = match_receipt_items_with_prices([self.proof.id])
+        self.assertEqual(len(matched_receipt_items), 3)
+        for receipt_item, price in [
+            (self.receipt_item, self.price),  # unique price
+            (receipt_item_milk, price_milk),
+            (receipt_item_butter, price_butter),
+        ]:
+            receipt_item.refresh_from_db()
+            self.assertEqual(receipt_item.price_id, price.id)
+            self.assertEqual(
+                receipt_item.status,
+                # status is a CharField
+                str(proof_constants.ReceiptItemStatus.linked_to_price.value),
+            )
+        receipt_item_other.refresh_from_db()
+        self.assertIsNone(receipt_item_other.price_id)
+        # already matched: nothing to do
+        self.assertEqual(match_receipt_items_with_prices([self.proof.id]), [])
+
+    def test_match_receipt_items_with_prices_linked_prices(self):
+        # a price with a price tag (proof type changed since) can be matched
+        # (bulk_create: no type validation)
+        PriceTag.objects.bulk_create(
+            [PriceTag(proof=self.proof, price=self.price, bounding_box=[0, 0, 1, 1])]
+        )
+        self.assertEqual(
+            match_receipt_items_with_prices([self.proof.id]), [self.receipt_item]
+        )
+        # a price already linked to a receipt item is not matched again
+        ReceiptItem.objects.filter(id=self.receipt_item.id).update(status=None)
+        receipt_item_2 = ReceiptItemFactory(
+            predicted_data={"product_name": "NOCCIOLATA BIANCA 250G", "price": 3.5},
+            proof=self.proof,
+        )
+        self.assertEqual(match_receipt_items_with_prices([self.proof.id]), [])
+        receipt_item_2.refresh_from_db()
+        self.assertIsNone(receipt_item_2.price_id)
+
+    def test_match_receipt_items_with_existing_prices_command(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            checkpoint_path = Path(tmpdirname) / "checkpoint.json"
+            with unittest.mock.patch("builtins.print"):
+                call_command(
+                    "match_receipt_items_with_existing_prices",
+                    checkpoint=checkpoint_path,
+                    stdout=io.StringIO(),
+                )
+                self.receipt_item.refresh_from_db()
+                self.assertEqual(self.receipt_item.price_id, self.price.id)
+                # the next run only processes the proofs changed since then
+                stdout = io.StringIO()
+                call_command(
+                    "match_receipt_items_with_existing_prices",
+                    checkpoint=checkpoint_path,
+                    stdout=stdout,
+                )
+        self.assertIn("0 receipt items matched", stdout.getvalue())
@@ -1,20 +1,36 @@
+import collections
+import hashlib
+import io
 import logging
 import random
+import re
 import string
 from mimetypes import guess_extension
 from pathlib import Path
 
+import numpy as np
 from django.conf import settings
 from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.utils import timezone
 from PIL import Image, ImageOps
 
 from open_prices.common import utils
 from open_prices.prices import constants as price_constants
 from open_prices.prices.models import Price
-from open_prices.proofs.models import PriceTag, ReceiptItem
+from open_prices.proofs import constants as proof_constants
+from open_prices.proofs.models import PriceTag, PriceTagPrediction, Proof, ReceiptItem
 
 logger = logging.getLogger(__name__)
 
+# price tag matching scores: barcode (or category) & price > price only
+PRICE_TAG_MATCH_SCORE_PRODUCT = 3
+PRICE_TAG_MATCH_SCORE_PRICE = 1
+# receipt item matching scores: price, then name similarity & order
+RECEIPT_ITEM_MATCH_SCORE_PRICE = 1
+RECEIPT_ITEM_MATCH_SCORE_NAME = 2
+RECEIPT_ITEM_MATCH_SCORE_ORDER = 0.5
+RECEIPT_ITEM_MATCH_MIN_NAME_SIMILARITY = 0.3
+
 
 def get_file_extension_and_mimetype(
     file: InMemoryUploadedFile | TemporaryUploadedFile,
@@ -92,20 +108,82 @@ def generate_thumbnail(
     return image_thumb_path
 
 
+def compute_file_sha256(content: bytes) -> str:
+    """Compute the SHA-256 hex digest of the file content."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def compute_image_phash(content: bytes, hash_size: int = 8) -> str | None:
+    """Compute the perceptual hash (dHash) of the image content.
+
+    The image is converted to grayscale and resized to (hash_size + 1,
+    hash_size): each bit tells if a pixel is brighter than its right
+    neighbour. Near-duplicate images (re-encoded, resized...) have close
+    hashes.
+
+    :param content: the image content
+    :param hash_size: the hash size, defaults to 8 (64-bit hash)
+    :return: the hash as a hex string, or None if the file is not an image
+    """
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            img = ImageOps.exif_transpose(img)
+            pixels = np.asarray(
+                img.convert("L").resize(
+                    (hash_size + 1, hash_size), Image.Resampling.LANCZOS
+                ),
+                dtype=np.int16,
+            )
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return np.packbits(bits).tobytes().hex()
+
+
+def find_duplicate_proof_file(image_sha256: str) -> Proof | None:
+    """Find an existing proof with the same file content (SHA-256), whose
+    file is still on disk.
+
+    :return: the duplicate proof, or None
+    """
+    for proof in Proof.objects.filter(
+        image_sha256=image_sha256, file_path__isnull=False
+    ).order_by("id"):
+        if Path(proof.file_path_full).exists():
+            return proof
+    return None
+
+
 def store_file(
     file: InMemoryUploadedFile | TemporaryUploadedFile,
-) -> tuple[str, str, str | None]:
+) -> tuple[str, str, str | None, str, str | None]:
     """
     Create a file in the images directory with a random name and the
     correct extension.
 
+    If a file with the same content (SHA-256) was already uploaded, the
+    existing file (and thumbnail) is reused instead of being stored again.
+
     :param file: the file to save
-    :return: the file path, the mimetype and the thumbnail path
+    :return: the file path, the mimetype, the thumbnail path, the SHA-256
+        and the perceptual hash of the file
     """
+    content = file.file.read()
+    image_sha256 = compute_file_sha256(content)
+    extension, mimetype = get_file_extension_and_mimetype(file)
+    image_phash = compute_image_phash(content) if mimetype.startswith("image") else None
+    duplicate_proof = find_duplicate_proof_file(image_sha256)
+    if duplicate_proof is not None:
+        return (
+            duplicate_proof.file_path,
+            duplicate_proof.mimetype,
+            duplicate_proof.image_thumb_path,
+            image_sha256,
+            image_phash,
+        )
     # Generate a random name for the file
     # This name will be used to display the image to the client, so it shouldn't be discoverable  # noqa
     file_stem = "".join(random.choices(string.ascii_letters + string.digits, k=10))
-    extension, mimetype = get_file_extension_and_mimetype(file)
     # We store the images in directories containing up to 1000 images
     # Once we reach 1000 images, we create a new directory by increasing the directory ID  # noqa
     # This is used to prevent the base image directory from containing too many files  # noqa
@@ -114,14 +192,14 @@ def store_file(
     file_full_path = generate_full_path(current_dir, file_stem, extension)
     # write the content of the file to the new file
     with file_full_path.open("wb") as f:
-        f.write(file.file.read())
+        f.write(content)
     # create a thumbnail
     image_thumb_path = generate_thumbnail(
         current_dir, current_dir.name, file_stem, extension, mimetype
     )
     # Build file_path
     file_path = generate_relative_path(current_dir.name, file_stem, extension)
-    return (file_path, mimetype, image_thumb_path)
+    return (file_path, mimetype, image_thumb_path, image_sha256, image_phash)
 
 
 def select_proof_image_dir(images_dir: Path, max_images_per_dir: int = 1_000) -> Path:
@@ -155,82 +233,321 @@ def cleanup_price_tag_prediction_barcode(barcode: str) -> str:
     return barcode
 
 
-def match_product_price_tag_with_product_price(
-    price_tag: PriceTag, price: Price
-) -> bool:
+def get_predicted_price(value) -> float:
+    """Get the predicted price as a float (NaN if missing or invalid)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+def compute_price_tag_match_scores(
+    price_tags_data: list[dict | None], prices: list[dict]
+) -> np.ndarray:
     """
-    Match on product_code ("barcode") and price.
+    Score all the (price tag, price) pairs of a proof, in one pass.
+    - product & category prices: match on barcode (or category) and price
+    - other cases: match only on price, if this price is unique in the proof
+    (prices & price tags) to avoid errors
+
+    :param price_tags_data: the extraction data of each price tag (None if
+        the price tag has no extraction prediction)
+    :param prices: the prices of the proof (dicts with the "type", "price",
+        "product_code" and "category_tag" keys)
+    :return: the (price tags, prices) score matrix (0: no match)
     """
-    price_tag_prediction_data = price_tag.predictions.first().data
-    price_tag_prediction_barcode = price_tag_prediction_data.get("barcode")
-    price_tag_prediction_barcode = cleanup_price_tag_prediction_barcode(
-        price_tag_prediction_barcode
+    price_tags_data = [data or {} for data in price_tags_data]
+    price_tag_prices = np.array(
+        [get_predicted_price(data.get("price")) for data in price_tags_data]
+    )
+    price_tag_barcodes = np.array(
+        [
+            cleanup_price_tag_prediction_barcode(data.get("barcode") or "")
+            for data in price_tags_data
+        ],
+        dtype=str,
+    )
+    price_tag_products = np.array(
+        [data.get("product") or "" for data in price_tags_data], dtype=str
+    )
+    price_prices = np.array(
+        [
+            np.nan if price["price"] is None else float(price["price"])
+            for price in prices
+        ]
+    )
+    price_types = np.array([price["type"] for price in prices], dtype=str)
+    price_product_codes = np.array(
+        [price["product_code"] or "" for price in prices], dtype=str
     )
-    price_tag_prediction_price = price_tag_prediction_data.get("price")
-    return (
-        price.type == price_constants.TYPE_PRODUCT
-        and (price.product_code == price_tag_prediction_barcode)
-        and utils.match_decimal_with_float(price.price, price_tag_prediction_price)
+    price_category_tags = np.array(
+        [price["category_tag"] or "" for price in prices], dtype=str
     )
 
+    # NaN never equals NaN: missing prices never match
+    price_match = price_tag_prices[:, None] == price_prices[None, :]
+    product_match = (
+        (price_types == price_constants.TYPE_PRODUCT)[None, :]
+        & (price_tag_barcodes != "")[:, None]
+        & (price_tag_barcodes[:, None] == price_product_codes[None, :])
+    )
+    category_match = (
+        (price_types == price_constants.TYPE_CATEGORY)[None, :]
+        & (price_tag_products != "")[:, None]
+        & (price_tag_products[:, None] == price_category_tags[None, :])
+    )
+    unique_price_tag_price = (
+        price_tag_prices[:, None] == price_tag_prices[None, :]
+    ).sum(axis=1) == 1
+    unique_price_price = (price_prices[:, None] == price_prices[None, :]).sum(
+        axis=1
+    ) == 1
+    return np.select(
+        [
+            price_match & (product_match | category_match),
+            price_match & unique_price_tag_price[:, None] & unique_price_price[None, :],
+        ],
+        [PRICE_TAG_MATCH_SCORE_PRODUCT, PRICE_TAG_MATCH_SCORE_PRICE],
+        default=0,
+    )
+
+
+def match_price_tags_with_prices(proof_ids: list[int]) -> list[PriceTag]:
+    """
+    Match the price tags of the proofs with their prices.
+    - the price tags, their predictions & the prices are loaded in 3 queries
+    - for each proof, all the (price tag, price) pairs are scored at once,
+    then resolved as an optimal one-to-one assignment
+    - only the price tags not linked nor reviewed yet (no price, no status)
+    are matched, with prices not already linked to a price tag
+    - the matches are saved with a single bulk_update
+
+    :param proof_ids: the IDs of the proofs
+    :return: the list of PriceTag instances matched
+    """
+    price_tags_by_proof = collections.defaultdict(list)
+    for price_tag in (
+        PriceTag.objects.filter(
+            proof_id__in=proof_ids, price_id__isnull=True, status__isnull=True
+        )
+        .only("id", "proof_id", "price_id", "status")
+        .order_by("id")
+    ):
+        price_tags_by_proof[price_tag.proof_id].append(price_tag)
+    price_tags_data = {}
+    # keep the first extraction prediction of each price tag
+    for price_tag_id, data in (
+        PriceTagPrediction.objects.filter(
+            price_tag__proof_id__in=proof_ids,
+            price_tag__price_id__isnull=True,
+            price_tag__status__isnull=True,
+            type=proof_constants.PRICE_TAG_EXTRACTION_TYPE,
+        )
+        .order_by("-id")
+        .values_list("price_tag_id", "data")
+    ):
+        price_tags_data[price_tag_id] = data
+    prices_by_proof = collections.defaultdict(list)
+    for price in (
+        Price.objects.filter(proof_id__in=proof_ids, price_tags__isnull=True)
+        .order_by("id")
+        .values("id", "proof_id", "type", "price", "product_code", "category_tag")
+    ):
+        prices_by_proof[price["proof_id"]].append(price)
+
+    now = timezone.now()
+    matched_price_tags = []
+    for proof_id, price_tags in price_tags_by_proof.items():
+        prices = prices_by_proof.get(proof_id)
+        if not prices:
+            continue
+        scores = compute_price_tag_match_scores(
+            [price_tags_data.get(price_tag.id) for price_tag in price_tags], prices
+        )
+        for i, j in utils.max_score_assignment(scores):
+            price_tag = price_tags[i]
+            price_tag.price_id = prices[j]["id"]
+            price_tag.status = proof_constants.PriceTagStatus.linked_to_price.value
+            price_tag.updated = now
+            matched_price_tags.append(price_tag)
+
+    PriceTag.objects.bulk_update(matched_price_tags, ["price", "status", "updated"])
+    return matched_price_tags
+
+
+def get_name_trigrams(name: str) -> set[str]:
+    """
+    Get the trigrams of a product name, like PostgreSQL pg_trgm: lowercase
+    alphanumeric words, padded with 2 spaces before and 1 space after.
+    """
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", name.lower()):
+        padded_word = f"  {word} "
+        trigrams.update(padded_word[i : i + 3] for i in range(len(padded_word) - 2))
+    return trigrams
+
 
-def match_category_price_tag_with_category_price(
-    price_tag: PriceTag, price: Price
-) -> bool:
+def compute_name_similarities(names: list[str], other_names: list[str]) -> np.ndarray:
     """
-    Match on category_tag ("product") and price.
+    Compute the trigram similarity (|common trigrams| / |all trigrams|) of
+    all the (name, other name) pairs, with a trigram index (one-hot
+    matrices) and a single matrix product.
     """
-    price_tag_prediction_data = price_tag.predictions.first().data
-    price_tag_prediction_product = price_tag_prediction_data.get("product")
-    price_tag_prediction_price = price_tag_prediction_data.get("price")
-    return (
-        price.type == price_constants.TYPE_CATEGORY
-        and (price.category_tag == price_tag_prediction_product)
-        and utils.match_decimal_with_float(price.price, price_tag_prediction_price)
+    names_trigrams = [get_name_trigrams(name or "") for name in names]
+    other_names_trigrams = [get_name_trigrams(name or "") for name in other_names]
+    trigram_index = {
+        trigram: i
+        for i, trigram in enumerate(set().union(*names_trigrams, *other_names_trigrams))
+    }
+
+    def one_hot(trigrams_list: list[set[str]]) -> np.ndarray:
+        matrix = np.zeros((len(trigrams_list), len(trigram_index)))
+        for i, trigrams in enumerate(trigrams_list):
+            matrix[i, [trigram_index[trigram] for trigram in trigrams]] = 1
+        return matrix
+
+    names_matrix, other_names_matrix = one_hot(names_trigrams), one_hot(
+        other_names_trigrams
     )
+    common = names_matrix @ other_names_matrix.T
+    union = (
+        names_matrix.sum(axis=1)[:, None] + other_names_matrix.sum(axis=1)[None, :]
+    ) - common
+    return np.divide(common, union, out=np.zeros_like(common), where=union > 0)
 
 
-def match_price_tag_with_price(price_tag: PriceTag, price: Price) -> bool:
+def compute_receipt_item_match_scores(
+    receipt_items_data: list[dict], receipt_item_orders: list[int], prices: list[dict]
+) -> np.ndarray:
     """
-    Match only on price.
-    We make sure this price is unique in the proof to avoid errors.
+    Score all the (receipt item, price) pairs of a proof, in one pass.
+    - the price should match
+    - if this price is not unique in the proof (prices or receipt items), the
+    product name should also be similar enough
+    - the score increases with the name similarity, and with the proximity
+    of the receipt item order and of the price order (prices are usually
+    added in the receipt order)
+
+    :param receipt_items_data: the predicted data of each receipt item
+    :param receipt_item_orders: the order of each receipt item in the receipt
+    :param prices: the prices of the proof (dicts with the "price",
+        "product_name", "product__product_name" and "category_tag" keys),
+        in creation order
+    :return: the (receipt items, prices) score matrix (0: no match)
     """
-    price_tag_prediction_data = price_tag.predictions.first().data
-    price_tag_prediction_price = price_tag_prediction_data.get("price")
-    proof_prices = list(
-        Price.objects.filter(proof_id=price_tag.proof_id).values_list(
-            "price", flat=True
-        )
+    receipt_item_prices = np.array(
+        [get_predicted_price((data or {}).get("price")) for data in receipt_items_data]
+    )
+    price_prices = np.array(
+        [
+            np.nan if price["price"] is None else float(price["price"])
+            for price in prices
+        ]
+    )
+    price_match = receipt_item_prices[:, None] == price_prices[None, :]
+    unique_receipt_item_price = (
+        receipt_item_prices[:, None] == receipt_item_prices[None, :]
+    ).sum(axis=1) == 1
+    unique_price_price = (price_prices[:, None] == price_prices[None, :]).sum(
+        axis=1
+    ) == 1
+
+    receipt_item_products = np.array(
+        [(data or {}).get("product") or "" for data in receipt_items_data], dtype=str
+    )
+    price_category_tags = np.array(
+        [price["category_tag"] or "" for price in prices], dtype=str
+    )
+    name_similarity = compute_name_similarities(
+        [(data or {}).get("product_name") for data in receipt_items_data],
+        [price["product__product_name"] or price["product_name"] for price in prices],
+    )
+    # category prices: a matching predicted category is as good as the name
+    category_match = (receipt_item_products != "")[:, None] & (
+        receipt_item_products[:, None] == price_category_tags[None, :]
+    )
+    name_similarity[category_match] = 1
+
+    # relative positions in the receipt & in the prices (0: first, 1: last)
+    receipt_item_positions = np.argsort(np.argsort(receipt_item_orders)) / max(
+        len(receipt_item_orders) - 1, 1
+    )
+    price_positions = np.arange(len(prices)) / max(len(prices) - 1, 1)
+    order_proximity = 1 - np.abs(
+        receipt_item_positions[:, None] - price_positions[None, :]
+    )
+
+    valid = price_match & (
+        (unique_receipt_item_price[:, None] & unique_price_price[None, :])
+        | (name_similarity >= RECEIPT_ITEM_MATCH_MIN_NAME_SIMILARITY)
     )
-    proof_price_tag_prices = [
-        pt.predictions.first().data.get("price")
-        for pt in PriceTag.objects.filter(proof_id=price_tag.proof_id)
-    ]
-    return (
-        utils.match_decimal_with_float(price.price, price_tag_prediction_price)
-        and proof_prices.count(price.price) == 1
-        and proof_price_tag_prices.count(price_tag_prediction_price) == 1
+    return np.where(
+        valid,
+        RECEIPT_ITEM_MATCH_SCORE_PRICE
+        + RECEIPT_ITEM_MATCH_SCORE_NAME * name_similarity
+        + RECEIPT_ITEM_MATCH_SCORE_ORDER * order_proximity,
+        0,
     )
 
 
-def match_receipt_item_with_price(receipt_item: ReceiptItem, price: Price) -> bool:
+def match_receipt_items_with_prices(proof_ids: list[int]) -> list[ReceiptItem]:
     """
-    Match only on price.
-    We make sure this price is unique in the proof to avoid errors.
+    Match the receipt items of the proofs with their prices.
+    - the receipt items & the prices are loaded in 2 queries
+    - for each proof, all the (receipt item, price) pairs are scored at once
+    (price, product name similarity, order), then resolved as an optimal
+    one-to-one assignment
+    - only the receipt items not linked nor reviewed yet (no price, no
+    status) are matched, with prices not already linked to a receipt item
+    - the matches are saved with a single bulk_update
+
+    :param proof_ids: the IDs of the proofs
+    :return: the list of ReceiptItem instances matched
     """
-    receipt_item_prediction_data = receipt_item.predicted_data
-    receipt_item_prediction_price = receipt_item_prediction_data.get("price")
-    proof_prices = list(
-        Price.objects.filter(proof_id=receipt_item.proof_id).values_list(
-            "price", flat=True
+    receipt_items_by_proof = collections.defaultdict(list)
+    for receipt_item in (
+        ReceiptItem.objects.filter(
+            proof_id__in=proof_ids, price_id__isnull=True, status__isnull=True
         )
+        .only("id", "proof_id", "price_id", "status", "order", "predicted_data")
+        .order_by("order", "id")
+    ):
+        receipt_items_by_proof[receipt_item.proof_id].append(receipt_item)
+    prices_by_proof = collections.defaultdict(list)
+    for price in (
+        Price.objects.filter(proof_id__in=proof_ids, receipt_items__isnull=True)
+        .order_by("id")
+        .values(
+            "id",
+            "proof_id",
+            "price",
+            "product_name",
+            "product__product_name",
+            "category_tag",
+        )
+    ):
+        prices_by_proof[price["proof_id"]].append(price)
+
+    now = timezone.now()
+    matched_receipt_items = []
+    for proof_id, receipt_items in receipt_items_by_proof.items():
+        prices = prices_by_proof.get(proof_id)
+        if not prices:
+            continue
+        scores = compute_receipt_item_match_scores(
+            [receipt_item.predicted_data for receipt_item in receipt_items],
+            [receipt_item.order for receipt_item in receipt_items],
+            prices,
+        )
+        for i, j in utils.max_score_assignment(scores):
+            receipt_item = receipt_items[i]
+            receipt_item.price_id = prices[j]["id"]
+            receipt_item.status = (
+                proof_constants.ReceiptItemStatus.linked_to_price.value
+            )
+            receipt_item.updated = now
+            matched_receipt_items.append(receipt_item)
+
+    ReceiptItem.objects.bulk_update(
+        matched_receipt_items, ["price", "status", "updated"]
     )
-    proof_receipt_item_prices = [
-        ri.predicted_data.get("price")
-        for ri in ReceiptItem.objects.filter(proof_id=receipt_item.proof_id)
-    ]
-    return (
-        utils.match_decimal_with_float(price.price, receipt_item_prediction_price)
-        and proof_prices.count(price.price) == 1
-        and proof_receipt_item_prices.count(receipt_item_prediction_price) == 1
-    )
+    return matched_receipt_items
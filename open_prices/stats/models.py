@@ -157,9 +157,7 @@ class TotalStats(SingletonModel):
             setattr(
                 self,
                 f"price_source_{source.lower()}_count",
-                Price.objects.with_extra_fields()
-                .filter(source_annotated=source)
-                .count(),
+                Price.objects.filter(source_category=source).count(),
             )
         self.save(update_fields=self.PRICE_COUNT_FIELDS + ["updated"])
 
@@ -217,9 +215,7 @@ class TotalStats(SingletonModel):
             setattr(
                 self,
                 f"proof_source_{source.lower()}_count",
-                Proof.objects.with_extra_fields()
-                .filter(source_annotated=source)
-                .count(),
+                Proof.objects.filter(source_category=source).count(),
             )
         self.save(update_fields=self.PROOF_COUNT_FIELDS + ["updated"])
 